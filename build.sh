@@ -8,7 +8,7 @@ cd c_code
 # Detect OS
 if [[ "$OSTYPE" == "linux-gnu"* ]]; then
     echo "Building for Linux..."
-    gcc -fPIC -shared -o playlist.so playlist.c
+    gcc -fPIC -shared -pthread -o playlist.so playlist.c
     if [ $? -eq 0 ]; then
         echo "✓ Successfully built playlist.so"
     else
@@ -17,7 +17,7 @@ if [[ "$OSTYPE" == "linux-gnu"* ]]; then
     fi
 elif [[ "$OSTYPE" == "darwin"* ]]; then
     echo "Building for macOS..."
-    gcc -fPIC -shared -o playlist.dylib playlist.c
+    gcc -fPIC -shared -pthread -o playlist.dylib playlist.c
     if [ $? -eq 0 ]; then
         echo "✓ Successfully built playlist.dylib"
     else
@@ -2,422 +2,3013 @@
 #include <stdlib.h>
 #include <string.h>
 #include <ctype.h>
+#include <errno.h>
+#include <stdint.h>
 #include "playlist.h"
 
-// Global pointers for circular doubly linked list
-static Node* head = NULL;
-static Node* tail = NULL;
-static Node* current = NULL;
-static int listSize = 0;
+#ifndef _WIN32
+#include <fcntl.h>
+#include <pthread.h>
+#include <unistd.h>
+#include <sys/file.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#else
+#include <io.h>
+#include <process.h>
+#include <windows.h>
+#endif
 
-// Helper function to extract basename from filepath
-static void extractBasename(const char* filepath, char* basename) {
-    const char* lastSlash = strrchr(filepath, '/');
-    const char* lastBackslash = strrchr(filepath, '\\');
-    const char* start = (lastSlash > lastBackslash) ? lastSlash + 1 : 
-                        (lastBackslash ? lastBackslash + 1 : filepath);
-    
-    const char* lastDot = strrchr(start, '.');
-    size_t len = lastDot ? (size_t)(lastDot - start) : strlen(start);
-    
-    if (len >= 256) len = 255;
-    strncpy(basename, start, len);
-    basename[len] = '\0';
-}
+// Reader-writer lock guarding one playlist (see "Thread safety" at the end)
+#ifndef _WIN32
+typedef pthread_rwlock_t PlaylistLock;
+#else
+typedef SRWLOCK PlaylistLock;
+#endif
 
-// Initialize the playlist
-void initializePlaylist() {
-    cleanupPlaylist();
-    head = NULL;
-    tail = NULL;
-    current = NULL;
-    listSize = 0;
-}
+// All state of one playlist; every operation takes a handle, so one
+// process can host any number of independent playlists
+#define ARENA_SLOT_ALIGN 8
+#define ARENA_SIZE_CLASSES (256 / ARENA_SLOT_ALIGN)
 
-// Add a song to the playlist (insertion at tail - O(1))
-int addSong(const char* filepath) {
-    if (!filepath || strlen(filepath) == 0) {
-        return 0;
-    }
+struct Playlist {
+    PlaylistLock lock;
     
-    char basename[256];
-    extractBasename(filepath, basename);
+    // Circular doubly linked list
+    Node* head;
+    Node* tail;
+    Node* current;
+    int listSize;               // written atomically, read without the lock
     
-    // Check if song already exists
-    Node* temp = head;
-    if (temp) {
-        do {
-            if (strcmp(temp->songName, basename) == 0) {
-                return 0; // Song already exists
-            }
-            temp = temp->next;
-        } while (temp != head);
-    }
+    // Hash index: songName -> Node* (separate chaining through Node.hashNext)
+    Node** buckets;
+    size_t bucketCount;
     
-    // Create new node
-    Node* newNode = (Node*)malloc(sizeof(Node));
-    if (!newNode) {
-        return 0;
-    }
+    // Node pool and string arena
+    struct Slab* slabs;
+    int slabUsed;               // nodes handed out from the newest slab
+    Node* freeNodes;            // recycled nodes, linked through next
+    size_t slabCount;
+    struct ArenaBlock* arenaBlocks;
+    size_t arenaBlockCount;
+    char* arenaFree[ARENA_SIZE_CLASSES]; // freed name slots by size class
     
-    strncpy(newNode->songName, basename, 255);
-    newNode->songName[255] = '\0';
-    newNode->playCount = 0;
-    newNode->isFavorite = 0;
+    // Mutation generation: bumped on every state change so callers can
+    // skip saves when nothing changed since the last one (atomic, like listSize)
+    unsigned long generation;
     
-    // Insert at tail (O(1) with tail pointer)
-    if (head == NULL) {
-        // First node - circular list with single node
-        head = newNode;
-        tail = newNode;
-        newNode->next = newNode;
-        newNode->prev = newNode;
-        current = newNode;
-    } else {
-        // Insert at tail
-        newNode->next = head;
-        newNode->prev = tail;
-        tail->next = newNode;
-        head->prev = newNode;
-        tail = newNode;
-    }
+    // Trigram search index and positional index
+    struct TrigramSlot* trigrams;
+    size_t trigramSlots;        // power of two
+    size_t trigramCount;
+    size_t postingIdBytes;
+    Node** searchNodes;         // search id -> node (NULL once deleted)
+    uint32_t searchNextId;
+    uint32_t searchCapacity;
+    uint32_t searchDead;
+    uint32_t* positionTree;     // Fenwick tree of live ids (1-based)
+    
+    // Word tokens for fuzzy search
+    struct Token** tokenBuckets;
+    size_t tokenBucketCount;    // power of two
+    size_t tokenCount;
+    size_t tokenBytes;          // Token structs including their text
+    struct Token* tokenRoot;    // BK-tree root
+    
+    // Play-count ranking treap
+    struct RankNode* rankNodes; // slot 0 is unused
+    uint32_t rankCapacity;
+    uint32_t rankUsed;          // slots handed out, including slot 0
+    uint32_t rankFree;          // recycled slots, linked through left
+    uint32_t rankRoot;
+    uint64_t rankClock;
+    uint32_t rankSeed;
     
-    listSize++;
+    // Append-only journal
+    FILE* journalFile;
+    char* journalPath;
+    int journalReplaying;
+    
+    // Shared journal mode: the journal is the source of truth for every
+    // handle (in any process) that opened it shared
+    int journalShared;
+    int journalLockFd;          // flock()ed around shared access
+    long journalApplied;        // journal bytes applied to this playlist
+    uint64_t journalInode;      // changes when another handle compacts
+    char* snapshotPath;         // reloaded after such a compaction
+};
+
+static int lockInit(PlaylistLock* lock) {
+#ifndef _WIN32
+    // Prefer writers so a steady stream of readers can't starve mutations
+    pthread_rwlockattr_t attr;
+    pthread_rwlockattr_init(&attr);
+#ifdef __GLIBC__
+    pthread_rwlockattr_setkind_np(&attr, PTHREAD_RWLOCK_PREFER_WRITER_NONRECURSIVE_NP);
+#endif
+    int ok = pthread_rwlock_init(lock, &attr) == 0;
+    pthread_rwlockattr_destroy(&attr);
+    return ok;
+#else
+    InitializeSRWLock(lock);
     return 1;
+#endif
 }
 
-// Delete a song by name (O(n) - must search)
-int deleteSong(const char* songName) {
-    if (!songName || !head) {
-        return 0;
+static void lockDestroy(PlaylistLock* lock) {
+#ifndef _WIN32
+    pthread_rwlock_destroy(lock);
+#else
+    (void)lock;
+#endif
+}
+
+static void readLock(Playlist* pl) {
+#ifndef _WIN32
+    pthread_rwlock_rdlock(&pl->lock);
+#else
+    AcquireSRWLockShared(&pl->lock);
+#endif
+}
+
+static void readUnlock(Playlist* pl) {
+#ifndef _WIN32
+    pthread_rwlock_unlock(&pl->lock);
+#else
+    ReleaseSRWLockShared(&pl->lock);
+#endif
+}
+
+static void writeLock(Playlist* pl) {
+#ifndef _WIN32
+    pthread_rwlock_wrlock(&pl->lock);
+#else
+    AcquireSRWLockExclusive(&pl->lock);
+#endif
+}
+
+static void writeUnlock(Playlist* pl) {
+#ifndef _WIN32
+    pthread_rwlock_unlock(&pl->lock);
+#else
+    ReleaseSRWLockExclusive(&pl->lock);
+#endif
+}
+
+// Exported operations are thin wrappers that take the lock and call
+// these "...Locked" implementations (which assume it is held)
+static void cleanupPlaylistLocked(Playlist* pl);
+static void journalCloseLocked(Playlist* pl);
+static int journalStale(Playlist* pl);
+static void journalSync(Playlist* pl, int exclusive);
+static void journalLockFile(Playlist* pl, int exclusive);
+static void journalUnlockFile(Playlist* pl);
+static void beginRead(Playlist* pl);
+static void endRead(Playlist* pl);
+
+// Hash index sizing
+#define INITIAL_BUCKETS 64
+
+// Node pool: nodes are carved out of fixed-size slabs so the list is
+// laid out contiguously in insertion order; deleted nodes are recycled
+// through a free list
+#define SLAB_NODES 1024
+
+typedef struct Slab {
+    struct Slab* next;
+    Node nodes[SLAB_NODES];
+} Slab;
+
+// String arena: song names are interned as variable-length, NUL-terminated
+// strings packed into large blocks (reclaimed on cleanup). Slots are
+// rounded up to ARENA_SLOT_ALIGN bytes; a deleted song's slot goes on a
+// free list for its size class (linked through the slot's first bytes)
+// and is reused by the next name of that class, so add/delete churn
+// doesn't grow the arena
+#define ARENA_BLOCK_SIZE 65536
+
+typedef struct ArenaBlock {
+    struct ArenaBlock* next;
+    size_t used;
+    char data[ARENA_BLOCK_SIZE];
+} ArenaBlock;
+
+static Node* nodeAlloc(Playlist* pl) {
+    if (pl->freeNodes) {
+        Node* node = pl->freeNodes;
+        pl->freeNodes = node->next;
+        return node;
     }
     
-    Node* temp = head;
-    do {
-        if (strcmp(temp->songName, songName) == 0) {
-            // Found the node to delete
-            if (listSize == 1) {
-                // Only one node
-                free(head);
-                head = NULL;
-                tail = NULL;
-                current = NULL;
-            } else {
-                // Update pointers
-                temp->prev->next = temp->next;
-                temp->next->prev = temp->prev;
-                
-                if (temp == head) {
-                    head = temp->next;
-                }
-                if (temp == tail) {
-                    tail = temp->prev;
-                }
-                if (temp == current) {
-                    current = temp->next;
-                }
-                
-                free(temp);
-            }
-            listSize--;
-            return 1;
+    if (!pl->slabs || pl->slabUsed == SLAB_NODES) {
+        Slab* slab = (Slab*)malloc(sizeof(Slab));
+        if (!slab) {
+            return NULL;
         }
-        temp = temp->next;
-    } while (temp != head);
-    
-    return 0; // Song not found
+        slab->next = pl->slabs;
+        pl->slabs = slab;
+        pl->slabUsed = 0;
+        pl->slabCount++;
+    }
+    return &pl->slabs->nodes[pl->slabUsed++];
 }
 
-// Play a song (increment count, mark favorite if >= 3)
-char* playSong(const char* songName) {
-    if (!songName || !head) {
-        return NULL;
+// Size class of the slot holding a name of len bytes
+static size_t arenaClass(size_t len) {
+    return (len + ARENA_SLOT_ALIGN) / ARENA_SLOT_ALIGN - 1;
+}
+
+// Return a name's slot to its size class's free list
+static void arenaRelease(Playlist* pl, const char* name) {
+    if (!name) {
+        return;
     }
     
-    Node* temp = head;
-    do {
-        if (strcmp(temp->songName, songName) == 0) {
-            current = temp;
-            temp->playCount++;
-            if (temp->playCount >= 3) {
-                temp->isFavorite = 1;
-            }
-            
-            // Return malloc'd string
-            char* result = (char*)malloc(256);
-            if (result) {
-                strncpy(result, temp->songName, 255);
-                result[255] = '\0';
-            }
-            return result;
-        }
-        temp = temp->next;
-    } while (temp != head);
-    
-    return NULL; // Song not found
+    char* slot = (char*)name;
+    size_t sizeClass = arenaClass(strlen(name));
+    memcpy(slot, &pl->arenaFree[sizeClass], sizeof(char*));
+    pl->arenaFree[sizeClass] = slot;
 }
 
-// Play next song (O(1) - just move pointer)
-char* playNext() {
-    if (!current) {
-        return NULL;
+static void nodeFree(Playlist* pl, Node* node) {
+    arenaRelease(pl, node->songName);
+    node->songName = NULL;
+    node->next = pl->freeNodes;
+    pl->freeNodes = node;
+}
+
+// Copy a name (at most 255 bytes) into the arena
+static const char* arenaIntern(Playlist* pl, const char* name) {
+    size_t len = strlen(name);
+    if (len > 255) len = 255;
+    
+    size_t sizeClass = arenaClass(len);
+    if (pl->arenaFree[sizeClass]) {
+        char* slot = pl->arenaFree[sizeClass];
+        memcpy(&pl->arenaFree[sizeClass], slot, sizeof(char*));
+        memcpy(slot, name, len);
+        slot[len] = '\0';
+        return slot;
     }
     
-    current = current->next;
-    current->playCount++;
-    if (current->playCount >= 3) {
-        current->isFavorite = 1;
+    size_t slotSize = (sizeClass + 1) * ARENA_SLOT_ALIGN;
+    if (!pl->arenaBlocks || pl->arenaBlocks->used + slotSize > ARENA_BLOCK_SIZE) {
+        ArenaBlock* block = (ArenaBlock*)malloc(sizeof(ArenaBlock));
+        if (!block) {
+            return NULL;
+        }
+        block->next = pl->arenaBlocks;
+        block->used = 0;
+        pl->arenaBlocks = block;
+        pl->arenaBlockCount++;
     }
     
-    char* result = (char*)malloc(256);
-    if (result) {
-        strncpy(result, current->songName, 255);
-        result[255] = '\0';
+    char* copy = pl->arenaBlocks->data + pl->arenaBlocks->used;
+    memcpy(copy, name, len);
+    copy[len] = '\0';
+    pl->arenaBlocks->used += slotSize;
+    return copy;
+}
+
+// Release every slab and arena block at once
+static void poolReset(Playlist* pl) {
+    while (pl->slabs) {
+        Slab* next = pl->slabs->next;
+        free(pl->slabs);
+        pl->slabs = next;
     }
-    return result;
+    while (pl->arenaBlocks) {
+        ArenaBlock* next = pl->arenaBlocks->next;
+        free(pl->arenaBlocks);
+        pl->arenaBlocks = next;
+    }
+    pl->slabUsed = 0;
+    pl->freeNodes = NULL;
+    pl->slabCount = 0;
+    pl->arenaBlockCount = 0;
+    memset(pl->arenaFree, 0, sizeof(pl->arenaFree));
 }
 
-// Play previous song (O(1) - just move pointer)
-char* playPrevious() {
-    if (!current) {
+// Allocate a node with an interned name
+static Node* createNode(Playlist* pl, const char* songName, int playCount, int isFavorite) {
+    Node* node = nodeAlloc(pl);
+    if (!node) {
         return NULL;
     }
     
-    current = current->prev;
-    current->playCount++;
-    if (current->playCount >= 3) {
-        current->isFavorite = 1;
+    node->songName = arenaIntern(pl, songName);
+    if (!node->songName) {
+        nodeFree(pl, node);
+        return NULL;
     }
-    
-    char* result = (char*)malloc(256);
-    if (result) {
-        strncpy(result, current->songName, 255);
-        result[255] = '\0';
+    node->playCount = playCount;
+    node->isFavorite = isFavorite;
+    node->next = NULL;
+    node->prev = NULL;
+    node->hashNext = NULL;
+    return node;
+}
+
+// Journal operations (see "Append-only journal" below)
+#define JOURNAL_ADD 1      // song added with zero stats
+#define JOURNAL_DELETE 2   // song deleted
+#define JOURNAL_STATS 3    // song's playCount/isFavorite set (upsert)
+#define JOURNAL_CLEAR 4    // every song removed (initialize/cleanup)
+
+static void journalAppend(Playlist* pl, int op, const char* songName, int playCount, int isFavorite);
+
+// listSize and generation are only changed under the write lock, but
+// stored atomically so getPlaylistSize/getGeneration can skip the lock
+static void setListSize(Playlist* pl, int size) {
+    __atomic_store_n(&pl->listSize, size, __ATOMIC_RELEASE);
+}
+
+static void bumpGeneration(Playlist* pl) {
+    __atomic_add_fetch(&pl->generation, 1, __ATOMIC_RELEASE);
+}
+
+// Bump the generation and journal the change
+static void recordMutation(Playlist* pl, int op, const char* songName, int playCount, int isFavorite) {
+    bumpGeneration(pl);
+    journalAppend(pl, op, songName, playCount, isFavorite);
+}
+
+// FNV-1a hash of a song name
+static size_t hashName(const char* name) {
+    size_t hash = 2166136261u;
+    while (*name) {
+        hash ^= (unsigned char)*name++;
+        hash *= 16777619u;
     }
-    return result;
+    return hash;
 }
 
-// Search for a song and return info string
-char* searchSong(const char* songName) {
-    if (!songName || !head) {
+// Look up a song by name (expected O(1))
+static Node* indexFind(Playlist* pl, const char* songName) {
+    if (!pl->buckets) {
         return NULL;
     }
     
-    Node* temp = head;
-    do {
+    Node* temp = pl->buckets[hashName(songName) & (pl->bucketCount - 1)];
+    while (temp) {
         if (strcmp(temp->songName, songName) == 0) {
-            // Format: "Title (Plays: X, Favorite: Yes/No)"
-            char* result = (char*)malloc(512);
-            if (result) {
-                snprintf(result, 511, "%s (Plays: %d, Favorite: %s)", 
-                        temp->songName, temp->playCount,
-                        temp->isFavorite ? "Yes" : "No");
-                result[511] = '\0';
-            }
-            return result;
+            return temp;
         }
-        temp = temp->next;
-    } while (temp != head);
-    
-    return NULL; // Song not found
+        temp = temp->hashNext;
+    }
+    return NULL;
 }
 
-// Display entire playlist (returns array of strings)
-char** displayPlaylist(int* outCount) {
-    *outCount = 0;
-    if (!head) {
-        return NULL;
-    }
-    
-    char** result = (char**)malloc(listSize * sizeof(char*));
-    if (!result) {
-        return NULL;
+// Resize the bucket array to newCount (a power of two) and rehash every node
+static int indexResize(Playlist* pl, size_t newCount) {
+    Node** newBuckets = (Node**)calloc(newCount, sizeof(Node*));
+    if (!newBuckets) {
+        return 0;
     }
     
-    Node* temp = head;
-    int index = 0;
-    do {
-        result[index] = (char*)malloc(256);
-        if (result[index]) {
-            strncpy(result[index], temp->songName, 255);
-            result[index][255] = '\0';
+    for (size_t i = 0; i < pl->bucketCount; i++) {
+        Node* temp = pl->buckets[i];
+        while (temp) {
+            Node* next = temp->hashNext;
+            size_t slot = hashName(temp->songName) & (newCount - 1);
+            temp->hashNext = newBuckets[slot];
+            newBuckets[slot] = temp;
+            temp = next;
         }
-        index++;
-        temp = temp->next;
-    } while (temp != head);
+    }
     
-    *outCount = listSize;
-    return result;
+    free(pl->buckets);
+    pl->buckets = newBuckets;
+    pl->bucketCount = newCount;
+    return 1;
 }
 
-// Display favorites only
-char** displayFavorites(int* outCount) {
-    *outCount = 0;
-    if (!head) {
-        return NULL;
-    }
-    
-    // First pass: count favorites
-    int favCount = 0;
-    Node* temp = head;
-    do {
-        if (temp->isFavorite) {
-            favCount++;
-        }
-        temp = temp->next;
-    } while (temp != head);
-    
-    if (favCount == 0) {
-        return NULL;
+// Double the bucket array
+static int indexGrow(Playlist* pl) {
+    return indexResize(pl, pl->bucketCount ? pl->bucketCount * 2 : INITIAL_BUCKETS);
+}
+
+// Pre-size the index for n songs so bulk loads don't rehash repeatedly
+static void indexReserve(Playlist* pl, size_t n) {
+    size_t newCount = pl->bucketCount ? pl->bucketCount : INITIAL_BUCKETS;
+    while (n * 4 > newCount * 3) {
+        newCount *= 2;
     }
-    
-    // Second pass: allocate and fill
-    char** result = (char**)malloc(favCount * sizeof(char*));
-    if (!result) {
-        return NULL;
+    if (newCount != pl->bucketCount) {
+        indexResize(pl, newCount);
     }
-    
-    temp = head;
-    int index = 0;
-    do {
-        if (temp->isFavorite) {
-            result[index] = (char*)malloc(256);
-            if (result[index]) {
-                strncpy(result[index], temp->songName, 255);
-                result[index][255] = '\0';
-            }
-            index++;
+}
+
+// Add a node to the index (keeps load factor <= 0.75)
+static int indexInsert(Playlist* pl, Node* node) {
+    if ((size_t)(pl->listSize + 1) * 4 > pl->bucketCount * 3) {
+        if (!indexGrow(pl) && !pl->buckets) {
+            return 0;
         }
-        temp = temp->next;
-    } while (temp != head);
+    }
     
-    *outCount = favCount;
-    return result;
+    size_t slot = hashName(node->songName) & (pl->bucketCount - 1);
+    node->hashNext = pl->buckets[slot];
+    pl->buckets[slot] = node;
+    return 1;
 }
 
-// Save playlist to file (CSV format)
-void savePlaylistToFile(const char* filename) {
-    if (!filename || !head) {
+// Remove a node from the index
+static void indexRemove(Playlist* pl, Node* node) {
+    if (!pl->buckets) {
         return;
     }
     
-    FILE* file = fopen(filename, "w");
-    if (!file) {
-        return;
+    Node** link = &pl->buckets[hashName(node->songName) & (pl->bucketCount - 1)];
+    while (*link) {
+        if (*link == node) {
+            *link = node->hashNext;
+            node->hashNext = NULL;
+            return;
+        }
+        link = &(*link)->hashNext;
     }
-    
-    Node* temp = head;
-    do {
-        fprintf(file, "%s,%d,%d\n", temp->songName, temp->playCount, temp->isFavorite);
-        temp = temp->next;
-    } while (temp != head);
-    
-    fclose(file);
 }
 
-// Load playlist from file
-void loadPlaylistFromFile(const char* filename) {
-    if (!filename) {
-        return;
+// Drop the whole index
+static void indexClear(Playlist* pl) {
+    free(pl->buckets);
+    pl->buckets = NULL;
+    pl->bucketCount = 0;
+}
+
+// Search index: casefolded trigram -> posting list of search ids.
+// Ids are handed out in increasing order, so every posting list is
+// sorted; as songs are only appended at the tail, id order is also list
+// order. Deleted songs leave a NULL in searchNodes (a tombstone) and
+// the index is rebuilt once tombstones outnumber live songs.
+#define SEARCH_NO_ID 0xFFFFFFFFu
+#define SEARCH_MIN_REBUILD 1024
+
+typedef struct Posting {
+    uint32_t* ids;
+    uint32_t count;
+    uint32_t capacity;
+} Posting;
+
+typedef struct TrigramSlot {
+    uint32_t key;               // 3 casefolded bytes (0 = empty slot)
+    Posting posting;
+} TrigramSlot;
+
+// ASCII casefold (UTF-8 multi-byte sequences are compared as-is)
+static unsigned char foldByte(unsigned char c) {
+    return c < 128 ? (unsigned char)tolower(c) : c;
+}
+
+static uint32_t trigramKey(const char* p) {
+    return ((uint32_t)foldByte((unsigned char)p[0]) << 16) |
+           ((uint32_t)foldByte((unsigned char)p[1]) << 8) |
+           (uint32_t)foldByte((unsigned char)p[2]);
+}
+
+static size_t trigramSlot(uint32_t key, size_t slots) {
+    uint32_t hash = key * 2654435761u;
+    hash ^= hash >> 15;
+    return hash & (slots - 1);
+}
+
+// Find a trigram's posting list, optionally creating it
+// (open addressing, grown at load factor 0.75)
+static Posting* postingFind(Playlist* pl, uint32_t key, int create) {
+    if (create && (pl->trigramCount + 1) * 4 > pl->trigramSlots * 3) {
+        size_t newSlots = pl->trigramSlots ? pl->trigramSlots * 2 : INITIAL_BUCKETS;
+        TrigramSlot* newTrigrams = (TrigramSlot*)calloc(newSlots, sizeof(TrigramSlot));
+        if (!newTrigrams) {
+            return NULL;
+        }
+        for (size_t i = 0; i < pl->trigramSlots; i++) {
+            if (pl->trigrams[i].key) {
+                size_t slot = trigramSlot(pl->trigrams[i].key, newSlots);
+                while (newTrigrams[slot].key) {
+                    slot = (slot + 1) & (newSlots - 1);
+                }
+                newTrigrams[slot] = pl->trigrams[i];
+            }
+        }
+        free(pl->trigrams);
+        pl->trigrams = newTrigrams;
+        pl->trigramSlots = newSlots;
     }
-    
-    FILE* file = fopen(filename, "r");
-    if (!file) {
-        return;
+    if (!pl->trigrams) {
+        return NULL;
     }
     
-    char line[512];
-    while (fgets(line, sizeof(line), file)) {
-        // Parse CSV: song,playcount,isfavorite
-        char songName[256];
-        int playCount = 0;
-        int isFavorite = 0;
-        
-        if (sscanf(line, "%255[^,],%d,%d", songName, &playCount, &isFavorite) == 3) {
-            // Add song if not exists
-            Node* temp = head;
-            int exists = 0;
-            if (temp) {
-                do {
-                    if (strcmp(temp->songName, songName) == 0) {
-                        exists = 1;
-                        temp->playCount = playCount;
-                        temp->isFavorite = isFavorite;
-                        break;
-                    }
-                    temp = temp->next;
-                } while (temp != head);
-            }
-            
-            if (!exists) {
-                // Create node directly with data
-                Node* newNode = (Node*)malloc(sizeof(Node));
-                if (newNode) {
-                    strncpy(newNode->songName, songName, 255);
-                    newNode->songName[255] = '\0';
-                    newNode->playCount = playCount;
-                    newNode->isFavorite = isFavorite;
-                    
-                    if (head == NULL) {
-                        head = newNode;
-                        tail = newNode;
-                        newNode->next = newNode;
-                        newNode->prev = newNode;
-                        current = newNode;
-                    } else {
-                        newNode->next = head;
-                        newNode->prev = tail;
-                        tail->next = newNode;
-                        head->prev = newNode;
-                        tail = newNode;
-                    }
-                    listSize++;
-                }
-            }
+    size_t slot = trigramSlot(key, pl->trigramSlots);
+    while (pl->trigrams[slot].key) {
+        if (pl->trigrams[slot].key == key) {
+            return &pl->trigrams[slot].posting;
         }
+        slot = (slot + 1) & (pl->trigramSlots - 1);
+    }
+    if (!create) {
+        return NULL;
     }
     
-    fclose(file);
+    pl->trigrams[slot].key = key;
+    pl->trigramCount++;
+    return &pl->trigrams[slot].posting;
 }
 
-// Cleanup and free all memory
-void cleanupPlaylist() {
-    if (!head) {
-        return;
+// Append a search id to a posting list (ids arrive in increasing order)
+static void postingAppend(Playlist* pl, Posting* posting, uint32_t id) {
+    if (posting->count && posting->ids[posting->count - 1] == id) {
+        return; // Repeats within this title
     }
-    
-    Node* temp = head;
-    Node* next;
-    do {
-        next = temp->next;
-        free(temp);
-        temp = next;
-    } while (temp != head);
-    
-    head = NULL;
-    tail = NULL;
-    current = NULL;
-    listSize = 0;
+    if (posting->count == posting->capacity) {
+        uint32_t newCapacity = posting->capacity ? posting->capacity * 2 : 2;
+        uint32_t* newIds = (uint32_t*)realloc(posting->ids, newCapacity * sizeof(uint32_t));
+        if (!newIds) {
+            return;
+        }
+        pl->postingIdBytes += (newCapacity - posting->capacity) * sizeof(uint32_t);
+        posting->ids = newIds;
+        posting->capacity = newCapacity;
+    }
+    posting->ids[posting->count++] = id;
 }
 
-// Free array of strings
-void freeStringArray(char** array, int count) {
-    if (!array) {
-        return;
+// Fuzzy search tokens: titles are split into casefolded words; each
+// distinct word keeps a posting list and sits in a BK-tree so words
+// within a small edit distance of a query word are found without
+// comparing against every word
+#define TOKEN_MAX 32                // longer words are truncated
+#define FUZZY_MAX_QUERY_TOKENS 8
+
+typedef struct Token {
+    struct Token* hashNext;     // chain in the token table
+    struct Token* child;        // first BK-tree child
+    struct Token* sibling;      // next child of the same BK-tree parent
+    Posting posting;            // search ids of titles containing the word
+    uint16_t distance;          // edit distance to the BK-tree parent
+    uint16_t length;
+    char text[];                // NUL-terminated, at most TOKEN_MAX - 1 bytes
+} Token;
+
+static int isTokenByte(unsigned char c) {
+    return c >= 128 || isalnum(c);
+}
+
+static int isAllDigits(const char* text) {
+    if (!*text) {
+        return 0;
     }
-    
-    for (int i = 0; i < count; i++) {
-        if (array[i]) {
-            free(array[i]);
+    for (; *text; text++) {
+        if (!isdigit((unsigned char)*text)) {
+            return 0;
         }
     }
-    free(array);
+    return 1;
 }
 
-// Free a single string
-void freeString(char* s) {
-    if (s) {
-        free(s);
+// Read the next casefolded word; returns its length (0 at the end)
+static size_t readToken(const char** cursor, char* out) {
+    const unsigned char* p = (const unsigned char*)*cursor;
+    while (*p && !isTokenByte(*p)) {
+        p++;
+    }
+    size_t len = 0;
+    while (*p && isTokenByte(*p)) {
+        if (len < TOKEN_MAX - 1) {
+            out[len++] = (char)foldByte(*p);
+        }
+        p++;
     }
+    out[len] = '\0';
+    *cursor = (const char*)p;
+    return len;
 }
 
+// Read the next word, skipping bitrate noise ("128 Kbps", "320kbps")
+static size_t nextToken(const char** cursor, char* out) {
+    for (;;) {
+        size_t len = readToken(cursor, out);
+        if (len == 0) {
+            return 0;
+        }
+        if (len >= 4 && strcmp(out + len - 4, "kbps") == 0) {
+            out[len - 4] = '\0';
+            if (len == 4 || isAllDigits(out)) {
+                continue;
+            }
+            out[len - 4] = 'k';
+        }
+        if (isAllDigits(out)) {
+            const char* peek = *cursor;
+            char next[TOKEN_MAX];
+            if (readToken(&peek, next) && strcmp(next, "kbps") == 0) {
+                *cursor = peek;
+                continue;
+            }
+        }
+        return len;
+    }
+}
+
+// Levenshtein distance between two words of at most TOKEN_MAX - 1 bytes
+static int editDistance(const char* a, int lengthA, const char* b, int lengthB) {
+    int row[TOKEN_MAX];
+    for (int j = 0; j <= lengthB; j++) {
+        row[j] = j;
+    }
+    for (int i = 1; i <= lengthA; i++) {
+        int diagonal = row[0];
+        row[0] = i;
+        for (int j = 1; j <= lengthB; j++) {
+            int above = row[j];
+            int cost = diagonal + (a[i - 1] != b[j - 1]);
+            if (above + 1 < cost) cost = above + 1;
+            if (row[j - 1] + 1 < cost) cost = row[j - 1] + 1;
+            row[j] = cost;
+            diagonal = above;
+        }
+    }
+    return row[lengthB];
+}
+
+static int tokenTableGrow(Playlist* pl) {
+    size_t newCount = pl->tokenBucketCount ? pl->tokenBucketCount * 2 : INITIAL_BUCKETS;
+    Token** newBuckets = (Token**)calloc(newCount, sizeof(Token*));
+    if (!newBuckets) {
+        return 0;
+    }
+    for (size_t i = 0; i < pl->tokenBucketCount; i++) {
+        Token* token = pl->tokenBuckets[i];
+        while (token) {
+            Token* next = token->hashNext;
+            size_t bucket = hashName(token->text) & (newCount - 1);
+            token->hashNext = newBuckets[bucket];
+            newBuckets[bucket] = token;
+            token = next;
+        }
+    }
+    free(pl->tokenBuckets);
+    pl->tokenBuckets = newBuckets;
+    pl->tokenBucketCount = newCount;
+    return 1;
+}
+
+// Find a word, optionally adding it to the table and the BK-tree
+static Token* tokenFind(Playlist* pl, const char* text, int create) {
+    if (pl->tokenBucketCount) {
+        Token* token = pl->tokenBuckets[hashName(text) & (pl->tokenBucketCount - 1)];
+        while (token) {
+            if (strcmp(token->text, text) == 0) {
+                return token;
+            }
+            token = token->hashNext;
+        }
+    }
+    if (!create) {
+        return NULL;
+    }
+    if ((pl->tokenCount + 1) * 4 > pl->tokenBucketCount * 3 && !tokenTableGrow(pl)) {
+        return NULL;
+    }
+    
+    size_t length = strlen(text);
+    Token* token = (Token*)calloc(1, sizeof(Token) + length + 1);
+    if (!token) {
+        return NULL;
+    }
+    memcpy(token->text, text, length + 1);
+    token->length = (uint16_t)length;
+    size_t bucket = hashName(text) & (pl->tokenBucketCount - 1);
+    token->hashNext = pl->tokenBuckets[bucket];
+    pl->tokenBuckets[bucket] = token;
+    pl->tokenCount++;
+    pl->tokenBytes += sizeof(Token) + length + 1;
+    
+    // Hang the word under the BK-tree child at its distance from each parent
+    if (!pl->tokenRoot) {
+        pl->tokenRoot = token;
+        return token;
+    }
+    Token* parent = pl->tokenRoot;
+    for (;;) {
+        int distance = editDistance(parent->text, parent->length, token->text, token->length);
+        Token* child = parent->child;
+        while (child && child->distance != distance) {
+            child = child->sibling;
+        }
+        if (!child) {
+            token->distance = (uint16_t)distance;
+            token->sibling = parent->child;
+            parent->child = token;
+            return token;
+        }
+        parent = child;
+    }
+}
+
+static void tokenClear(Playlist* pl) {
+    for (size_t i = 0; i < pl->tokenBucketCount; i++) {
+        Token* token = pl->tokenBuckets[i];
+        while (token) {
+            Token* next = token->hashNext;
+            free(token->posting.ids);
+            free(token);
+            token = next;
+        }
+    }
+    free(pl->tokenBuckets);
+    pl->tokenBuckets = NULL;
+    pl->tokenBucketCount = 0;
+    pl->tokenCount = 0;
+    pl->tokenBytes = 0;
+    pl->tokenRoot = NULL;
+}
+
+// Positional index: a Fenwick tree over search ids counting live songs,
+// so the song at a list position (and the position of a song) is found
+// in O(log n) despite deletions in the middle of the list
+
+// Live songs with id < count
+static uint32_t positionPrefix(Playlist* pl, uint32_t count) {
+    uint32_t sum = 0;
+    for (uint32_t i = count; i > 0; i -= i & (0 - i)) {
+        sum += pl->positionTree[i];
+    }
+    return sum;
+}
+
+// Id of the live song at a 0-based list position
+static uint32_t positionFind(Playlist* pl, uint32_t position) {
+    uint32_t step = 1;
+    while (step * 2 <= pl->searchNextId) {
+        step *= 2;
+    }
+    
+    uint32_t index = 0;
+    uint32_t remaining = position + 1;
+    for (; step; step /= 2) {
+        if (index + step <= pl->searchNextId && pl->positionTree[index + step] < remaining) {
+            index += step;
+            remaining -= pl->positionTree[index];
+        }
+    }
+    return index; // The match is at 1-based index + 1, i.e. 0-based id index
+}
+
+// Give a node the next search id (appending it to the positional index)
+// and add it to the posting lists of its trigrams and words
+static void searchIndexNode(Playlist* pl, Node* node) {
+    node->searchId = SEARCH_NO_ID;
+    if (pl->searchNextId == pl->searchCapacity) {
+        uint32_t newCapacity = pl->searchCapacity ? pl->searchCapacity * 2 : INITIAL_BUCKETS;
+        Node** newNodes = (Node**)realloc(pl->searchNodes, newCapacity * sizeof(Node*));
+        if (!newNodes) {
+            return;
+        }
+        pl->searchNodes = newNodes;
+        uint32_t* newTree = (uint32_t*)realloc(pl->positionTree, (newCapacity + 1) * sizeof(uint32_t));
+        if (!newTree) {
+            return;
+        }
+        pl->positionTree = newTree;
+        pl->searchCapacity = newCapacity;
+    }
+    
+    uint32_t id = pl->searchNextId++;
+    pl->searchNodes[id] = node;
+    node->searchId = id;
+    
+    // Fenwick append: entry i covers ids (i - lowbit(i), i]
+    uint32_t index = id + 1;
+    pl->positionTree[index] = 1 + positionPrefix(pl, index - 1) - positionPrefix(pl, index - (index & (0 - index)));
+    
+    size_t len = strlen(node->songName);
+    for (size_t i = 0; i + 3 <= len; i++) {
+        Posting* posting = postingFind(pl, trigramKey(node->songName + i), 1);
+        if (posting) {
+            postingAppend(pl, posting, id);
+        }
+    }
+    
+    const char* cursor = node->songName;
+    char text[TOKEN_MAX];
+    while (nextToken(&cursor, text)) {
+        Token* token = tokenFind(pl, text, 1);
+        if (token) {
+            postingAppend(pl, &token->posting, id);
+        }
+    }
+}
+
+// Drop the whole search index
+static void searchClear(Playlist* pl) {
+    for (size_t i = 0; i < pl->trigramSlots; i++) {
+        free(pl->trigrams[i].posting.ids);
+    }
+    free(pl->trigrams);
+    free(pl->searchNodes);
+    free(pl->positionTree);
+    tokenClear(pl);
+    pl->trigrams = NULL;
+    pl->trigramSlots = 0;
+    pl->trigramCount = 0;
+    pl->postingIdBytes = 0;
+    pl->searchNodes = NULL;
+    pl->positionTree = NULL;
+    pl->searchNextId = 0;
+    pl->searchCapacity = 0;
+    pl->searchDead = 0;
+}
+
+// Re-index every song in list order, discarding tombstones
+static void searchRebuild(Playlist* pl) {
+    searchClear(pl);
+    Node* temp = pl->head;
+    if (temp) {
+        do {
+            searchIndexNode(pl, temp);
+            temp = temp->next;
+        } while (temp != pl->head);
+    }
+}
+
+// Tombstone a node's search id
+static void searchUnindexNode(Playlist* pl, Node* node) {
+    if (node->searchId == SEARCH_NO_ID) {
+        return;
+    }
+    pl->searchNodes[node->searchId] = NULL;
+    for (uint32_t i = node->searchId + 1; i <= pl->searchNextId; i += i & (0 - i)) {
+        pl->positionTree[i]--;
+    }
+    node->searchId = SEARCH_NO_ID;
+    pl->searchDead++;
+}
+
+// Play-count ranking: a treap over songs that were played or marked
+// favorite, ordered by playCount (highest first) and then by when the
+// song reached that count. Subtree sizes and favorite counts give
+// top-K, favorite paging and rank queries in O(log n + k). Unplayed
+// songs stay out of the tree, so libraries of mostly unplayed songs
+// pay nothing for it.
+typedef struct RankNode {
+    Node* song;
+    uint64_t stamp;             // when the song reached playCount (earlier first)
+    int playCount;              // copies of the song's stats at insert time
+    int isFavorite;
+    uint32_t priority;
+    uint32_t left;              // slots in rankNodes (0 = none; free list link)
+    uint32_t right;
+    uint32_t size;              // nodes in this subtree
+    uint32_t favorites;         // favorites in this subtree
+} RankNode;
+
+static uint32_t rankRandom(Playlist* pl) {
+    pl->rankSeed ^= pl->rankSeed << 13;
+    pl->rankSeed ^= pl->rankSeed >> 17;
+    pl->rankSeed ^= pl->rankSeed << 5;
+    return pl->rankSeed;
+}
+
+static uint32_t rankSize(Playlist* pl, uint32_t slot) {
+    return slot ? pl->rankNodes[slot].size : 0;
+}
+
+static uint32_t rankFavorites(Playlist* pl, uint32_t slot) {
+    return slot ? pl->rankNodes[slot].favorites : 0;
+}
+
+static void rankPull(Playlist* pl, uint32_t slot) {
+    RankNode* rank = &pl->rankNodes[slot];
+    rank->size = 1 + rankSize(pl, rank->left) + rankSize(pl, rank->right);
+    rank->favorites = (rank->isFavorite ? 1 : 0) + rankFavorites(pl, rank->left) + rankFavorites(pl, rank->right);
+}
+
+// Ranking order: more plays first, then whoever got there first
+static int rankBefore(const RankNode* a, const RankNode* b) {
+    if (a->playCount != b->playCount) {
+        return a->playCount > b->playCount;
+    }
+    return a->stamp < b->stamp;
+}
+
+static uint32_t rankMerge(Playlist* pl, uint32_t a, uint32_t b) {
+    if (!a) return b;
+    if (!b) return a;
+    if (pl->rankNodes[a].priority > pl->rankNodes[b].priority) {
+        pl->rankNodes[a].right = rankMerge(pl, pl->rankNodes[a].right, b);
+        rankPull(pl, a);
+        return a;
+    }
+    pl->rankNodes[b].left = rankMerge(pl, a, pl->rankNodes[b].left);
+    rankPull(pl, b);
+    return b;
+}
+
+// Split into nodes ranked before key and the rest
+static void rankSplit(Playlist* pl, uint32_t slot, const RankNode* key, uint32_t* before, uint32_t* after) {
+    if (!slot) {
+        *before = 0;
+        *after = 0;
+        return;
+    }
+    if (rankBefore(&pl->rankNodes[slot], key)) {
+        rankSplit(pl, pl->rankNodes[slot].right, key, &pl->rankNodes[slot].right, after);
+        *before = slot;
+    } else {
+        rankSplit(pl, pl->rankNodes[slot].left, key, before, &pl->rankNodes[slot].left);
+        *after = slot;
+    }
+    rankPull(pl, slot);
+}
+
+static uint32_t rankErase(Playlist* pl, uint32_t slot, uint32_t target) {
+    if (slot == target) {
+        return rankMerge(pl, pl->rankNodes[slot].left, pl->rankNodes[slot].right);
+    }
+    if (rankBefore(&pl->rankNodes[target], &pl->rankNodes[slot])) {
+        pl->rankNodes[slot].left = rankErase(pl, pl->rankNodes[slot].left, target);
+    } else {
+        pl->rankNodes[slot].right = rankErase(pl, pl->rankNodes[slot].right, target);
+    }
+    rankPull(pl, slot);
+    return slot;
+}
+
+// Take a song out of the ranking
+static void rankRemove(Playlist* pl, Node* node) {
+    if (!node->rankSlot) {
+        return;
+    }
+    uint32_t slot = node->rankSlot;
+    pl->rankRoot = rankErase(pl, pl->rankRoot, slot);
+    pl->rankNodes[slot].left = pl->rankFree;
+    pl->rankFree = slot;
+    node->rankSlot = 0;
+}
+
+// Re-rank a song after its playCount or isFavorite changed
+static void rankUpdate(Playlist* pl, Node* node) {
+    uint64_t stamp = 0;
+    if (node->rankSlot) {
+        const RankNode* old = &pl->rankNodes[node->rankSlot];
+        if (old->playCount == node->playCount && old->isFavorite == node->isFavorite) {
+            return;
+        }
+        if (old->playCount == node->playCount) {
+            stamp = old->stamp;
+        }
+        rankRemove(pl, node);
+    }
+    if (node->playCount <= 0 && !node->isFavorite) {
+        return;
+    }
+    
+    uint32_t slot = pl->rankFree;
+    if (slot) {
+        pl->rankFree = pl->rankNodes[slot].left;
+    } else {
+        if (pl->rankUsed == pl->rankCapacity) {
+            uint32_t newCapacity = pl->rankCapacity ? pl->rankCapacity * 2 : INITIAL_BUCKETS;
+            RankNode* newNodes = (RankNode*)realloc(pl->rankNodes, newCapacity * sizeof(RankNode));
+            if (!newNodes) {
+                return;
+            }
+            pl->rankNodes = newNodes;
+            pl->rankCapacity = newCapacity;
+            if (pl->rankUsed == 0) {
+                pl->rankUsed = 1; // Slot 0 means "no node"
+            }
+        }
+        slot = pl->rankUsed++;
+    }
+    
+    RankNode* rank = &pl->rankNodes[slot];
+    rank->song = node;
+    rank->stamp = stamp ? stamp : ++pl->rankClock;
+    rank->playCount = node->playCount;
+    rank->isFavorite = node->isFavorite;
+    rank->priority = rankRandom(pl);
+    rank->left = 0;
+    rank->right = 0;
+    rankPull(pl, slot);
+    
+    uint32_t before, after;
+    rankSplit(pl, pl->rankRoot, rank, &before, &after);
+    pl->rankRoot = rankMerge(pl, rankMerge(pl, before, slot), after);
+    node->rankSlot = slot;
+}
+
+static void rankClear(Playlist* pl) {
+    free(pl->rankNodes);
+    pl->rankNodes = NULL;
+    pl->rankCapacity = 0;
+    pl->rankUsed = 0;
+    pl->rankFree = 0;
+    pl->rankRoot = 0;
+}
+
+// Link a new node at the tail of the list (O(1)) and index it
+static int appendNode(Playlist* pl, Node* newNode) {
+    if (!indexInsert(pl, newNode)) {
+        return 0;
+    }
+    searchIndexNode(pl, newNode);
+    newNode->rankSlot = 0;
+    rankUpdate(pl, newNode);
+    
+    if (pl->head == NULL) {
+        // First node - circular list with single node
+        pl->head = newNode;
+        pl->tail = newNode;
+        newNode->next = newNode;
+        newNode->prev = newNode;
+        pl->current = newNode;
+    } else {
+        // Insert at tail
+        newNode->next = pl->head;
+        newNode->prev = pl->tail;
+        pl->tail->next = newNode;
+        pl->head->prev = newNode;
+        pl->tail = newNode;
+    }
+    
+    setListSize(pl, pl->listSize + 1);
+    return 1;
+}
+
+// Set a song's stats, appending it if missing (used by the loaders)
+static void upsertSong(Playlist* pl, const char* songName, int playCount, int isFavorite) {
+    Node* existing = indexFind(pl, songName);
+    if (existing) {
+        existing->playCount = playCount;
+        existing->isFavorite = isFavorite;
+        rankUpdate(pl, existing);
+        recordMutation(pl, JOURNAL_STATS, existing->songName, playCount, isFavorite);
+        return;
+    }
+    
+    // Create node directly with data
+    Node* newNode = createNode(pl, songName, playCount, isFavorite);
+    if (!newNode) {
+        return;
+    }
+    
+    if (!appendNode(pl, newNode)) {
+        nodeFree(pl, newNode);
+        return;
+    }
+    recordMutation(pl, JOURNAL_STATS, newNode->songName, playCount, isFavorite);
+}
+
+// Helper function to extract basename from filepath
+static void extractBasename(const char* filepath, char* basename) {
+    const char* lastSlash = strrchr(filepath, '/');
+    const char* lastBackslash = strrchr(filepath, '\\');
+    const char* start = (lastSlash > lastBackslash) ? lastSlash + 1 : 
+                        (lastBackslash ? lastBackslash + 1 : filepath);
+    
+    const char* lastDot = strrchr(start, '.');
+    size_t len = lastDot ? (size_t)(lastDot - start) : strlen(start);
+    
+    if (len >= 256) len = 255;
+    strncpy(basename, start, len);
+    basename[len] = '\0';
+}
+
+// Create an empty playlist
+// Returns the handle, or NULL if out of memory
+Playlist* playlist_create() {
+    Playlist* pl = (Playlist*)calloc(1, sizeof(Playlist));
+    if (!pl) {
+        return NULL;
+    }
+    if (!lockInit(&pl->lock)) {
+        free(pl);
+        return NULL;
+    }
+    pl->rankSeed = 2463534242u;
+    pl->journalLockFd = -1;
+    return pl;
+}
+
+// Close the playlist's journal and free the playlist and its handle
+// No other thread may still be using the handle
+void playlist_destroy(Playlist* pl) {
+    if (!pl) {
+        return;
+    }
+    cleanupPlaylistLocked(pl);
+    journalCloseLocked(pl);
+    lockDestroy(&pl->lock);
+    free(pl);
+}
+
+// Initialize the playlist
+static void initializePlaylistLocked(Playlist* pl) {
+    cleanupPlaylistLocked(pl);
+    pl->head = NULL;
+    pl->tail = NULL;
+    pl->current = NULL;
+    setListSize(pl, 0);
+    journalAppend(pl, JOURNAL_CLEAR, "", 0, 0);
+}
+
+// Add a song to the playlist (insertion at tail - O(1))
+static int addSongLocked(Playlist* pl, const char* filepath) {
+    if (!filepath || strlen(filepath) == 0) {
+        return 0;
+    }
+    
+    char basename[256];
+    extractBasename(filepath, basename);
+    
+    // Check if song already exists (O(1) via index)
+    if (indexFind(pl, basename)) {
+        return 0;
+    }
+    
+    // Create new node
+    Node* newNode = createNode(pl, basename, 0, 0);
+    if (!newNode) {
+        return 0;
+    }
+    
+    // Insert at tail (O(1) with tail pointer)
+    if (!appendNode(pl, newNode)) {
+        nodeFree(pl, newNode);
+        return 0;
+    }
+    recordMutation(pl, JOURNAL_ADD, newNode->songName, 0, 0);
+    return 1;
+}
+
+// Delete a song by name (expected O(1) via index)
+static int deleteSongLocked(Playlist* pl, const char* songName) {
+    if (!songName || !pl->head) {
+        return 0;
+    }
+    
+    Node* temp = indexFind(pl, songName);
+    if (!temp) {
+        return 0; // Song not found
+    }
+    
+    recordMutation(pl, JOURNAL_DELETE, temp->songName, 0, 0);
+    indexRemove(pl, temp);
+    searchUnindexNode(pl, temp);
+    rankRemove(pl, temp);
+    if (pl->listSize == 1) {
+        // Only one node
+        nodeFree(pl, pl->head);
+        pl->head = NULL;
+        pl->tail = NULL;
+        pl->current = NULL;
+    } else {
+        // Update pointers
+        temp->prev->next = temp->next;
+        temp->next->prev = temp->prev;
+        
+        if (temp == pl->head) {
+            pl->head = temp->next;
+        }
+        if (temp == pl->tail) {
+            pl->tail = temp->prev;
+        }
+        if (temp == pl->current) {
+            pl->current = temp->next;
+        }
+        
+        nodeFree(pl, temp);
+    }
+    setListSize(pl, pl->listSize - 1);
+    
+    if (pl->searchDead > SEARCH_MIN_REBUILD && pl->searchDead > (uint32_t)pl->listSize) {
+        searchRebuild(pl);
+    }
+    return 1;
+}
+
+// Add a batch of songs in one call
+// results (optional) receives the addSong status of each path
+// Returns the number of songs added
+static int addSongsLocked(Playlist* pl, const char** filepaths, int n, int* results) {
+    if (!filepaths || n <= 0) {
+        return 0;
+    }
+    
+    int added = 0;
+    for (int i = 0; i < n; i++) {
+        int status = addSongLocked(pl, filepaths[i]);
+        if (results) {
+            results[i] = status;
+        }
+        added += status;
+    }
+    return added;
+}
+
+// Delete a batch of songs by name in one call
+// results (optional) receives the deleteSong status of each name
+// Returns the number of songs deleted
+static int deleteSongsLocked(Playlist* pl, const char** songNames, int n, int* results) {
+    if (!songNames || n <= 0) {
+        return 0;
+    }
+    
+    int deleted = 0;
+    for (int i = 0; i < n; i++) {
+        int status = deleteSongLocked(pl, songNames[i]);
+        if (results) {
+            results[i] = status;
+        }
+        deleted += status;
+    }
+    return deleted;
+}
+
+// Make node current and count a play (marks favorite at >= 3)
+static Node* playNode(Playlist* pl, Node* node) {
+    pl->current = node;
+    node->playCount++;
+    if (node->playCount >= 3) {
+        node->isFavorite = 1;
+    }
+    rankUpdate(pl, node);
+    recordMutation(pl, JOURNAL_STATS, node->songName, node->playCount, node->isFavorite);
+    return node;
+}
+
+// Copy a song name into a malloc'd 256-byte string
+static char* copyName(const Node* node) {
+    char* result = (char*)malloc(256);
+    if (result) {
+        strncpy(result, node->songName, 255);
+        result[255] = '\0';
+    }
+    return result;
+}
+
+// Fill a SongRecord from a node
+static void fillRecord(const Node* node, SongRecord* record, int position) {
+    strncpy(record->songName, node->songName, 255);
+    record->songName[255] = '\0';
+    record->playCount = node->playCount;
+    record->isFavorite = node->isFavorite;
+    record->position = position;
+}
+
+// Play a song (increment count, mark favorite if >= 3)
+static char* playSongLocked(Playlist* pl, const char* songName) {
+    if (!songName || !pl->head) {
+        return NULL;
+    }
+    
+    Node* temp = indexFind(pl, songName);
+    if (!temp) {
+        return NULL; // Song not found
+    }
+    
+    // Return malloc'd string
+    return copyName(playNode(pl, temp));
+}
+
+// Play next song (O(1) - just move pointer)
+static char* playNextLocked(Playlist* pl) {
+    if (!pl->current) {
+        return NULL;
+    }
+    
+    return copyName(playNode(pl, pl->current->next));
+}
+
+// Play previous song (O(1) - just move pointer)
+static char* playPreviousLocked(Playlist* pl) {
+    if (!pl->current) {
+        return NULL;
+    }
+    
+    return copyName(playNode(pl, pl->current->prev));
+}
+
+// Play a song and fill record with its updated state (position is -1)
+// Returns 1 on success, 0 if the song is not found
+static int playSongRecordLocked(Playlist* pl, const char* songName, SongRecord* record) {
+    if (!songName || !record || !pl->head) {
+        return 0;
+    }
+    
+    Node* temp = indexFind(pl, songName);
+    if (!temp) {
+        return 0;
+    }
+    
+    fillRecord(playNode(pl, temp), record, -1);
+    return 1;
+}
+
+// Play next song and fill record with its updated state (position is -1)
+// Returns 1 on success, 0 if the playlist is empty
+static int playNextRecordLocked(Playlist* pl, SongRecord* record) {
+    if (!pl->current || !record) {
+        return 0;
+    }
+    
+    fillRecord(playNode(pl, pl->current->next), record, -1);
+    return 1;
+}
+
+// Play previous song and fill record with its updated state (position is -1)
+// Returns 1 on success, 0 if the playlist is empty
+static int playPreviousRecordLocked(Playlist* pl, SongRecord* record) {
+    if (!pl->current || !record) {
+        return 0;
+    }
+    
+    fillRecord(playNode(pl, pl->current->prev), record, -1);
+    return 1;
+}
+
+// A search hit and its rank (lower is better)
+typedef struct SearchMatch {
+    Node* node;
+    int tier;                   // substring: 0 = title prefix, 1 = word start, 2 = inside a word
+                                // fuzzy: total edit distance
+    int position;               // byte offset of the match
+    int length;                 // title length
+    uint32_t order;             // list order tie-breaker
+} SearchMatch;
+
+static int matchCompare(const SearchMatch* a, const SearchMatch* b) {
+    if (a->tier != b->tier) return a->tier - b->tier;
+    if (a->position != b->position) return a->position - b->position;
+    if (a->length != b->length) return a->length - b->length;
+    return (a->order > b->order) - (a->order < b->order);
+}
+
+static int matchCompareQsort(const void* a, const void* b) {
+    return matchCompare((const SearchMatch*)a, (const SearchMatch*)b);
+}
+
+// Casefolded substring search; returns the match offset or -1
+static int foldedFind(const char* haystack, const char* foldedNeedle, size_t needleLen) {
+    for (size_t i = 0; haystack[i]; i++) {
+        size_t j = 0;
+        while (j < needleLen && haystack[i + j] &&
+               foldByte((unsigned char)haystack[i + j]) == (unsigned char)foldedNeedle[j]) {
+            j++;
+        }
+        if (j == needleLen) {
+            return (int)i;
+        }
+    }
+    return -1;
+}
+
+// Keep the best k matches in a max-heap (worst match on top)
+static void heapOffer(SearchMatch* heap, int* size, int k, const SearchMatch* match) {
+    int i;
+    if (*size < k) {
+        i = (*size)++;
+        while (i > 0 && matchCompare(&heap[(i - 1) / 2], match) < 0) {
+            heap[i] = heap[(i - 1) / 2];
+            i = (i - 1) / 2;
+        }
+        heap[i] = *match;
+        return;
+    }
+    if (matchCompare(match, &heap[0]) >= 0) {
+        return;
+    }
+    
+    i = 0;
+    for (;;) {
+        int child = 2 * i + 1;
+        if (child >= *size) break;
+        if (child + 1 < *size && matchCompare(&heap[child + 1], &heap[child]) > 0) child++;
+        if (matchCompare(&heap[child], match) <= 0) break;
+        heap[i] = heap[child];
+        i = child;
+    }
+    heap[i] = *match;
+}
+
+// Score a candidate and offer it to the heap; returns 1 if it matched
+static int searchConsider(Node* node, uint32_t order, const char* folded, size_t queryLen,
+                          SearchMatch* heap, int* heapSize, int k) {
+    int position = foldedFind(node->songName, folded, queryLen);
+    if (position < 0) {
+        return 0;
+    }
+    
+    SearchMatch match;
+    match.node = node;
+    match.position = position;
+    match.length = (int)strlen(node->songName);
+    match.order = order;
+    if (position == 0) {
+        match.tier = 0;
+    } else if (!isalnum((unsigned char)node->songName[position - 1])) {
+        match.tier = 1;
+    } else {
+        match.tier = 2;
+    }
+    if (k > 0) {
+        heapOffer(heap, heapSize, k, &match);
+    }
+    return 1;
+}
+
+// Sort the kept matches best first and copy out the page after offset
+static int emitMatches(SearchMatch* heap, int heapSize, int offset, SongRecord* results) {
+    int written = 0;
+    if (heapSize > 0) {
+        qsort(heap, (size_t)heapSize, sizeof(SearchMatch), matchCompareQsort);
+        for (int i = offset; i < heapSize; i++) {
+            fillRecord(heap[i].node, &results[written++], -1);
+        }
+    }
+    return written;
+}
+
+static int binarySearchId(const uint32_t* ids, uint32_t count, uint32_t id) {
+    uint32_t lo = 0, hi = count;
+    while (lo < hi) {
+        uint32_t mid = lo + (hi - lo) / 2;
+        if (ids[mid] < id) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    return lo < count && ids[lo] == id;
+}
+
+// Ranked, paged, case-insensitive substring search over song titles
+// Queries of 3+ bytes intersect trigram posting lists; shorter ones scan
+// Fills up to limit records (position is -1) starting at offset in rank
+// order; outTotal (optional) receives the total number of matches
+// Returns the number of records written
+static int searchSongsLocked(Playlist* pl, const char* query, int offset, int limit, SongRecord* results, int* outTotal) {
+    if (outTotal) {
+        *outTotal = 0;
+    }
+    if (!query || offset < 0 || limit < 0 || !pl->head) {
+        return 0;
+    }
+    
+    size_t queryLen = strlen(query);
+    if (queryLen == 0 || queryLen > 255) {
+        return 0;
+    }
+    char folded[256];
+    for (size_t i = 0; i < queryLen; i++) {
+        folded[i] = (char)foldByte((unsigned char)query[i]);
+    }
+    folded[queryLen] = '\0';
+    
+    int k = (results && limit > 0) ? offset + limit : 0;
+    SearchMatch* heap = NULL;
+    if (k > 0) {
+        heap = (SearchMatch*)malloc((size_t)k * sizeof(SearchMatch));
+        if (!heap) {
+            return 0;
+        }
+    }
+    int heapSize = 0;
+    int total = 0;
+    
+    if (queryLen < 3) {
+        // Too short for trigrams: scan the list
+        Node* temp = pl->head;
+        uint32_t order = 0;
+        do {
+            total += searchConsider(temp, order++, folded, queryLen, heap, &heapSize, k);
+            temp = temp->next;
+        } while (temp != pl->head);
+    } else {
+        // Collect posting lists; any missing trigram means no match
+        size_t queryTrigrams = queryLen - 2;
+        Posting** lists = (Posting**)malloc(queryTrigrams * sizeof(Posting*));
+        size_t shortest = 0;
+        int missing = lists == NULL;
+        for (size_t i = 0; i < queryTrigrams && !missing; i++) {
+            lists[i] = postingFind(pl, trigramKey(folded + i), 0);
+            if (!lists[i]) {
+                missing = 1;
+            } else if (lists[i]->count < lists[shortest]->count) {
+                shortest = i;
+            }
+        }
+        
+        if (!missing) {
+            const Posting* base = lists[shortest];
+            for (uint32_t n = 0; n < base->count; n++) {
+                uint32_t id = base->ids[n];
+                Node* node = pl->searchNodes[id];
+                if (!node) {
+                    continue; // Tombstone
+                }
+                
+                int inAll = 1;
+                for (size_t i = 0; i < queryTrigrams && inAll; i++) {
+                    if (i != shortest && !binarySearchId(lists[i]->ids, lists[i]->count, id)) {
+                        inAll = 0;
+                    }
+                }
+                if (inAll) {
+                    total += searchConsider(node, id, folded, queryLen, heap, &heapSize, k);
+                }
+            }
+        }
+        free(lists);
+    }
+    
+    int written = emitMatches(heap, heapSize, offset, results);
+    free(heap);
+    if (outTotal) {
+        *outTotal = total;
+    }
+    return written;
+}
+
+// Edit distance allowed for a query word of the given length
+static int fuzzyBudget(int length) {
+    if (length <= 2) return 0;
+    if (length <= 5) return 1;
+    return 2;
+}
+
+// Record, for every title containing a word within maxDistance of the
+// query word, the best distance seen (stored as distance + 1; 0 = none)
+static void bkSearch(const Token* token, const char* word, int length, int maxDistance,
+                     unsigned char* best, int stride) {
+    int distance = editDistance(token->text, token->length, word, length);
+    if (distance <= maxDistance) {
+        for (uint32_t n = 0; n < token->posting.count; n++) {
+            unsigned char* slot = &best[(size_t)token->posting.ids[n] * stride];
+            if (*slot == 0 || *slot > distance + 1) {
+                *slot = (unsigned char)(distance + 1);
+            }
+        }
+    }
+    for (const Token* child = token->child; child; child = child->sibling) {
+        if (child->distance >= distance - maxDistance && child->distance <= distance + maxDistance) {
+            bkSearch(child, word, length, maxDistance, best, stride);
+        }
+    }
+}
+
+// Typo-tolerant search: every query word must match a title word within
+// a small edit distance (0 for 1-2 letters, 1 up to 5, 2 beyond)
+// Results are ranked by total edit distance, then title length and list
+// order; paging and outTotal work as in searchSongs
+// Returns the number of records written
+static int fuzzySearchSongsLocked(Playlist* pl, const char* query, int offset, int limit, SongRecord* results, int* outTotal) {
+    if (outTotal) {
+        *outTotal = 0;
+    }
+    if (!query || offset < 0 || limit < 0 || !pl->head || !pl->tokenRoot) {
+        return 0;
+    }
+    
+    char words[FUZZY_MAX_QUERY_TOKENS][TOKEN_MAX];
+    int wordCount = 0;
+    const char* cursor = query;
+    while (wordCount < FUZZY_MAX_QUERY_TOKENS && nextToken(&cursor, words[wordCount])) {
+        wordCount++;
+    }
+    if (wordCount == 0) {
+        return 0;
+    }
+    
+    // best[id * wordCount + w]: best distance + 1 of query word w in title id
+    unsigned char* best = (unsigned char*)calloc((size_t)pl->searchNextId * wordCount, 1);
+    if (!best) {
+        return 0;
+    }
+    for (int w = 0; w < wordCount; w++) {
+        int length = (int)strlen(words[w]);
+        bkSearch(pl->tokenRoot, words[w], length, fuzzyBudget(length), best + w, wordCount);
+    }
+    
+    int k = (results && limit > 0) ? offset + limit : 0;
+    SearchMatch* heap = NULL;
+    if (k > 0) {
+        heap = (SearchMatch*)malloc((size_t)k * sizeof(SearchMatch));
+        if (!heap) {
+            free(best);
+            return 0;
+        }
+    }
+    int heapSize = 0;
+    int total = 0;
+    
+    for (uint32_t id = 0; id < pl->searchNextId; id++) {
+        Node* node = pl->searchNodes[id];
+        if (!node) {
+            continue; // Tombstone
+        }
+        const unsigned char* slots = best + (size_t)id * wordCount;
+        int cost = 0;
+        int w;
+        for (w = 0; w < wordCount && slots[w]; w++) {
+            cost += slots[w] - 1;
+        }
+        if (w < wordCount) {
+            continue;
+        }
+        
+        total++;
+        if (k > 0) {
+            SearchMatch match;
+            match.node = node;
+            match.tier = cost;
+            match.position = 0;
+            match.length = (int)strlen(node->songName);
+            match.order = id;
+            heapOffer(heap, &heapSize, k, &match);
+        }
+    }
+    free(best);
+    
+    int written = emitMatches(heap, heapSize, offset, results);
+    free(heap);
+    if (outTotal) {
+        *outTotal = total;
+    }
+    return written;
+}
+
+// In-order walk of the ranking that skips whole subtrees by count;
+// favoritesOnly restricts the walk to favorites, otherwise it stops at
+// the first song that was never played
+static void rankCollect(Playlist* pl, uint32_t slot, int favoritesOnly, int* skip, int* remaining,
+                        SongRecord* results, int* written) {
+    if (!slot || *remaining == 0) {
+        return;
+    }
+    const RankNode* rank = &pl->rankNodes[slot];
+    uint32_t count = favoritesOnly ? rank->favorites : rank->size;
+    if (count == 0) {
+        return;
+    }
+    if ((uint32_t)*skip >= count) {
+        *skip -= (int)count;
+        return;
+    }
+    
+    rankCollect(pl, rank->left, favoritesOnly, skip, remaining, results, written);
+    if (*remaining == 0) {
+        return;
+    }
+    if (!favoritesOnly && rank->playCount <= 0) {
+        *remaining = 0;
+        return;
+    }
+    if (!favoritesOnly || rank->isFavorite) {
+        if (*skip > 0) {
+            (*skip)--;
+        } else {
+            fillRecord(rank->song, &results[(*written)++], -1);
+            (*remaining)--;
+        }
+    }
+    rankCollect(pl, rank->right, favoritesOnly, skip, remaining, results, written);
+}
+
+// Most played songs, highest playCount first (ties: first to reach it)
+// Fills up to limit records (position is -1) starting at offset; songs
+// that were never played are not included
+// Returns the number of records written
+static int topPlayedLocked(Playlist* pl, int offset, int limit, SongRecord* results) {
+    if (!results || offset < 0 || limit <= 0) {
+        return 0;
+    }
+    int written = 0;
+    rankCollect(pl, pl->rankRoot, 0, &offset, &limit, results, &written);
+    return written;
+}
+
+// A page of favorites in ranking order (most played first)
+// outTotal (optional) receives the number of favorites
+// Returns the number of records written
+static int favoritesPageLocked(Playlist* pl, int offset, int limit, SongRecord* results, int* outTotal) {
+    if (outTotal) {
+        *outTotal = (int)rankFavorites(pl, pl->rankRoot);
+    }
+    if (!results || offset < 0 || limit <= 0) {
+        return 0;
+    }
+    int written = 0;
+    rankCollect(pl, pl->rankRoot, 1, &offset, &limit, results, &written);
+    return written;
+}
+
+// Number of favorite songs (O(1))
+static int getFavoriteCountLocked(Playlist* pl) {
+    return (int)rankFavorites(pl, pl->rankRoot);
+}
+
+// Competition rank of a song by playCount: 1 + number of songs with
+// strictly more plays (O(log n)); 0 if the song is not in the playlist
+static int getPlayRankLocked(Playlist* pl, const char* songName) {
+    if (!songName) {
+        return 0;
+    }
+    Node* node = indexFind(pl, songName);
+    if (!node) {
+        return 0;
+    }
+    
+    int above = 0;
+    uint32_t slot = pl->rankRoot;
+    while (slot) {
+        if (pl->rankNodes[slot].playCount > node->playCount) {
+            above += 1 + (int)rankSize(pl, pl->rankNodes[slot].left);
+            slot = pl->rankNodes[slot].right;
+        } else {
+            slot = pl->rankNodes[slot].left;
+        }
+    }
+    return above + 1;
+}
+
+// Search for a song and return info string
+static char* searchSongLocked(Playlist* pl, const char* songName) {
+    if (!songName || !pl->head) {
+        return NULL;
+    }
+    
+    Node* temp = indexFind(pl, songName);
+    if (!temp) {
+        return NULL; // Song not found
+    }
+    
+    // Format: "Title (Plays: X, Favorite: Yes/No)"
+    char* result = (char*)malloc(512);
+    if (result) {
+        snprintf(result, 511, "%s (Plays: %d, Favorite: %s)", 
+                temp->songName, temp->playCount,
+                temp->isFavorite ? "Yes" : "No");
+        result[511] = '\0';
+    }
+    return result;
+}
+
+// Display entire playlist (returns array of strings)
+static char** displayPlaylistLocked(Playlist* pl, int* outCount) {
+    *outCount = 0;
+    if (!pl->head) {
+        return NULL;
+    }
+    
+    char** result = (char**)malloc(pl->listSize * sizeof(char*));
+    if (!result) {
+        return NULL;
+    }
+    
+    Node* temp = pl->head;
+    int index = 0;
+    do {
+        result[index] = (char*)malloc(256);
+        if (result[index]) {
+            strncpy(result[index], temp->songName, 255);
+            result[index][255] = '\0';
+        }
+        index++;
+        temp = temp->next;
+    } while (temp != pl->head);
+    
+    *outCount = pl->listSize;
+    return result;
+}
+
+// Display favorites only
+static char** displayFavoritesLocked(Playlist* pl, int* outCount) {
+    *outCount = 0;
+    if (!pl->head) {
+        return NULL;
+    }
+    
+    // First pass: count favorites
+    int favCount = 0;
+    Node* temp = pl->head;
+    do {
+        if (temp->isFavorite) {
+            favCount++;
+        }
+        temp = temp->next;
+    } while (temp != pl->head);
+    
+    if (favCount == 0) {
+        return NULL;
+    }
+    
+    // Second pass: allocate and fill
+    char** result = (char**)malloc(favCount * sizeof(char*));
+    if (!result) {
+        return NULL;
+    }
+    
+    temp = pl->head;
+    int index = 0;
+    do {
+        if (temp->isFavorite) {
+            result[index] = (char*)malloc(256);
+            if (result[index]) {
+                strncpy(result[index], temp->songName, 255);
+                result[index][255] = '\0';
+            }
+            index++;
+        }
+        temp = temp->next;
+    } while (temp != pl->head);
+    
+    *outCount = favCount;
+    return result;
+}
+
+// Number of songs in the playlist (lock-free unless the journal is shared)
+int getPlaylistSize(Playlist* pl) {
+    if (__atomic_load_n(&pl->journalShared, __ATOMIC_ACQUIRE)) {
+        beginRead(pl);
+        int size = pl->listSize;
+        endRead(pl);
+        return size;
+    }
+    return __atomic_load_n(&pl->listSize, __ATOMIC_ACQUIRE);
+}
+
+// Fill a caller-supplied array with every song record in one pass (O(n))
+// Returns the number of records written (at most capacity)
+static int snapshotPlaylistLocked(Playlist* pl, SongRecord* records, int capacity) {
+    if (!records || capacity <= 0 || !pl->head) {
+        return 0;
+    }
+    
+    Node* temp = pl->head;
+    int index = 0;
+    do {
+        fillRecord(temp, &records[index], index);
+        index++;
+        temp = temp->next;
+    } while (temp != pl->head && index < capacity);
+    
+    return index;
+}
+
+// Copy up to limit songs starting at a 0-based list position
+// (O(log n + limit)); each record's position is its list position
+// Returns the number of records written
+static int getRangeLocked(Playlist* pl, int offset, int limit, SongRecord* records) {
+    if (!records || offset < 0 || limit <= 0 || offset >= pl->listSize) {
+        return 0;
+    }
+    
+    Node* temp = pl->searchNodes[positionFind(pl, (uint32_t)offset)];
+    if (!temp) {
+        return 0;
+    }
+    int count = 0;
+    while (count < limit && offset + count < pl->listSize) {
+        fillRecord(temp, &records[count], offset + count);
+        count++;
+        temp = temp->next;
+    }
+    return count;
+}
+
+// 0-based list position of a song (O(log n)); -1 if not found
+static int getSongPositionLocked(Playlist* pl, const char* songName) {
+    if (!songName) {
+        return -1;
+    }
+    Node* node = indexFind(pl, songName);
+    if (!node || node->searchId == SEARCH_NO_ID) {
+        return -1;
+    }
+    return (int)positionPrefix(pl, node->searchId);
+}
+
+// Export names (all, or favorites only) as one contiguous buffer plus
+// an offsets array, in two allocations regardless of playlist size
+// Returns the number of names; out is zeroed when there are none
+static int exportNamesLocked(Playlist* pl, int favoritesOnly, NameBuffer* out) {
+    if (!out) {
+        return 0;
+    }
+    memset(out, 0, sizeof(*out));
+    if (!pl->head) {
+        return 0;
+    }
+    
+    // First pass: count names and bytes
+    int count = 0;
+    size_t size = 0;
+    Node* temp = pl->head;
+    do {
+        if (!favoritesOnly || temp->isFavorite) {
+            count++;
+            size += strlen(temp->songName) + 1;
+        }
+        temp = temp->next;
+    } while (temp != pl->head);
+    
+    if (count == 0) {
+        return 0;
+    }
+    
+    char* data = (char*)malloc(size);
+    uint32_t* offsets = (uint32_t*)malloc((size_t)(count + 1) * sizeof(uint32_t));
+    if (!data || !offsets) {
+        free(data);
+        free(offsets);
+        return 0;
+    }
+    
+    // Second pass: pack names back to back
+    size_t offset = 0;
+    int index = 0;
+    temp = pl->head;
+    do {
+        if (!favoritesOnly || temp->isFavorite) {
+            size_t len = strlen(temp->songName) + 1;
+            offsets[index++] = (uint32_t)offset;
+            memcpy(data + offset, temp->songName, len);
+            offset += len;
+        }
+        temp = temp->next;
+    } while (temp != pl->head);
+    offsets[count] = (uint32_t)offset;
+    
+    out->data = data;
+    out->size = size;
+    out->offsets = offsets;
+    out->count = count;
+    return count;
+}
+
+// Free a buffer filled by exportNames
+void freeNameBuffer(NameBuffer* buffer) {
+    if (!buffer) {
+        return;
+    }
+    free(buffer->data);
+    free(buffer->offsets);
+    memset(buffer, 0, sizeof(*buffer));
+}
+
+// Bytes held by the playlist: node slabs, name arena, hash, search and rank indexes
+static size_t getMemoryUsageLocked(Playlist* pl) {
+    return pl->slabCount * sizeof(Slab) +
+           pl->arenaBlockCount * sizeof(ArenaBlock) +
+           pl->bucketCount * sizeof(Node*) +
+           pl->trigramSlots * sizeof(TrigramSlot) + pl->postingIdBytes +
+           (size_t)pl->searchCapacity * (sizeof(Node*) + sizeof(uint32_t)) +
+           pl->tokenBucketCount * sizeof(Token*) + pl->tokenBytes +
+           (size_t)pl->rankCapacity * sizeof(RankNode);
+}
+
+// Current mutation generation (lock-free unless the journal is shared)
+unsigned long getGeneration(Playlist* pl) {
+    if (__atomic_load_n(&pl->journalShared, __ATOMIC_ACQUIRE)) {
+        beginRead(pl);
+        unsigned long generation = pl->generation;
+        endRead(pl);
+        return generation;
+    }
+    return __atomic_load_n(&pl->generation, __ATOMIC_ACQUIRE);
+}
+
+// Build "<filename>.<pid>.<n>.tmp" (caller frees); unique per save so
+// concurrent saves of the same file (saves only take the read lock)
+// never write into each other's temp file
+static char* tempPathFor(const char* filename) {
+    static unsigned int tempCounter = 0;
+    unsigned int n = __atomic_add_fetch(&tempCounter, 1, __ATOMIC_RELAXED);
+#ifndef _WIN32
+    long pid = (long)getpid();
+#else
+    long pid = (long)_getpid();
+#endif
+    size_t size = strlen(filename) + 48;
+    char* tempFilename = (char*)malloc(size);
+    if (tempFilename) {
+        snprintf(tempFilename, size, "%s.%ld.%u.tmp", filename, pid, n);
+    }
+    return tempFilename;
+}
+
+// Flush, sync to disk and close a file
+// Returns 1 on success, 0 on failure
+static int closeDurably(FILE* file) {
+    int ok = fflush(file) == 0;
+#ifndef _WIN32
+    if (ok && fsync(fileno(file)) != 0) {
+        ok = 0;
+    }
+#else
+    if (ok && _commit(_fileno(file)) != 0) {
+        ok = 0;
+    }
+#endif
+    if (fclose(file) != 0) {
+        ok = 0;
+    }
+    return ok;
+}
+
+// Move a fully written temp file over filename (atomic on POSIX)
+// Returns 1 on success, 0 on failure (the temp file is removed)
+static int replaceFile(const char* tempFilename, const char* filename) {
+#ifdef _WIN32
+    remove(filename);
+#endif
+    if (rename(tempFilename, filename) != 0) {
+        remove(tempFilename);
+        return 0;
+    }
+    return 1;
+}
+
+// Save playlist to file (CSV format)
+// Written to a temp file and renamed into place, so a crash
+// mid-write never leaves a half file
+// Returns 1 on success, 0 on failure
+static int savePlaylistToFileLocked(Playlist* pl, const char* filename) {
+    if (!filename) {
+        return 0;
+    }
+    
+    char* tempFilename = tempPathFor(filename);
+    if (!tempFilename) {
+        return 0;
+    }
+    
+    FILE* file = fopen(tempFilename, "w");
+    if (!file) {
+        free(tempFilename);
+        return 0;
+    }
+    
+    Node* temp = pl->head;
+    if (temp) {
+        do {
+            fprintf(file, "%s,%d,%d\n", temp->songName, temp->playCount, temp->isFavorite);
+            temp = temp->next;
+        } while (temp != pl->head);
+    }
+    
+    int ok = !ferror(file);
+    if (!closeDurably(file)) {
+        ok = 0;
+    }
+    if (ok) {
+        ok = replaceFile(tempFilename, filename);
+    } else {
+        remove(tempFilename);
+    }
+    free(tempFilename);
+    return ok;
+}
+
+// Load playlist from file
+static void loadPlaylistFromFileLocked(Playlist* pl, const char* filename) {
+    if (!filename) {
+        return;
+    }
+    
+    FILE* file = fopen(filename, "r");
+    if (!file) {
+        return;
+    }
+    
+    char line[512];
+    while (fgets(line, sizeof(line), file)) {
+        // Parse CSV: song,playcount,isfavorite
+        char songName[256];
+        int playCount = 0;
+        int isFavorite = 0;
+        
+        if (sscanf(line, "%255[^,],%d,%d", songName, &playCount, &isFavorite) == 3) {
+            // Add song if not exists, otherwise update its stats
+            upsertSong(pl, songName, playCount, isFavorite);
+        }
+    }
+    
+    fclose(file);
+}
+
+// Binary format layout: header, fixed-size records, string table
+#define BINARY_MAGIC "PLBN"
+#define BINARY_VERSION 1
+
+typedef struct BinaryHeader {
+    char magic[4];              // "PLBN"
+    uint32_t version;
+    uint32_t recordCount;
+    uint32_t stringTableSize;   // bytes, names are NUL-terminated
+    uint32_t checksum;          // FNV-1a over records + string table
+    uint32_t reserved;
+} BinaryHeader;
+
+typedef struct BinaryRecord {
+    uint32_t nameOffset;        // into the string table
+    uint32_t nameLength;        // excluding the NUL terminator
+    int32_t playCount;
+    int32_t isFavorite;
+} BinaryRecord;
+
+// 32-bit FNV-1a over a byte range
+static uint32_t checksumBytes(const unsigned char* data, size_t size) {
+    uint32_t hash = 2166136261u;
+    for (size_t i = 0; i < size; i++) {
+        hash ^= data[i];
+        hash *= 16777619u;
+    }
+    return hash;
+}
+
+// Map a whole file read-only (falls back to reading it on Windows)
+static unsigned char* mapFile(const char* filename, size_t* outSize) {
+    *outSize = 0;
+#ifndef _WIN32
+    int fd = open(filename, O_RDONLY);
+    if (fd < 0) {
+        return NULL;
+    }
+    
+    struct stat st;
+    if (fstat(fd, &st) != 0 || st.st_size <= 0) {
+        close(fd);
+        return NULL;
+    }
+    
+    void* data = mmap(NULL, (size_t)st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+    close(fd);
+    if (data == MAP_FAILED) {
+        return NULL;
+    }
+    
+    *outSize = (size_t)st.st_size;
+    return (unsigned char*)data;
+#else
+    FILE* file = fopen(filename, "rb");
+    if (!file) {
+        return NULL;
+    }
+    
+    fseek(file, 0, SEEK_END);
+    long size = ftell(file);
+    fseek(file, 0, SEEK_SET);
+    if (size <= 0) {
+        fclose(file);
+        return NULL;
+    }
+    
+    unsigned char* data = (unsigned char*)malloc((size_t)size);
+    if (data && fread(data, 1, (size_t)size, file) != (size_t)size) {
+        free(data);
+        data = NULL;
+    }
+    fclose(file);
+    
+    if (data) {
+        *outSize = (size_t)size;
+    }
+    return data;
+#endif
+}
+
+static void unmapFile(unsigned char* data, size_t size) {
+#ifndef _WIN32
+    munmap(data, size);
+#else
+    (void)size;
+    free(data);
+#endif
+}
+
+// Save playlist to a versioned binary file (O(n), single write)
+// Written to a temp file and renamed into place
+// Returns 1 on success, 0 on failure
+static int savePlaylistBinaryLocked(Playlist* pl, const char* filename) {
+    if (!filename) {
+        return 0;
+    }
+    
+    // First pass: size the string table
+    size_t stringTableSize = 0;
+    Node* temp = pl->head;
+    if (temp) {
+        do {
+            stringTableSize += strlen(temp->songName) + 1;
+            temp = temp->next;
+        } while (temp != pl->head);
+    }
+    
+    size_t recordsSize = (size_t)pl->listSize * sizeof(BinaryRecord);
+    size_t totalSize = sizeof(BinaryHeader) + recordsSize + stringTableSize;
+    unsigned char* buffer = (unsigned char*)calloc(1, totalSize);
+    if (!buffer) {
+        return 0;
+    }
+    
+    BinaryHeader* header = (BinaryHeader*)buffer;
+    BinaryRecord* records = (BinaryRecord*)(buffer + sizeof(BinaryHeader));
+    char* strings = (char*)(buffer + sizeof(BinaryHeader) + recordsSize);
+    
+    // Second pass: fill records and string table
+    uint32_t offset = 0;
+    int index = 0;
+    temp = pl->head;
+    if (temp) {
+        do {
+            size_t len = strlen(temp->songName);
+            records[index].nameOffset = offset;
+            records[index].nameLength = (uint32_t)len;
+            records[index].playCount = temp->playCount;
+            records[index].isFavorite = temp->isFavorite;
+            memcpy(strings + offset, temp->songName, len + 1);
+            offset += (uint32_t)(len + 1);
+            index++;
+            temp = temp->next;
+        } while (temp != pl->head);
+    }
+    
+    memcpy(header->magic, BINARY_MAGIC, 4);
+    header->version = BINARY_VERSION;
+    header->recordCount = (uint32_t)pl->listSize;
+    header->stringTableSize = (uint32_t)stringTableSize;
+    header->checksum = checksumBytes(buffer + sizeof(BinaryHeader), recordsSize + stringTableSize);
+    
+    // Write to a temp file and rename into place
+    char* tempFilename = tempPathFor(filename);
+    FILE* file = tempFilename ? fopen(tempFilename, "wb") : NULL;
+    if (!file) {
+        free(tempFilename);
+        free(buffer);
+        return 0;
+    }
+    
+    int ok = fwrite(buffer, 1, totalSize, file) == totalSize;
+    if (!closeDurably(file)) {
+        ok = 0;
+    }
+    if (ok) {
+        ok = replaceFile(tempFilename, filename);
+    } else {
+        remove(tempFilename);
+    }
+    
+    free(tempFilename);
+    free(buffer);
+    return ok;
+}
+
+// Load playlist from a binary file via mmap (no per-line parsing)
+// Returns 1 on success, 0 if the file is missing, truncated or corrupt
+static int loadPlaylistBinaryLocked(Playlist* pl, const char* filename) {
+    if (!filename) {
+        return 0;
+    }
+    
+    size_t size = 0;
+    unsigned char* data = mapFile(filename, &size);
+    if (!data) {
+        return 0;
+    }
+    
+    // Validate header, sizes and checksum before touching the list
+    const BinaryHeader* header = (const BinaryHeader*)data;
+    if (size < sizeof(BinaryHeader) ||
+        memcmp(header->magic, BINARY_MAGIC, 4) != 0 ||
+        header->version != BINARY_VERSION ||
+        (uint64_t)sizeof(BinaryHeader) + (uint64_t)header->recordCount * sizeof(BinaryRecord) +
+            header->stringTableSize != (uint64_t)size) {
+        unmapFile(data, size);
+        return 0;
+    }
+    
+    size_t recordsSize = (size_t)header->recordCount * sizeof(BinaryRecord);
+    const BinaryRecord* records = (const BinaryRecord*)(data + sizeof(BinaryHeader));
+    const char* strings = (const char*)(data + sizeof(BinaryHeader) + recordsSize);
+    
+    if (checksumBytes(data + sizeof(BinaryHeader), recordsSize + header->stringTableSize) != header->checksum) {
+        unmapFile(data, size);
+        return 0;
+    }
+    
+    for (uint32_t i = 0; i < header->recordCount; i++) {
+        const BinaryRecord* record = &records[i];
+        if ((uint64_t)record->nameOffset + record->nameLength >= header->stringTableSize ||
+            strings[record->nameOffset + record->nameLength] != '\0') {
+            unmapFile(data, size);
+            return 0;
+        }
+    }
+    
+    // Build list and index straight from the mapped records
+    indexReserve(pl, (size_t)pl->listSize + header->recordCount);
+    for (uint32_t i = 0; i < header->recordCount; i++) {
+        upsertSong(pl, strings + records[i].nameOffset, records[i].playCount, records[i].isFavorite);
+    }
+    
+    unmapFile(data, size);
+    return 1;
+}
+
+// Append-only journal: small fixed-header records appended on every
+// mutation so callers don't have to rewrite the whole snapshot
+typedef struct JournalRecord {
+    uint8_t op;                 // JOURNAL_ADD / _DELETE / _STATS / _CLEAR
+    uint8_t reserved;
+    uint16_t nameLength;        // name bytes follow the record
+    int32_t playCount;
+    int32_t isFavorite;
+    uint32_t checksum;          // FNV-1a over the fields above + name
+} JournalRecord;
+
+static uint32_t journalChecksum(const JournalRecord* record, const char* songName) {
+    JournalRecord copy = *record;
+    copy.checksum = 0;
+    uint32_t hash = checksumBytes((const unsigned char*)&copy, sizeof(copy));
+    for (uint16_t i = 0; i < record->nameLength; i++) {
+        hash ^= (unsigned char)songName[i];
+        hash *= 16777619u;
+    }
+    return hash;
+}
+
+static void journalAppend(Playlist* pl, int op, const char* songName, int playCount, int isFavorite) {
+    if (!pl->journalFile || pl->journalReplaying) {
+        return;
+    }
+    
+    JournalRecord record;
+    memset(&record, 0, sizeof(record));
+    record.op = (uint8_t)op;
+    record.nameLength = (uint16_t)strlen(songName);
+    record.playCount = playCount;
+    record.isFavorite = isFavorite;
+    record.checksum = journalChecksum(&record, songName);
+    
+    fwrite(&record, sizeof(record), 1, pl->journalFile);
+    fwrite(songName, 1, record.nameLength, pl->journalFile);
+    fflush(pl->journalFile);
+    
+    // Writers hold the file lock and synced first, so this is the new end
+    pl->journalApplied += (long)(sizeof(record) + record.nameLength);
+}
+
+// Apply journal records from file's current position
+// Stops at the first torn or corrupt record (e.g. a crash mid-append)
+// and leaves outEnd at the end of the last good record
+// Returns the number of records applied
+static int journalApply(Playlist* pl, FILE* file, long* outEnd) {
+    pl->journalReplaying = 1;
+    int applied = 0;
+    long end = ftell(file);
+    JournalRecord record;
+    char songName[256];
+    while (fread(&record, sizeof(record), 1, file) == 1) {
+        if (record.nameLength > 255 ||
+            fread(songName, 1, record.nameLength, file) != record.nameLength ||
+            journalChecksum(&record, songName) != record.checksum) {
+            break;
+        }
+        songName[record.nameLength] = '\0';
+    
+        if (record.op == JOURNAL_ADD) {
+            if (!indexFind(pl, songName)) {
+                upsertSong(pl, songName, 0, 0);
+            }
+        } else if (record.op == JOURNAL_DELETE) {
+            deleteSongLocked(pl, songName);
+        } else if (record.op == JOURNAL_STATS) {
+            upsertSong(pl, songName, record.playCount, record.isFavorite);
+        } else if (record.op == JOURNAL_CLEAR) {
+            cleanupPlaylistLocked(pl);
+        } else {
+            break;
+        }
+        applied++;
+        end = ftell(file);
+    }
+    pl->journalReplaying = 0;
+    
+    if (outEnd) {
+        *outEnd = end;
+    }
+    return applied;
+}
+
+static int setPath(char** target, const char* path) {
+    free(*target);
+    *target = (char*)malloc(strlen(path) + 1);
+    if (!*target) {
+        return 0;
+    }
+    strcpy(*target, path);
+    return 1;
+}
+
+// Start appending mutations to a journal file (created if missing)
+// Returns 1 on success, 0 on failure
+static int journalOpenLocked(Playlist* pl, const char* filename) {
+    if (!filename) {
+        return 0;
+    }
+    
+    journalCloseLocked(pl);
+    pl->journalFile = fopen(filename, "ab");
+    if (!pl->journalFile) {
+        return 0;
+    }
+    setPath(&pl->journalPath, filename);
+    pl->journalApplied = ftell(pl->journalFile);
+    return 1;
+}
+
+// Stop journaling
+static void journalCloseLocked(Playlist* pl) {
+    if (pl->journalFile) {
+        fclose(pl->journalFile);
+        pl->journalFile = NULL;
+    }
+    free(pl->journalPath);
+    pl->journalPath = NULL;
+#ifndef _WIN32
+    if (pl->journalLockFd >= 0) {
+        close(pl->journalLockFd);
+    }
+#endif
+    pl->journalLockFd = -1;
+    __atomic_store_n(&pl->journalShared, 0, __ATOMIC_RELEASE);
+    pl->journalApplied = 0;
+    pl->journalInode = 0;
+    free(pl->snapshotPath);
+    pl->snapshotPath = NULL;
+}
+
+// Bytes currently in the open journal (0 if journaling is off)
+static long journalSizeLocked(Playlist* pl) {
+    if (!pl->journalFile) {
+        return 0;
+    }
+    return pl->journalShared ? pl->journalApplied : ftell(pl->journalFile);
+}
+
+// Apply a journal to the current playlist
+// Stops at the first torn or corrupt record (e.g. a crash mid-append)
+// Returns the number of records applied, or -1 if the file can't be opened
+static int journalReplayLocked(Playlist* pl, const char* filename) {
+    if (!filename) {
+        return -1;
+    }
+    
+    FILE* file = fopen(filename, "rb");
+    if (!file) {
+        return -1;
+    }
+    int applied = journalApply(pl, file, NULL);
+    fclose(file);
+    return applied;
+}
+
+// Shared journal mode (POSIX only): any number of handles, in one or
+// many processes, open the same snapshot + journal. The journal is the
+// source of truth; a flock() on "<journal>.lock" serializes writers
+// across processes. Before each call a handle applies the records other
+// handles appended since its last call, and writers append while still
+// holding the exclusive lock, so no update is lost and no save clobbers
+// another. Compaction replaces the journal file (a new inode), which
+// tells the other handles to reload the snapshot.
+#ifndef _WIN32
+
+static void journalLockFile(Playlist* pl, int exclusive) {
+    while (flock(pl->journalLockFd, exclusive ? LOCK_EX : LOCK_SH) != 0 && errno == EINTR) {
+        // Interrupted by a signal: retry
+    }
+}
+
+static void journalUnlockFile(Playlist* pl) {
+    flock(pl->journalLockFd, LOCK_UN);
+}
+
+// Whether other handles changed the journal since our last sync
+// Cheap (one stat), safe under the read lock
+static int journalStale(Playlist* pl) {
+    struct stat pathStat;
+    if (!pl->journalShared || stat(pl->journalPath, &pathStat) != 0) {
+        return 0;
+    }
+    return (uint64_t)pathStat.st_ino != pl->journalInode || (long)pathStat.st_size != pl->journalApplied;
+}
+
+// Catch up with the shared journal; caller holds the write lock and the
+// file lock (exclusive if it is about to append)
+static void journalSync(Playlist* pl, int exclusive) {
+    struct stat pathStat;
+    if (!pl->journalShared || stat(pl->journalPath, &pathStat) != 0) {
+        return;
+    }
+    
+    if ((uint64_t)pathStat.st_ino != pl->journalInode) {
+        // Compacted by another handle: rebuild from the new snapshot
+        FILE* reopened = freopen(pl->journalPath, "ab", pl->journalFile);
+        pl->journalFile = reopened;
+        if (!reopened) {
+            __atomic_store_n(&pl->journalShared, 0, __ATOMIC_RELEASE);
+            return;
+        }
+        pl->journalInode = (uint64_t)pathStat.st_ino;
+        pl->journalApplied = 0;
+    
+        cleanupPlaylistLocked(pl);
+        pl->journalReplaying = 1;
+        loadPlaylistBinaryLocked(pl, pl->snapshotPath);
+        pl->journalReplaying = 0;
+    }
+    
+    if ((long)pathStat.st_size > pl->journalApplied) {
+        FILE* file = fopen(pl->journalPath, "rb");
+        if (file) {
+            if (fseek(file, pl->journalApplied, SEEK_SET) == 0) {
+                journalApply(pl, file, &pl->journalApplied);
+            }
+            fclose(file);
+        }
+        
+        // A writer that crashed mid-append left a torn record: drop it
+        // before appending, or every later record would be unreadable
+        if (exclusive && (long)pathStat.st_size > pl->journalApplied &&
+            ftruncate(fileno(pl->journalFile), pl->journalApplied) != 0) {
+            __atomic_store_n(&pl->journalShared, 0, __ATOMIC_RELEASE);
+        }
+    }
+}
+
+// Open snapshotFilename + filename in shared mode: load the snapshot,
+// replay the journal and keep following it
+// Returns the number of journal records replayed, or -1 on failure
+static int journalOpenSharedLocked(Playlist* pl, const char* snapshotFilename, const char* filename) {
+    if (!snapshotFilename || !filename) {
+        return -1;
+    }
+    
+    journalCloseLocked(pl);
+    size_t lockSize = strlen(filename) + 6;
+    char* lockPath = (char*)malloc(lockSize);
+    if (!lockPath) {
+        return -1;
+    }
+    snprintf(lockPath, lockSize, "%s.lock", filename);
+    pl->journalLockFd = open(lockPath, O_RDWR | O_CREAT | O_CLOEXEC, 0644);
+    free(lockPath);
+    if (pl->journalLockFd < 0 ||
+        !setPath(&pl->journalPath, filename) || !setPath(&pl->snapshotPath, snapshotFilename)) {
+        journalCloseLocked(pl);
+        return -1;
+    }
+    
+    journalLockFile(pl, 1);
+    pl->journalFile = fopen(filename, "ab");
+    struct stat fileStat;
+    if (!pl->journalFile || fstat(fileno(pl->journalFile), &fileStat) != 0) {
+        journalUnlockFile(pl);
+        journalCloseLocked(pl);
+        return -1;
+    }
+    __atomic_store_n(&pl->journalShared, 1, __ATOMIC_RELEASE);
+    pl->journalInode = (uint64_t)fileStat.st_ino;
+    
+    cleanupPlaylistLocked(pl);
+    pl->journalReplaying = 1;
+    loadPlaylistBinaryLocked(pl, snapshotFilename);
+    pl->journalReplaying = 0;
+    
+    int applied = 0;
+    FILE* file = fopen(filename, "rb");
+    if (file) {
+        applied = journalApply(pl, file, &pl->journalApplied);
+        fclose(file);
+    }
+    journalUnlockFile(pl);
+    return applied;
+}
+
+#else
+
+static void journalLockFile(Playlist* pl, int exclusive) {
+    (void)pl;
+    (void)exclusive;
+}
+
+static void journalUnlockFile(Playlist* pl) {
+    (void)pl;
+}
+
+static int journalStale(Playlist* pl) {
+    (void)pl;
+    return 0;
+}
+
+static void journalSync(Playlist* pl, int exclusive) {
+    (void)pl;
+    (void)exclusive;
+}
+
+static int journalOpenSharedLocked(Playlist* pl, const char* snapshotFilename, const char* filename) {
+    (void)pl;
+    (void)snapshotFilename;
+    (void)filename;
+    return -1;
+}
+
+#endif
+
+// Write the playlist to a binary snapshot and empty the open journal
+// The snapshot save is atomic, so the journal is only truncated once
+// the new snapshot is in place and a crash never loses mutations
+// Returns 1 on success, 0 on failure
+static int journalCompactLocked(Playlist* pl, const char* snapshotFilename) {
+    if (!snapshotFilename || !pl->journalFile || !pl->journalPath) {
+        return 0;
+    }
+    
+    if (!savePlaylistBinaryLocked(pl, snapshotFilename)) {
+        return 0;
+    }
+    
+    if (!pl->journalShared) {
+        // Snapshot is in place: start a fresh journal
+        FILE* truncated = freopen(pl->journalPath, "wb", pl->journalFile);
+        pl->journalFile = truncated;
+        return truncated != NULL;
+    }
+    
+#ifndef _WIN32
+    // Other handles may hold offsets into the old journal: replace it
+    // with an empty file so they notice (new inode) and reload
+    char* tempFilename = tempPathFor(pl->journalPath);
+    FILE* fresh = tempFilename ? fopen(tempFilename, "wb") : NULL;
+    if (!fresh) {
+        free(tempFilename);
+        return 0;
+    }
+    struct stat fileStat;
+    int ok = fstat(fileno(fresh), &fileStat) == 0 && closeDurably(fresh) &&
+             replaceFile(tempFilename, pl->journalPath);
+    free(tempFilename);
+    if (!ok) {
+        return 0;
+    }
+    
+    FILE* reopened = freopen(pl->journalPath, "ab", pl->journalFile);
+    pl->journalFile = reopened;
+    pl->journalInode = (uint64_t)fileStat.st_ino;
+    pl->journalApplied = 0;
+    return reopened != NULL;
+#else
+    return 0;
+#endif
+}
+
+// Cleanup and free all memory
+static void cleanupPlaylistLocked(Playlist* pl) {
+    indexClear(pl);
+    searchClear(pl);
+    rankClear(pl);
+    poolReset(pl);
+    if (!pl->head) {
+        return;
+    }
+    bumpGeneration(pl);
+    
+    pl->head = NULL;
+    pl->tail = NULL;
+    pl->current = NULL;
+    setListSize(pl, 0);
+}
+
+// Free array of strings
+void freeStringArray(char** array, int count) {
+    if (!array) {
+        return;
+    }
+    
+    for (int i = 0; i < count; i++) {
+        if (array[i]) {
+            free(array[i]);
+        }
+    }
+    free(array);
+}
+
+// Free a single string
+void freeString(char* s) {
+    if (s) {
+        free(s);
+    }
+}
+
+// Thread safety: every exported operation locks its playlist. Readers
+// (searches, listings, snapshots, saves, memory/journal size) share a
+// reader-writer lock and run in parallel; writers (adds, deletes, plays,
+// loads, journal changes, cleanup) are exclusive. getPlaylistSize and
+// getGeneration read atomics without locking. Separate handles never
+// contend. playlist_create/playlist_destroy must not race with other
+// calls on the same handle.
+//
+// With a shared journal, readers first catch up with records other
+// handles appended (briefly taking the write lock if there are any),
+// and writers also hold the exclusive file lock for the whole call.
+
+static void beginRead(Playlist* pl) {
+    readLock(pl);
+    if (journalStale(pl)) {
+        readUnlock(pl);
+        writeLock(pl);
+        if (pl->journalShared) {
+            journalLockFile(pl, 0);
+            journalSync(pl, 0);
+            journalUnlockFile(pl);
+        }
+        writeUnlock(pl);
+        readLock(pl);
+    }
+}
+
+static void endRead(Playlist* pl) {
+    readUnlock(pl);
+}
+
+static void beginWrite(Playlist* pl) {
+    writeLock(pl);
+    if (pl->journalShared) {
+        journalLockFile(pl, 1);
+        journalSync(pl, 1);
+    }
+}
+
+static void endWrite(Playlist* pl) {
+    // journalOpenShared/journalClose may have switched modes mid-call;
+    // unlocking a lock that isn't held is harmless
+    if (pl->journalLockFd >= 0) {
+        journalUnlockFile(pl);
+    }
+    writeUnlock(pl);
+}
+
+// Readers
+char* searchSong(Playlist* pl, const char* songName) {
+    beginRead(pl);
+    char* result = searchSongLocked(pl, songName);
+    endRead(pl);
+    return result;
+}
+
+int searchSongs(Playlist* pl, const char* query, int offset, int limit, SongRecord* results, int* outTotal) {
+    beginRead(pl);
+    int result = searchSongsLocked(pl, query, offset, limit, results, outTotal);
+    endRead(pl);
+    return result;
+}
+
+int fuzzySearchSongs(Playlist* pl, const char* query, int offset, int limit, SongRecord* results, int* outTotal) {
+    beginRead(pl);
+    int result = fuzzySearchSongsLocked(pl, query, offset, limit, results, outTotal);
+    endRead(pl);
+    return result;
+}
+
+int topPlayed(Playlist* pl, int offset, int limit, SongRecord* results) {
+    beginRead(pl);
+    int result = topPlayedLocked(pl, offset, limit, results);
+    endRead(pl);
+    return result;
+}
+
+int favoritesPage(Playlist* pl, int offset, int limit, SongRecord* results, int* outTotal) {
+    beginRead(pl);
+    int result = favoritesPageLocked(pl, offset, limit, results, outTotal);
+    endRead(pl);
+    return result;
+}
+
+int getFavoriteCount(Playlist* pl) {
+    beginRead(pl);
+    int result = getFavoriteCountLocked(pl);
+    endRead(pl);
+    return result;
+}
+
+int getPlayRank(Playlist* pl, const char* songName) {
+    beginRead(pl);
+    int result = getPlayRankLocked(pl, songName);
+    endRead(pl);
+    return result;
+}
+
+int getRange(Playlist* pl, int offset, int limit, SongRecord* records) {
+    beginRead(pl);
+    int result = getRangeLocked(pl, offset, limit, records);
+    endRead(pl);
+    return result;
+}
+
+int getSongPosition(Playlist* pl, const char* songName) {
+    beginRead(pl);
+    int result = getSongPositionLocked(pl, songName);
+    endRead(pl);
+    return result;
+}
+
+char** displayPlaylist(Playlist* pl, int* outCount) {
+    beginRead(pl);
+    char** result = displayPlaylistLocked(pl, outCount);
+    endRead(pl);
+    return result;
+}
+
+char** displayFavorites(Playlist* pl, int* outCount) {
+    beginRead(pl);
+    char** result = displayFavoritesLocked(pl, outCount);
+    endRead(pl);
+    return result;
+}
+
+int savePlaylistToFile(Playlist* pl, const char* filename) {
+    beginRead(pl);
+    int result = savePlaylistToFileLocked(pl, filename);
+    endRead(pl);
+    return result;
+}
+
+int savePlaylistBinary(Playlist* pl, const char* filename) {
+    beginRead(pl);
+    int result = savePlaylistBinaryLocked(pl, filename);
+    endRead(pl);
+    return result;
+}
+
+int snapshotPlaylist(Playlist* pl, SongRecord* records, int capacity) {
+    beginRead(pl);
+    int result = snapshotPlaylistLocked(pl, records, capacity);
+    endRead(pl);
+    return result;
+}
+
+size_t getMemoryUsage(Playlist* pl) {
+    beginRead(pl);
+    size_t result = getMemoryUsageLocked(pl);
+    endRead(pl);
+    return result;
+}
+
+int exportNames(Playlist* pl, int favoritesOnly, NameBuffer* out) {
+    beginRead(pl);
+    int result = exportNamesLocked(pl, favoritesOnly, out);
+    endRead(pl);
+    return result;
+}
+
+long journalSize(Playlist* pl) {
+    beginRead(pl);
+    long result = journalSizeLocked(pl);
+    endRead(pl);
+    return result;
+}
+
+// Writers
+void initializePlaylist(Playlist* pl) {
+    beginWrite(pl);
+    initializePlaylistLocked(pl);
+    endWrite(pl);
+}
+
+int addSong(Playlist* pl, const char* filepath) {
+    beginWrite(pl);
+    int result = addSongLocked(pl, filepath);
+    endWrite(pl);
+    return result;
+}
+
+int deleteSong(Playlist* pl, const char* songName) {
+    beginWrite(pl);
+    int result = deleteSongLocked(pl, songName);
+    endWrite(pl);
+    return result;
+}
+
+int addSongs(Playlist* pl, const char** filepaths, int n, int* results) {
+    beginWrite(pl);
+    int result = addSongsLocked(pl, filepaths, n, results);
+    endWrite(pl);
+    return result;
+}
+
+int deleteSongs(Playlist* pl, const char** songNames, int n, int* results) {
+    beginWrite(pl);
+    int result = deleteSongsLocked(pl, songNames, n, results);
+    endWrite(pl);
+    return result;
+}
+
+char* playSong(Playlist* pl, const char* songName) {
+    beginWrite(pl);
+    char* result = playSongLocked(pl, songName);
+    endWrite(pl);
+    return result;
+}
+
+char* playNext(Playlist* pl) {
+    beginWrite(pl);
+    char* result = playNextLocked(pl);
+    endWrite(pl);
+    return result;
+}
+
+char* playPrevious(Playlist* pl) {
+    beginWrite(pl);
+    char* result = playPreviousLocked(pl);
+    endWrite(pl);
+    return result;
+}
+
+int playSongRecord(Playlist* pl, const char* songName, SongRecord* record) {
+    beginWrite(pl);
+    int result = playSongRecordLocked(pl, songName, record);
+    endWrite(pl);
+    return result;
+}
+
+int playNextRecord(Playlist* pl, SongRecord* record) {
+    beginWrite(pl);
+    int result = playNextRecordLocked(pl, record);
+    endWrite(pl);
+    return result;
+}
+
+int playPreviousRecord(Playlist* pl, SongRecord* record) {
+    beginWrite(pl);
+    int result = playPreviousRecordLocked(pl, record);
+    endWrite(pl);
+    return result;
+}
+
+void loadPlaylistFromFile(Playlist* pl, const char* filename) {
+    beginWrite(pl);
+    loadPlaylistFromFileLocked(pl, filename);
+    endWrite(pl);
+}
+
+int loadPlaylistBinary(Playlist* pl, const char* filename) {
+    beginWrite(pl);
+    int result = loadPlaylistBinaryLocked(pl, filename);
+    endWrite(pl);
+    return result;
+}
+
+int journalOpen(Playlist* pl, const char* filename) {
+    beginWrite(pl);
+    int result = journalOpenLocked(pl, filename);
+    endWrite(pl);
+    return result;
+}
+
+void journalClose(Playlist* pl) {
+    beginWrite(pl);
+    journalCloseLocked(pl);
+    endWrite(pl);
+}
+
+int journalOpenShared(Playlist* pl, const char* snapshotFilename, const char* filename) {
+    beginWrite(pl);
+    int result = journalOpenSharedLocked(pl, snapshotFilename, filename);
+    endWrite(pl);
+    return result;
+}
+
+int journalReplay(Playlist* pl, const char* filename) {
+    beginWrite(pl);
+    int result = journalReplayLocked(pl, filename);
+    endWrite(pl);
+    return result;
+}
+
+int journalCompact(Playlist* pl, const char* snapshotFilename) {
+    beginWrite(pl);
+    int result = journalCompactLocked(pl, snapshotFilename);
+    endWrite(pl);
+    return result;
+}
+
+void cleanupPlaylist(Playlist* pl) {
+    beginWrite(pl);
+    cleanupPlaylistLocked(pl);
+    journalAppend(pl, JOURNAL_CLEAR, "", 0, 0);
+    endWrite(pl);
+}
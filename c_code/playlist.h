@@ -1,34 +1,89 @@
 #ifndef PLAYLIST_H
 #define PLAYLIST_H
 
+#include <stddef.h>
+#include <stdint.h>
+
 #ifdef __cplusplus
 extern "C" {
 #endif
 
 // Node structure for circular doubly linked list
 typedef struct Node {
-    char songName[256];   // safe fixed-length
+    const char* songName; // interned in the string arena (max 255 chars)
     int playCount;
     int isFavorite;       // 0 or 1
     struct Node* next;
     struct Node* prev;
+    struct Node* hashNext; // chain link in the name index
+    uint32_t searchId;    // id in the trigram search index
+    uint32_t rankSlot;    // slot in the play-count ranking (0 = not ranked)
 } Node;
 
-// Exported functions
-void initializePlaylist();
-int addSong(const char* filepath);
-int deleteSong(const char* songName);
-char* playSong(const char* songName);
-char* playNext();
-char* playPrevious();
-char* searchSong(const char* songName);
-char** displayPlaylist(int* outCount);
-char** displayFavorites(int* outCount);
-void savePlaylistToFile(const char* filename);
-void loadPlaylistFromFile(const char* filename);
-void cleanupPlaylist();
+// Fixed-layout song record for bulk snapshots
+typedef struct SongRecord {
+    char songName[256];
+    int playCount;
+    int isFavorite;       // 0 or 1
+    int position;         // 0-based index in playlist order
+} SongRecord;
+
+// Names packed back to back in list order (one allocation each for
+// data and offsets); name i is data[offsets[i]] .. data[offsets[i + 1] - 2]
+typedef struct NameBuffer {
+    char* data;           // NUL-terminated names
+    size_t size;          // bytes in data
+    uint32_t* offsets;    // count + 1 entries
+    int count;
+} NameBuffer;
+
+// Opaque playlist handle; each one is an independent playlist
+typedef struct Playlist Playlist;
+
+// Exported functions (every operation takes a handle from playlist_create)
+Playlist* playlist_create();
+void playlist_destroy(Playlist* pl);
+void initializePlaylist(Playlist* pl);
+int addSong(Playlist* pl, const char* filepath);
+int deleteSong(Playlist* pl, const char* songName);
+int addSongs(Playlist* pl, const char** filepaths, int n, int* results);
+int deleteSongs(Playlist* pl, const char** songNames, int n, int* results);
+char* playSong(Playlist* pl, const char* songName);
+char* playNext(Playlist* pl);
+char* playPrevious(Playlist* pl);
+char* searchSong(Playlist* pl, const char* songName);
+int playSongRecord(Playlist* pl, const char* songName, SongRecord* record);
+int playNextRecord(Playlist* pl, SongRecord* record);
+int playPreviousRecord(Playlist* pl, SongRecord* record);
+int searchSongs(Playlist* pl, const char* query, int offset, int limit, SongRecord* results, int* outTotal);
+int fuzzySearchSongs(Playlist* pl, const char* query, int offset, int limit, SongRecord* results, int* outTotal);
+int topPlayed(Playlist* pl, int offset, int limit, SongRecord* results);
+int favoritesPage(Playlist* pl, int offset, int limit, SongRecord* results, int* outTotal);
+int getFavoriteCount(Playlist* pl);
+int getPlayRank(Playlist* pl, const char* songName);
+int getRange(Playlist* pl, int offset, int limit, SongRecord* records);
+int getSongPosition(Playlist* pl, const char* songName);
+char** displayPlaylist(Playlist* pl, int* outCount);
+char** displayFavorites(Playlist* pl, int* outCount);
+int savePlaylistToFile(Playlist* pl, const char* filename);
+void loadPlaylistFromFile(Playlist* pl, const char* filename);
+int savePlaylistBinary(Playlist* pl, const char* filename);
+int loadPlaylistBinary(Playlist* pl, const char* filename);
+int journalOpen(Playlist* pl, const char* filename);
+int journalOpenShared(Playlist* pl, const char* snapshotFilename, const char* filename);
+void journalClose(Playlist* pl);
+long journalSize(Playlist* pl);
+int journalReplay(Playlist* pl, const char* filename);
+int journalCompact(Playlist* pl, const char* snapshotFilename);
+void cleanupPlaylist(Playlist* pl);
 void freeStringArray(char** array, int count);
 void freeString(char* s);
+int getPlaylistSize(Playlist* pl);
+int snapshotPlaylist(Playlist* pl, SongRecord* records, int capacity);
+unsigned long getGeneration(Playlist* pl);
+size_t getMemoryUsage(Playlist* pl);
+int exportNames(Playlist* pl, int favoritesOnly, NameBuffer* out);
+void freeNameBuffer(NameBuffer* buffer);
 
 #ifdef __cplusplus
 }
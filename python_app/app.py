@@ -8,12 +8,26 @@ import os
 import sys
 from pathlib import Path
 from PIL import Image
-import base64
 import json
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from playlist import PlaylistBackend
+from playlist import PlaylistBackend, song_basename
+from scanner import sync_library
+from watcher import LibraryWatcher, apply_delta
+from covers import CoverCache
+from metadata import MetadataStore
+from streaming import AudioServer, audio_type, is_loopback_host
+from service import PlaylistClient
+
+# Songs shown in the Discover grid and per Playlist/Favorites page
+TRENDY_COUNT = 12
+PLAYLIST_PAGE_SIZE = 50
+FAVORITES_PAGE_SIZE = 24
+
+# When set, the playlist lives in a shared service (python_app/service.py)
+# listening on this socket instead of in this process
+SERVICE_SOCKET = os.environ.get("PLAYLIST_SERVICE_SOCKET")
 
 # Page configuration
 st.set_page_config(
@@ -45,10 +59,29 @@ if 'playlist_initialized' not in st.session_state:
     st.session_state.playlist_initialized = False
 if 'songs_data' not in st.session_state:
     st.session_state.songs_data = {}  # Store play counts and favorites
+if 'song_paths' not in st.session_state:
+    st.session_state.song_paths = {}  # Song title -> file path, built by the directory scan
+if 'library_watcher' not in st.session_state:
+    st.session_state.library_watcher = None  # Process-wide watcher of the songs directories
+if 'watcher_cursor' not in st.session_state:
+    st.session_state.watcher_cursor = 0  # Last watcher delta applied to this session's playlist
+if 'view_model' not in st.session_state:
+    st.session_state.view_model = None  # Cached lists/stats keyed on backend generation
+if 'page_numbers' not in st.session_state:
+    st.session_state.page_numbers = {}  # Current page of each paginated view
 
 # Initialize playlist backend
 def init_playlist():
     if st.session_state.playlist is None:
+        if SERVICE_SOCKET:
+            # The service owns (and persists) the playlist: don't reset it
+            playlist = PlaylistClient(SERVICE_SOCKET)
+            if playlist.load_library():
+                st.session_state.playlist = playlist
+                return True
+            st.error(f"Playlist service is not running on {SERVICE_SOCKET}.")
+            return False
+        
         playlist = PlaylistBackend()
         base_dir = os.path.dirname(os.path.abspath(__file__))
         parent_dir = os.path.dirname(base_dir)
@@ -66,7 +99,19 @@ def init_playlist():
 
 # Get song file path
 def get_song_path(song_name):
-    """Find the actual file path for a song name."""
+    """Find the actual file path for a song name (indexed, falling back to a scan)."""
+    filepath = st.session_state.song_paths.get(song_name)
+    if filepath and os.path.exists(filepath):
+        return filepath
+    st.session_state.song_paths.pop(song_name, None)
+    
+    filepath = find_song_path(song_name)
+    if filepath:
+        st.session_state.song_paths[song_name] = filepath
+    return filepath
+
+def find_song_path(song_name):
+    """Find the actual file path for a song name by probing the songs directories."""
     base_dir = os.path.dirname(os.path.abspath(__file__))
     parent_dir = os.path.dirname(base_dir)
     
@@ -101,42 +146,71 @@ def get_song_path(song_name):
     
     return None
 
-# Get cover image
-def get_cover_image(song_name):
-    """Get cover image for a song."""
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    assets_dir = os.path.join(base_dir, "assets")
-    
-    # Try to find cover image
-    base_name = os.path.splitext(song_name)[0]
-    for ext in ['.jpg', '.jpeg', '.png']:
-        cover_path = os.path.join(assets_dir, base_name + ext)
-        if os.path.exists(cover_path):
-            return cover_path
-    
-    # Use default
-    default_path = os.path.join(assets_dir, "default.jpg")
-    if os.path.exists(default_path):
-        return default_path
-    
-    return None
+# Audio streaming server, shared by every session of this process. It
+# listens on 127.0.0.1, so a browser on another machine (remote host,
+# container, Streamlit Cloud) can only use it through PLAYLIST_AUDIO_URL,
+# the server's address as that browser sees it (e.g. a reverse proxy)
+@st.cache_resource
+def get_audio_server():
+    """Start the local Range-capable audio server (None if it cannot start)."""
+    try:
+        server = AudioServer(public_url=os.environ.get("PLAYLIST_AUDIO_URL"))
+        server.start()
+        return server
+    except OSError:
+        return None
 
-# Get base64 encoded image
-def get_image_base64(image_path):
-    """Get base64 encoded image for HTML display."""
-    if image_path and os.path.exists(image_path):
+def get_reachable_audio_server():
+    """The audio server if this session's browser can reach it, else None (play inline)."""
+    if not os.environ.get("PLAYLIST_AUDIO_URL"):
         try:
-            with open(image_path, 'rb') as f:
-                return base64.b64encode(f.read()).decode()
-        except:
+            host = st.context.headers.get("Host")
+        except AttributeError:
+            host = None  # Streamlit without st.context: can't tell, assume remote
+        if not is_loopback_host(host):
             return None
-    return None
+    return get_audio_server()
+
+# Tag store and cover thumbnails, shared by every session of this process
+@st.cache_resource
+def get_metadata_store():
+    """Open the SQLite store of parsed tags."""
+    return MetadataStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), "library_metadata.db"))
+
+@st.cache_resource
+def get_cover_cache():
+    """Create the cover thumbnail cache (embedded art is looked up per calling session)."""
+    return CoverCache(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets"),
+        embedded_art=lambda song_name: (get_song_tags(song_name) or {}).get('picture'),
+        embedded_art_data=lambda picture_hash: (get_metadata_store().picture(picture_hash) or (None,))[0],
+    )
+
+# Get stored tags
+def get_song_tags(song_name):
+    """Get the tags parsed from a song's file (title, artist, album, duration, picture), or None."""
+    return get_metadata_store().get(st.session_state.song_paths.get(song_name))
+
+def get_song_artist(song_name):
+    """Get a song's artist from its tags."""
+    tags = get_song_tags(song_name)
+    return (tags and tags['artist']) or "Unknown artist"
+
+# Get cover image
+def get_cover_image(song_name):
+    """Get the cover thumbnail (JPEG bytes) for a song, or None."""
+    return get_cover_cache().thumbnail(song_name)
+
+# Get base64 encoded cover thumbnail
+def get_cover_base64(song_name):
+    """Get the base64 encoded cover thumbnail for HTML display."""
+    return get_cover_cache().thumbnail_base64(song_name)
 
 # Load songs from directory
 def load_songs_from_directory():
-    """Scan songs directory and add to playlist."""
+    """Scan songs directories (recursively) and sync changes into the playlist; returns the sync result or None."""
     if not st.session_state.playlist:
-        return
+        return None
     
     base_dir = os.path.dirname(os.path.abspath(__file__))
     parent_dir = os.path.dirname(base_dir)
@@ -146,23 +220,178 @@ def load_songs_from_directory():
         os.path.join(parent_dir, "songs"),
         os.path.join(parent_dir, "Songs"),
     ]
+    manifest_file = os.path.join(base_dir, "library_manifest.json")
     
-    # Supported audio formats
-    audio_extensions = ['.mp3', '.wav', '.ogg', '.m4a', '.flac']
+    # Only new, changed or removed files reach the backend (in batches)
+    try:
+        result = sync_library(st.session_state.playlist, songs_dirs, manifest_file,
+                              metadata=get_metadata_store())
+        st.session_state.song_paths = result['song_paths']
+        return result
+    except Exception as e:
+        return None  # Silently skip errors
+
+# Filesystem watcher (inotify, or polling as a fallback), shared by every
+# session of this process; each session applies its deltas to its own playlist
+@st.cache_resource
+def get_library_watcher():
+    """Create the songs directory watcher (started by start_library_watcher)."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parent_dir = os.path.dirname(base_dir)
+    songs_dirs = [
+        os.path.join(parent_dir, "songs"),
+        os.path.join(parent_dir, "Songs"),
+    ]
+    return LibraryWatcher(None, songs_dirs)
+
+def start_library_watcher(sync_result, cursor):
+    """
+    Follow the shared watcher from cursor (read before this session's scan).
+    The first session starts it with the files its scan found.
+    """
+    if not st.session_state.playlist:
+        return
     
-    for songs_dir in songs_dirs:
-        if not os.path.exists(songs_dir):
-            continue
+    try:
+        watcher = get_library_watcher()
+        watcher.start(files=sync_result['files'] if sync_result else None)
+        st.session_state.library_watcher = watcher
+        st.session_state.watcher_cursor = cursor
+    except Exception as e:
+        pass  # Watching is optional; the startup scan still works
+
+def apply_library_changes():
+    """Apply watcher deltas logged since this session's last rerun to the playlist and path index."""
+    watcher = st.session_state.library_watcher
+    if not watcher:
+        return
+    
+    try:
+        cursor, deltas = watcher.changes_since(st.session_state.watcher_cursor)
+        if deltas is None:
+            # Too far behind the watcher's log: rescan instead
+            load_songs_from_directory()
+            st.session_state.watcher_cursor = cursor
+            return
         
-        for filename in os.listdir(songs_dir):
-            filepath = os.path.join(songs_dir, filename)
-            if os.path.isfile(filepath):
-                ext = os.path.splitext(filename)[1].lower()
-                if ext in audio_extensions:
-                    try:
-                        st.session_state.playlist.add_song(filepath)
-                    except Exception as e:
-                        pass  # Silently skip duplicates or errors
+        for changes in deltas:
+            apply_delta(st.session_state.playlist, changes)
+            
+            # Tag new files; removed ones are pruned by the next full scan
+            added_files = {}
+            for filepath in changes['added']:
+                try:
+                    stat = os.stat(filepath)
+                    added_files[filepath] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    pass
+            if added_files:
+                get_metadata_store().refresh(added_files, prune=False)
+            
+            for title, filepath in changes['song_paths'].items():
+                if filepath:
+                    st.session_state.song_paths[title] = filepath
+                else:
+                    st.session_state.song_paths.pop(title, None)
+        st.session_state.watcher_cursor = cursor
+    except Exception as e:
+        pass  # Silently skip errors
+
+# Cached view model (song list, stats)
+def get_view_model():
+    """
+    Get the playlist view model, rebuilt from a single backend snapshot
+    only when the backend's mutation generation has changed.
+    """
+    playlist = st.session_state.playlist
+    view_model = st.session_state.view_model
+    generation = playlist.generation
+    
+    if view_model is None or view_model['generation'] != generation:
+        records = playlist.snapshot()
+        songs_data = {
+            record['name']: {
+                'play_count': record['play_count'],
+                'is_favorite': record['is_favorite']
+            }
+            for record in records
+        }
+        view_model = {
+            'generation': generation,
+            'songs': [record['name'] for record in records],
+            'total_plays': sum(record['play_count'] for record in records),
+        }
+        st.session_state.view_model = view_model
+        st.session_state.songs_data = songs_data
+    
+    return view_model
+
+# Play a song and patch only its entry in the cached data
+def apply_play(play):
+    """
+    Run a backend play call that returns the updated song record and
+    patch just that song in songs_data and the view model.
+    
+    Args:
+        play: Callable returning a record dict (or None).
+    
+    Returns:
+        The played song's title, or None.
+    """
+    playlist = st.session_state.playlist
+    view_model = st.session_state.view_model
+    generation = playlist.generation
+    
+    record = play()
+    if not record:
+        return None
+    
+    name = record['name']
+    previous = st.session_state.songs_data.get(name, {'play_count': 0, 'is_favorite': False})
+    st.session_state.songs_data[name] = {
+        'play_count': record['play_count'],
+        'is_favorite': record['is_favorite']
+    }
+    
+    # Only this play happened since the cache was built: keep it valid
+    if (view_model is not None and view_model['generation'] == generation
+            and playlist.generation == generation + 1):
+        view_model['total_plays'] += record['play_count'] - previous['play_count']
+        view_model['generation'] = generation + 1
+    
+    return name
+
+# Pagination controls for long lists
+def render_pager(name, total, page_size):
+    """
+    Render previous/next controls and return the current page's offset.
+    
+    Args:
+        name: Key for this view's page number in session state.
+        total: Number of items in the list.
+        page_size: Items per page.
+    
+    Returns:
+        Offset of the first item on the current page.
+    """
+    page_count = max(1, (total + page_size - 1) // page_size)
+    page = min(st.session_state.page_numbers.get(name, 0), page_count - 1)
+    
+    if page_count > 1:
+        col_prev, col_label, col_next = st.columns([1, 3, 1])
+        with col_prev:
+            if st.button("◀ Prev", key=f"{name}_prev", disabled=page == 0):
+                page -= 1
+        with col_next:
+            if st.button("Next ▶", key=f"{name}_next", disabled=page == page_count - 1):
+                page += 1
+        with col_label:
+            first = page * page_size + 1
+            last = min(total, (page + 1) * page_size)
+            st.caption(f"Page {page + 1} of {page_count} · songs {first}-{last} of {total}")
+    
+    st.session_state.page_numbers[name] = page
+    return page * page_size
 
 # Update songs data (play counts, favorites)
 def update_songs_data():
@@ -171,49 +400,41 @@ def update_songs_data():
         return
     
     try:
-        all_songs = st.session_state.playlist.get_playlist()
-        favorites = st.session_state.playlist.get_favorites()
-        fav_set = set(favorites)
-        
-        for song in all_songs:
-            search_result = st.session_state.playlist.search_song(song)
-            if search_result:
-                # Parse: "Title (Plays: X, Favorite: Yes/No)"
-                parts = search_result.split("(Plays: ")
-                if len(parts) == 2:
-                    play_part = parts[1].split(",")[0]
-                    try:
-                        play_count = int(play_part.strip())
-                    except:
-                        play_count = 0
-                else:
-                    play_count = 0
-                
-                is_favorite = song in fav_set
-                st.session_state.songs_data[song] = {
-                    'play_count': play_count,
-                    'is_favorite': is_favorite
-                }
+        get_view_model()
     except Exception as e:
         st.error(f"Error updating songs data: {e}")
 
 # Initialize on first run
 if not st.session_state.playlist_initialized:
     if init_playlist():
-        # Try to load saved playlist
+        # Load saved playlist: binary snapshot + journal replay
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        playlist_file = os.path.join(base_dir, "playlist_data.csv")
-        if os.path.exists(playlist_file):
-            try:
-                st.session_state.playlist.load(playlist_file)
-            except:
-                pass
+        playlist_file = os.path.join(base_dir, "playlist_data.bin")
+        legacy_file = os.path.join(base_dir, "playlist_data.csv")
+        try:
+            # A playlist service loads and journals its own snapshot
+            if not SERVICE_SOCKET:
+                # Shared so every session (and process) sees the same play counts
+                st.session_state.playlist.open_journal(playlist_file, shared=os.name != 'nt')
+                
+                # Migrate a legacy CSV playlist into the snapshot once
+                if not os.path.exists(playlist_file) and os.path.exists(legacy_file):
+                    st.session_state.playlist.load(legacy_file)
+                    st.session_state.playlist.compact()
+        except:
+            pass
         
-        # Load songs from directory
-        load_songs_from_directory()
+        # Load songs from directory, then keep up with changes (deltas
+        # logged during the scan are re-applied, which is harmless)
+        watcher_cursor = get_library_watcher().cursor
+        sync_result = load_songs_from_directory()
+        start_library_watcher(sync_result, watcher_cursor)
         update_songs_data()
         st.session_state.playlist_initialized = True
 
+# Pick up files added or removed since the last rerun
+apply_library_changes()
+
 # Sidebar
 with st.sidebar:
     st.markdown("""
@@ -260,8 +481,7 @@ if page == "Discover":
     # Hero/Now Playing Card
     if st.session_state.current_song:
         song_name = st.session_state.current_song
-        cover_path = get_cover_image(song_name)
-        cover_b64 = get_image_base64(cover_path) if cover_path else None
+        cover_b64 = get_cover_base64(song_name)
         
         if cover_b64:
             st.markdown(f"""
@@ -311,30 +531,42 @@ if page == "Discover":
     
     # Display songs grid
     if st.session_state.playlist:
-        all_songs = st.session_state.playlist.get_playlist()
-        
-        # Filter by search
+        # Filter by search (ranked by the C search index); fall back to
+        # typo-tolerant matching when nothing contains the exact text
         if search_query:
-            all_songs = [s for s in all_songs if search_query.lower() in s.lower()]
+            found = st.session_state.playlist.search(search_query, limit=TRENDY_COUNT)
+            if found['total'] == 0:
+                found = st.session_state.playlist.fuzzy_search(search_query, limit=TRENDY_COUNT)
+            all_songs = [record['name'] for record in found['results']]
+        else:
+            # Most played first, topped up with unplayed songs
+            all_songs = [record['name'] for record in st.session_state.playlist.top_played(TRENDY_COUNT)]
+            if len(all_songs) < TRENDY_COUNT:
+                trending = set(all_songs)
+                for song in get_view_model()['songs']:
+                    if len(all_songs) == TRENDY_COUNT:
+                        break
+                    if song not in trending:
+                        all_songs.append(song)
         
         if all_songs:
             # Create columns for grid
             cols = st.columns(4)
-            for idx, song in enumerate(all_songs[:12]):  # Show first 12
+            for idx, song in enumerate(all_songs[:TRENDY_COUNT]):
                 col = cols[idx % 4]
                 with col:
-                    cover_path = get_cover_image(song)
+                    cover = get_cover_image(song)
                     play_count = st.session_state.songs_data.get(song, {}).get('play_count', 0)
                     is_favorite = st.session_state.songs_data.get(song, {}).get('is_favorite', False)
                     
                     # Display cover
-                    if cover_path and os.path.exists(cover_path):
-                        st.image(cover_path, use_container_width=True)
+                    if cover:
+                        st.image(cover, use_container_width=True)
                     
                     st.markdown(f"""
                     <div class="song-card">
                         <h4 class="song-card-title">{song}</h4>
-                        <p class="song-card-artist">Artist</p>
+                        <p class="song-card-artist">{get_song_artist(song)}</p>
                         <div class="song-card-actions">
                             <button onclick="playSong('{song}')" class="song-card-icon play-button">▶</button>
                             <span class="play-count-badge">{play_count} plays</span>
@@ -345,12 +577,11 @@ if page == "Discover":
                     # Play button
                     if st.button("▶ Play", key=f"play_{song}"):
                         try:
-                            result = st.session_state.playlist.play_song(song)
+                            result = apply_play(lambda: st.session_state.playlist.play_song_record(song))
                             if result:
                                 st.session_state.current_song = result
                                 st.session_state.current_song_path = get_song_path(result)
                                 st.session_state.is_playing = True
-                                update_songs_data()
                                 st.rerun()
                         except Exception as e:
                             st.error(f"Error playing song: {e}")
@@ -361,34 +592,35 @@ elif page == "Playlist":
     st.title("My Playlist")
     
     if st.session_state.playlist:
-        all_songs = st.session_state.playlist.get_playlist()
+        total = st.session_state.playlist.size()
         
-        if all_songs:
-            for idx, song in enumerate(all_songs):
+        if total:
+            # Only the current page is fetched and rendered
+            offset = render_pager("playlist", total, PLAYLIST_PAGE_SIZE)
+            for record in st.session_state.playlist.get_range(offset, PLAYLIST_PAGE_SIZE):
+                song = record['name']
                 col1, col2, col3, col4 = st.columns([1, 3, 2, 2])
                 
                 with col1:
-                    cover_path = get_cover_image(song)
-                    if cover_path and os.path.exists(cover_path):
-                        st.image(cover_path, width=60)
+                    cover = get_cover_image(song)
+                    if cover:
+                        st.image(cover, width=60)
                 
                 with col2:
                     st.markdown(f"**{song}**")
-                    st.caption("Artist")
+                    st.caption(get_song_artist(song))
                 
                 with col3:
-                    play_count = st.session_state.songs_data.get(song, {}).get('play_count', 0)
-                    st.markdown(f"<span class='play-count-badge'>{play_count} plays</span>", unsafe_allow_html=True)
+                    st.markdown(f"<span class='play-count-badge'>{record['play_count']} plays</span>", unsafe_allow_html=True)
                 
                 with col4:
-                    if st.button("Play", key=f"playlist_play_{idx}"):
+                    if st.button("Play", key=f"playlist_play_{record['position']}"):
                         try:
-                            result = st.session_state.playlist.play_song(song)
+                            result = apply_play(lambda: st.session_state.playlist.play_song_record(song))
                             if result:
                                 st.session_state.current_song = result
                                 st.session_state.current_song_path = get_song_path(result)
                                 st.session_state.is_playing = True
-                                update_songs_data()
                                 st.rerun()
                         except Exception as e:
                             st.error(f"Error: {e}")
@@ -399,27 +631,30 @@ elif page == "Favorites":
     st.title("Favorites")
     
     if st.session_state.playlist:
-        favorites = st.session_state.playlist.get_favorites()
+        # Most played favorites first, one page from the C ranking index
+        total = st.session_state.playlist.favorite_count()
         
-        if favorites:
+        if total:
+            offset = render_pager("favorites", total, FAVORITES_PAGE_SIZE)
+            page_data = st.session_state.playlist.favorites(offset, FAVORITES_PAGE_SIZE)
+            favorites = [record['name'] for record in page_data['results']]
             cols = st.columns(4)
             for idx, song in enumerate(favorites):
                 col = cols[idx % 4]
                 with col:
-                    cover_path = get_cover_image(song)
-                    if cover_path and os.path.exists(cover_path):
-                        st.image(cover_path, use_container_width=True)
+                    cover = get_cover_image(song)
+                    if cover:
+                        st.image(cover, use_container_width=True)
                     
                     st.markdown(f"**{song}**")
                     
-                    if st.button("Play", key=f"fav_play_{idx}"):
+                    if st.button("Play", key=f"fav_play_{offset + idx}"):
                         try:
-                            result = st.session_state.playlist.play_song(song)
+                            result = apply_play(lambda: st.session_state.playlist.play_song_record(song))
                             if result:
                                 st.session_state.current_song = result
                                 st.session_state.current_song_path = get_song_path(result)
                                 st.session_state.is_playing = True
-                                update_songs_data()
                                 st.rerun()
                         except Exception as e:
                             st.error(f"Error: {e}")
@@ -430,9 +665,10 @@ elif page == "Stats":
     st.title("Statistics")
     
     if st.session_state.playlist:
-        all_songs = st.session_state.playlist.get_playlist()
-        favorites = st.session_state.playlist.get_favorites()
-        total_plays = sum(st.session_state.songs_data.get(s, {}).get('play_count', 0) for s in all_songs)
+        view_model = get_view_model()
+        all_songs = view_model['songs']
+        favorite_count = st.session_state.playlist.favorite_count()
+        total_plays = view_model['total_plays']
         
         col1, col2, col3 = st.columns(3)
         
@@ -447,7 +683,7 @@ elif page == "Stats":
         with col2:
             st.markdown(f"""
             <div class="stat-card">
-                <div class="stat-value">{len(favorites)}</div>
+                <div class="stat-value">{favorite_count}</div>
                 <div class="stat-label">Favorites</div>
             </div>
             """, unsafe_allow_html=True)
@@ -484,6 +720,7 @@ elif page == "Upload":
                 
                 if st.session_state.playlist:
                     if st.session_state.playlist.add_song(filepath):
+                        st.session_state.song_paths[song_basename(filepath)] = filepath
                         st.success(f"Successfully uploaded {uploaded_file.name}!")
                         update_songs_data()
                         st.rerun()
@@ -499,17 +736,23 @@ if st.session_state.current_song and st.session_state.current_song_path:
     col1, col2, col3 = st.columns([2, 5, 2])
     
     with col1:
-        cover_path = get_cover_image(st.session_state.current_song)
-        if cover_path and os.path.exists(cover_path):
-            st.image(cover_path, width=60)
+        cover = get_cover_image(st.session_state.current_song)
+        if cover:
+            st.image(cover, width=60)
         st.markdown(f"**{st.session_state.current_song}**")
     
     with col2:
-        # Audio player
+        # Audio player: streamed by URL so the browser fetches ranges and
+        # caches replays; embedded whole when the browser can't reach the server
         try:
-            with open(st.session_state.current_song_path, 'rb') as audio_file:
-                audio_bytes = audio_file.read()
-            st.audio(audio_bytes, format='audio/mp3', autoplay=st.session_state.is_playing)
+            song_path = st.session_state.current_song_path
+            audio_server = get_reachable_audio_server()
+            if audio_server:
+                audio_source = audio_server.url_for(song_path)
+            else:
+                with open(song_path, 'rb') as audio_file:
+                    audio_source = audio_file.read()
+            st.audio(audio_source, format=audio_type(song_path), autoplay=st.session_state.is_playing)
         except Exception as e:
             st.error(f"Error loading audio: {e}")
         
@@ -519,11 +762,10 @@ if st.session_state.current_song and st.session_state.current_song_path:
         with btn_col1:
             if st.button("⏮"):
                 try:
-                    result = st.session_state.playlist.play_previous()
+                    result = apply_play(st.session_state.playlist.play_previous_record)
                     if result:
                         st.session_state.current_song = result
                         st.session_state.current_song_path = get_song_path(result)
-                        update_songs_data()
                         st.rerun()
                 except:
                     pass
@@ -536,11 +778,10 @@ if st.session_state.current_song and st.session_state.current_song_path:
         with btn_col3:
             if st.button("⏭"):
                 try:
-                    result = st.session_state.playlist.play_next()
+                    result = apply_play(st.session_state.playlist.play_next_record)
                     if result:
                         st.session_state.current_song = result
                         st.session_state.current_song_path = get_song_path(result)
-                        update_songs_data()
                         st.rerun()
                 except:
                     pass
@@ -552,12 +793,11 @@ if st.session_state.current_song and st.session_state.current_song_path:
             # Toggle favorite by playing again (or implement toggle function)
             pass
 
-# Save playlist on exit
+# Mutations are journaled as they happen; only rewrite the snapshot
+# once the journal has grown past its threshold
 if st.session_state.playlist:
     try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        playlist_file = os.path.join(base_dir, "playlist_data.csv")
-        st.session_state.playlist.save(playlist_file)
+        st.session_state.playlist.maybe_compact()
     except:
         pass
 
@@ -0,0 +1,127 @@
+"""
+asyncio front end for the playlist backend.
+Runs every call on a small dedicated thread pool so the event loop never
+blocks on the C library (or on a PlaylistClient's socket), and lets
+concurrent identical reads share one call.
+"""
+
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from playlist import PlaylistBackend
+
+# Threads running backend calls; the C library serves reads in parallel,
+# so a few threads are enough to keep it busy
+DEFAULT_MAX_WORKERS = 4
+
+# Calls that only read state: concurrent identical calls are coalesced
+READ_METHODS = (
+    'size', 'memory_usage', 'search_song', 'search', 'fuzzy_search',
+    'top_played', 'favorites', 'favorite_count', 'play_rank',
+    'get_playlist', 'get_favorites', 'get_playlist_view', 'get_favorites_view',
+    'snapshot', 'get_range', 'song_position', 'journal_size',
+)
+
+# Calls that change state (or the backend itself): always run
+WRITE_METHODS = (
+    'load_library', 'initialize', 'add_song', 'delete_song', 'add_songs', 'delete_songs',
+    'play_song', 'play_next', 'play_previous',
+    'play_song_record', 'play_next_record', 'play_previous_record',
+    'save', 'load', 'open_journal', 'close_journal', 'compact', 'maybe_compact', 'cleanup',
+)
+
+class AsyncPlaylistBackend:
+    """
+    Awaitable wrapper around a PlaylistBackend (or PlaylistClient).
+
+    Every PlaylistBackend method listed in READ_METHODS and WRITE_METHODS
+    is a coroutine here with the same arguments and return value, run on
+    a bounded executor; so is generation(), a property on the backend.
+    While a read is in flight, identical reads (same method and
+    arguments) await the same call instead of starting another, and get
+    the same result object, which callers must not mutate. A read issued
+    after a write never shares a call started before that write, so
+    awaiting a write and then reading always sees the write.
+    """
+
+    def __init__(self, backend=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            backend: Backend to wrap; default a new PlaylistBackend, which
+                must then be loaded with `await load_library()`.
+            max_workers: Threads running backend calls.
+        """
+        self.backend = backend if backend is not None else PlaylistBackend()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="playlist-async")
+        self._inflight = {}  # (loop, method, args, write epoch) -> future
+        self._write_epoch = 0
+
+    async def generation(self):
+        """
+        Mutation counter of the wrapped backend.
+
+        A coroutine (unlike PlaylistBackend.generation): for a shared
+        journal or a PlaylistClient, reading it can block.
+        """
+        return await self._read('generation', ())
+
+    def _invoke(self, name, *args):
+        """Run backend.<name>(*args) on an executor thread."""
+        if name == 'generation':
+            return self.backend.generation
+        return getattr(self.backend, name)(*args)
+
+    async def _read(self, name, args):
+        loop = asyncio.get_running_loop()
+        key = (loop, name, args, self._write_epoch)
+        future = self._inflight.get(key)
+        if future is None:
+            future = loop.run_in_executor(self._executor, self._invoke, name, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # One caller being cancelled must not cancel the shared call
+        return await asyncio.shield(future)
+
+    async def _write(self, name, args):
+        self._write_epoch += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._invoke, name, *args)
+
+    async def aclose(self):
+        """Wait for running calls, stop the executor and close the backend."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        self.backend.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+def _async_method(name, run):
+    """Build an AsyncPlaylistBackend coroutine for PlaylistBackend.<name>."""
+    backend_method = getattr(PlaylistBackend, name)
+    signature = inspect.signature(backend_method)
+
+    async def method(self, *args, **kwargs):
+        # Bind to the backend's signature so search("a") and
+        # search("a", 20, 0) are the same call
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        call_args = tuple(list(value) if name in ('add_songs', 'delete_songs') else value
+                          for value in list(bound.arguments.values())[1:])
+        return await run(self, name, call_args)
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncPlaylistBackend.{name}"
+    method.__doc__ = backend_method.__doc__
+    method.__signature__ = signature
+    return method
+
+for _name in READ_METHODS:
+    setattr(AsyncPlaylistBackend, _name, _async_method(_name, AsyncPlaylistBackend._read))
+for _name in WRITE_METHODS:
+    setattr(AsyncPlaylistBackend, _name, _async_method(_name, AsyncPlaylistBackend._write))
@@ -0,0 +1,243 @@
+"""
+Cover-art thumbnail cache.
+Finds each song's cover with one directory listing, renders a fixed-size
+JPEG thumbnail once with Pillow, stores it on disk under the source
+image's content hash and keeps encoded bytes in a bounded in-memory LRU.
+Pictures embedded in the audio files can be plugged in as a fallback.
+Songs without any cover share the default cover's single entry.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+# Cover file extensions, in lookup order
+COVER_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+DEFAULT_COVER_NAME = "default.jpg"
+
+# Thumbnails are square JPEGs of this many pixels per side
+DEFAULT_THUMBNAIL_SIZE = 300
+THUMBNAIL_QUALITY = 85
+
+# Encoded thumbnails kept in memory
+DEFAULT_MAX_ENTRIES = 256
+
+class CoverCache:
+    """
+    Thumbnail cache for song covers.
+
+    A cover for "Title" is assets_dir/Title.jpg (or .jpeg/.png), then the
+    picture embedded in the song's file (if embedded_art is given), then
+    assets_dir/default.jpg. Safe to share between threads.
+    """
+
+    def __init__(self, assets_dir, cache_dir=None, size=DEFAULT_THUMBNAIL_SIZE,
+                 max_entries=DEFAULT_MAX_ENTRIES, embedded_art=None, embedded_art_data=None):
+        """
+        Args:
+            assets_dir: Directory holding cover images and the default cover.
+            cache_dir: Where thumbnails are written (default: assets_dir/.thumbnails).
+            size: Thumbnail width and height in pixels.
+            max_entries: Thumbnails kept in the in-memory LRU.
+            embedded_art: Optional callable mapping a song title to the
+                SHA-256 hex digest of its embedded picture (or None).
+            embedded_art_data: Callable mapping such a digest to image bytes;
+                only called when the thumbnail is not cached yet.
+        """
+        self.assets_dir = assets_dir
+        self.embedded_art = embedded_art
+        self.embedded_art_data = embedded_art_data
+        self.cache_dir = cache_dir or os.path.join(assets_dir, ".thumbnails")
+        self.size = size
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._covers = {}           # song title -> cover path, from one listing
+        self._listing_mtime = None
+        self._hashes = {}           # cover path -> ((size, mtime_ns), content hash)
+        self._entries = OrderedDict()  # content hash -> [jpeg bytes, base64 or None]
+
+    def cover_path(self, song_name):
+        """
+        Get the source cover image for a song.
+
+        Returns:
+            Path to the song's cover, the default cover, or None.
+        """
+        with self._lock:
+            self._refresh_listing()
+            return self._covers.get(song_name) or self._covers.get(None)
+
+    def thumbnail(self, song_name):
+        """
+        Get a song's cover thumbnail.
+
+        Returns:
+            JPEG bytes, or None if neither a cover nor the default exists.
+        """
+        entry = self._entry(song_name)
+        return entry[0] if entry else None
+
+    def thumbnail_base64(self, song_name):
+        """
+        Get a song's cover thumbnail as base64 for HTML data URIs.
+
+        Returns:
+            Base64 string of the JPEG, or None.
+        """
+        entry = self._entry(song_name)
+        if not entry:
+            return None
+        if entry[1] is None:
+            entry[1] = base64.b64encode(entry[0]).decode('ascii')
+        return entry[1]
+
+    def clear(self):
+        """Drop in-memory state (thumbnails on disk are kept)."""
+        with self._lock:
+            self._covers = {}
+            self._listing_mtime = None
+            self._hashes = {}
+            self._entries.clear()
+
+    def _refresh_listing(self):
+        """Re-list assets_dir when it changed since the last listing."""
+        try:
+            mtime = os.stat(self.assets_dir).st_mtime_ns
+        except OSError:
+            self._covers = {}
+            self._listing_mtime = None
+            return
+        if mtime == self._listing_mtime:
+            return
+
+        try:
+            names = os.listdir(self.assets_dir)
+        except OSError:
+            names = []
+        found = {}
+        for file_name in names:
+            base_name, ext = os.path.splitext(file_name)
+            if ext.lower() in COVER_EXTENSIONS:
+                priority = COVER_EXTENSIONS.index(ext.lower())
+                if base_name not in found or priority < found[base_name][0]:
+                    found[base_name] = (priority, os.path.join(self.assets_dir, file_name))
+        covers = {base_name: path for base_name, (_, path) in found.items()}
+
+        default_path = os.path.join(self.assets_dir, DEFAULT_COVER_NAME)
+        covers[None] = default_path if os.path.exists(default_path) else None
+        self._covers = covers
+        self._listing_mtime = mtime
+
+    def _content_hash(self, path):
+        """Hash of a cover file's bytes, recomputed only when it changes."""
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        with self._lock:
+            self._hashes[path] = (key, content_hash)
+        return content_hash
+
+    def _cached_entry(self, content_hash):
+        """Get an LRU entry and mark it recently used (caller holds the lock)."""
+        entry = self._entries.get(content_hash)
+        if entry:
+            self._entries.move_to_end(content_hash)
+        return entry
+
+    def _entry(self, song_name):
+        """Get (or build) the LRU entry for a song's cover."""
+        # The lock only covers the listing and the LRU: lookups, hashing
+        # and rendering run outside it so one slow cover doesn't stall
+        # every other session
+        with self._lock:
+            self._refresh_listing()
+            source = self._covers.get(song_name)
+            default_source = self._covers.get(None)
+
+        content_hash = None
+        if not source and self.embedded_art:
+            content_hash = self.embedded_art(song_name)
+            if content_hash:
+                source = lambda: self.embedded_art_data(content_hash)
+        if not source:
+            source = default_source
+            if not source:
+                return None
+        if not content_hash:
+            try:
+                content_hash = self._content_hash(source)
+            except OSError:
+                return None
+
+        with self._lock:
+            entry = self._cached_entry(content_hash)
+        if entry:
+            return entry
+
+        data = self._load_thumbnail(source, content_hash)
+        if data is None:
+            return None
+        with self._lock:
+            # Another thread may have rendered the same cover meanwhile
+            entry = self._cached_entry(content_hash)
+            if entry:
+                return entry
+            entry = [data, None]
+            self._entries[content_hash] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def _load_thumbnail(self, source, content_hash):
+        """
+        Read the thumbnail from disk, rendering it first if needed.
+
+        source is an image path or a callable returning image bytes.
+        """
+        thumbnail_path = os.path.join(self.cache_dir, f"{content_hash}-{self.size}.jpg")
+        try:
+            with open(thumbnail_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+
+        try:
+            if callable(source):
+                data = source()
+                if not data:
+                    return None
+                source = io.BytesIO(data)
+            with Image.open(source) as image:
+                thumbnail = ImageOps.fit(image.convert('RGB'), (self.size, self.size))
+        except (OSError, ValueError):
+            return None
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY)
+        data = buffer.getvalue()
+
+        # Written atomically so concurrent sessions never read half a file
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{thumbnail_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, thumbnail_path)
+        except OSError:
+            pass  # Still served from memory
+        return data
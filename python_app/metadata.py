@@ -0,0 +1,506 @@
+"""
+Song metadata pipeline.
+Pure-Python readers for ID3v2 (MP3), FLAC and Ogg Vorbis/Opus tags that
+read only the tag headers (plus a few KB to work out the duration), a
+process-pool extractor for library scans and a SQLite store keyed by
+(path, size, mtime) so files are parsed once, not every session.
+"""
+
+import base64
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Largest tag block read from a file (embedded pictures included)
+MAX_TAG_BYTES = 16 * 1024 * 1024
+
+# Fewer files than this are parsed in-process (a pool costs more to start)
+POOL_THRESHOLD = 32
+
+DEFAULT_MAX_WORKERS = os.cpu_count() or 4
+
+STORE_VERSION = 1
+
+TEXT_FRAMES = {
+    'TIT2': 'title', 'TT2': 'title',
+    'TPE1': 'artist', 'TP1': 'artist',
+    'TALB': 'album', 'TAL': 'album',
+}
+
+VORBIS_FIELDS = {'TITLE': 'title', 'ARTIST': 'artist', 'ALBUM': 'album'}
+
+# MPEG audio tables: bitrates (kbps) by [version is MPEG1][layer], sample rates by version
+MPEG_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def empty_tags():
+    """Tag dict with every field missing."""
+    return {'title': None, 'artist': None, 'album': None, 'duration': None,
+            'picture': None, 'picture_mime': None}
+
+def read_tags(path):
+    """
+    Read tags from an audio file without reading the audio data.
+
+    Args:
+        path: Audio file path (.mp3, .flac, .ogg; other formats yield no tags).
+
+    Returns:
+        Dict with 'title', 'artist', 'album', 'duration' (seconds),
+        'picture' (embedded cover bytes) and 'picture_mime'; missing
+        fields are None. Unreadable or malformed files give empty tags.
+    """
+    tags = empty_tags()
+    try:
+        with open(path, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            magic = f.read(4)
+            f.seek(0)
+            if magic[:3] == b"ID3":
+                tag_end = _read_id3(f, tags)
+                f.seek(tag_end)
+                if f.read(4) == b"fLaC":
+                    _read_flac(f, tags)
+                else:
+                    _read_mpeg_duration(f, tag_end, file_size, tags)
+            elif magic == b"fLaC":
+                f.seek(4)
+                _read_flac(f, tags)
+            elif magic == b"OggS":
+                _read_ogg(f, file_size, tags)
+            elif path.lower().endswith('.mp3'):
+                _read_mpeg_duration(f, 0, file_size, tags)
+            if path.lower().endswith('.mp3') and not (tags['title'] or tags['artist']):
+                _read_id3v1(f, file_size, tags)
+    except (OSError, ValueError, IndexError, struct.error):
+        return empty_tags()
+    return tags
+
+# ID3v2
+
+def _syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+def _decode_text(encoding, data):
+    """Decode an ID3 text payload; multiple values keep only the first."""
+    if encoding == 0:
+        text = data.decode('latin-1')
+    elif encoding == 1:
+        text = data.decode('utf-16', errors='replace')
+    elif encoding == 2:
+        text = data.decode('utf-16-be', errors='replace')
+    else:
+        text = data.decode('utf-8', errors='replace')
+    return text.split('\0')[0].strip() or None
+
+def _split_terminated(encoding, data):
+    """Split data at the first encoding-appropriate NUL terminator."""
+    if encoding in (1, 2):
+        index = 0
+        while True:
+            index = data.find(b"\0\0", index)
+            if index < 0 or index % 2 == 0:
+                break
+            index += 1
+        if index < 0:
+            return data, b""
+        return data[:index], data[index + 2:]
+    index = data.find(b"\0")
+    if index < 0:
+        return data, b""
+    return data[:index], data[index + 1:]
+
+def _read_id3(f, tags):
+    """Parse an ID3v2.2/2.3/2.4 tag at the file start; returns where it ends."""
+    header = f.read(10)
+    major, flags = header[3], header[5]
+    size = _syncsafe(header[6:10])
+    data = f.read(min(size, MAX_TAG_BYTES))
+    tag_end = 10 + size + (10 if major >= 4 and flags & 0x10 else 0)
+    if major < 2 or major > 4:
+        return tag_end
+    if flags & 0x80 and major < 4:
+        data = data.replace(b"\xff\x00", b"\xff")  # Whole-tag unsynchronisation
+
+    position = 0
+    if flags & 0x40 and major == 3:
+        position = struct.unpack(">I", data[:4])[0] + 4
+    elif flags & 0x40 and major == 4:
+        position = _syncsafe(data[:4])
+
+    header_size = 6 if major == 2 else 10
+    picture_type = None
+    while position + header_size <= len(data):
+        if major == 2:
+            frame_id = data[position:position + 3]
+            frame_size = int.from_bytes(data[position + 3:position + 6], 'big')
+            frame_flags = 0
+        else:
+            frame_id = data[position:position + 4]
+            raw_size = data[position + 4:position + 8]
+            frame_size = _syncsafe(raw_size) if major == 4 else struct.unpack(">I", raw_size)[0]
+            frame_flags = struct.unpack(">H", data[position + 8:position + 10])[0]
+        if not frame_id.strip(b"\0") or frame_size == 0:
+            break  # Padding
+        body = data[position + header_size:position + header_size + frame_size]
+        position += header_size + frame_size
+
+        if major == 3 and frame_flags & 0x00C0:
+            continue  # Compressed or encrypted
+        if major == 4:
+            if frame_flags & 0x000C:
+                continue
+            if frame_flags & 0x0002:
+                body = body.replace(b"\xff\x00", b"\xff")
+            if frame_flags & 0x0001:
+                body = body[4:]  # Data length indicator
+        if not body:
+            continue
+
+        frame_id = frame_id.decode('latin-1')
+        if frame_id in TEXT_FRAMES:
+            field = TEXT_FRAMES[frame_id]
+            tags[field] = tags[field] or _decode_text(body[0], body[1:])
+        elif frame_id in ('TLEN', 'TLE'):
+            length = _decode_text(body[0], body[1:])
+            if length and length.isdigit() and int(length) > 0:
+                tags['duration'] = int(length) / 1000
+        elif frame_id in ('APIC', 'PIC'):
+            encoding = body[0]
+            if frame_id == 'PIC':
+                image_format = body[1:4].decode('latin-1').upper()
+                mime = "image/png" if image_format == "PNG" else "image/jpeg"
+                rest = body[4:]
+            else:
+                mime_bytes, rest = _split_terminated(0, body[1:])
+                mime = mime_bytes.decode('latin-1') or "image/jpeg"
+            kind, rest = rest[0], rest[1:]
+            _, image = _split_terminated(encoding, rest)
+            # Prefer the front cover (type 3) over any other picture
+            if image and (picture_type is None or (kind == 3 and picture_type != 3)):
+                tags['picture'], tags['picture_mime'] = image, mime
+                picture_type = kind
+    return tag_end
+
+def _read_id3v1(f, file_size, tags):
+    """Fill missing fields from a 128-byte ID3v1 tag at the file end."""
+    if file_size < 128:
+        return
+    f.seek(file_size - 128)
+    data = f.read(128)
+    if data[:3] != b"TAG":
+        return
+    for field, start, end in (('title', 3, 33), ('artist', 33, 63), ('album', 63, 93)):
+        value = data[start:end].split(b"\0")[0].decode('latin-1').strip()
+        tags[field] = tags[field] or value or None
+
+def _read_mpeg_duration(f, audio_start, file_size, tags):
+    """Work out the duration from the first MPEG frame (Xing/VBRI or CBR)."""
+    if tags['duration']:
+        return
+    f.seek(audio_start)
+    data = f.read(8192)
+    for offset in range(len(data) - 4):
+        if data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+            continue
+        version = (data[offset + 1] >> 3) & 0x03
+        layer = 4 - ((data[offset + 1] >> 1) & 0x03)
+        bitrate_index = data[offset + 2] >> 4
+        rate_index = (data[offset + 2] >> 2) & 0x03
+        if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        mpeg1 = version == 3
+        bitrate = MPEG_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+        sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+        samples = 384 if layer == 1 else (1152 if mpeg1 or layer == 2 else 576)
+        mono = (data[offset + 3] >> 6) == 3
+
+        # VBR files announce their frame count in a Xing/Info or VBRI header
+        side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+        xing = offset + 4 + side_info
+        frames = None
+        if data[xing:xing + 4] in (b"Xing", b"Info") and len(data) >= xing + 12:
+            if struct.unpack(">I", data[xing + 4:xing + 8])[0] & 0x01:
+                frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+        elif data[offset + 36:offset + 40] == b"VBRI" and len(data) >= offset + 54:
+            frames = struct.unpack(">I", data[offset + 50:offset + 54])[0]
+
+        if frames:
+            tags['duration'] = frames * samples / sample_rate
+        else:
+            tags['duration'] = (file_size - audio_start - offset) * 8 / bitrate
+        return
+
+# FLAC and Vorbis comments
+
+def _apply_vorbis_comments(data, tags):
+    """Parse a Vorbis comment block (shared by FLAC, Ogg Vorbis and Opus)."""
+    vendor_length = struct.unpack("<I", data[:4])[0]
+    position = 4 + vendor_length
+    count = struct.unpack("<I", data[position:position + 4])[0]
+    position += 4
+    for _ in range(count):
+        length = struct.unpack("<I", data[position:position + 4])[0]
+        comment = data[position + 4:position + 4 + length]
+        position += 4 + length
+        key, _, value = comment.partition(b"=")
+        key = key.decode('ascii', errors='replace').upper()
+        if key in VORBIS_FIELDS:
+            field = VORBIS_FIELDS[key]
+            tags[field] = tags[field] or value.decode('utf-8', errors='replace').strip() or None
+        elif key == 'METADATA_BLOCK_PICTURE' and not tags['picture']:
+            try:
+                _apply_flac_picture(base64.b64decode(value), tags)
+            except ValueError:
+                pass
+
+def _apply_flac_picture(data, tags):
+    """Parse a FLAC PICTURE block body."""
+    kind, mime_length = struct.unpack(">II", data[:8])
+    mime = data[8:8 + mime_length].decode('ascii', errors='replace')
+    position = 8 + mime_length
+    description_length = struct.unpack(">I", data[position:position + 4])[0]
+    position += 4 + description_length + 16  # Width, height, depth, colors
+    image_length = struct.unpack(">I", data[position:position + 4])[0]
+    image = data[position + 4:position + 4 + image_length]
+    if image and (not tags['picture'] or kind == 3):
+        tags['picture'], tags['picture_mime'] = image, mime or "image/jpeg"
+
+def _read_flac(f, tags):
+    """Walk FLAC metadata blocks after the "fLaC" marker, skipping others."""
+    while True:
+        header = f.read(4)
+        if len(header) < 4:
+            return
+        last, kind = header[0] & 0x80, header[0] & 0x7F
+        length = int.from_bytes(header[1:4], 'big')
+        if kind in (0, 4, 6) and length <= MAX_TAG_BYTES:
+            body = f.read(length)
+            if kind == 0 and len(body) >= 18:
+                info = int.from_bytes(body[10:18], 'big')
+                sample_rate = info >> 44
+                total_samples = info & ((1 << 36) - 1)
+                if sample_rate and total_samples:
+                    tags['duration'] = total_samples / sample_rate
+            elif kind == 4:
+                _apply_vorbis_comments(body, tags)
+            elif kind == 6:
+                _apply_flac_picture(body, tags)
+        else:
+            f.seek(length, 1)
+        if last:
+            return
+
+# Ogg Vorbis / Opus
+
+def _read_ogg_packets(f, count):
+    """Reassemble the first count packets of the first logical stream."""
+    packets = []
+    packet = b""
+    serial = None
+    total = 0
+    while len(packets) < count:
+        header = f.read(27)
+        if len(header) < 27 or header[:4] != b"OggS":
+            break
+        page_serial = struct.unpack("<I", header[14:18])[0]
+        serial = page_serial if serial is None else serial
+        segments = f.read(header[26])
+        body = f.read(sum(segments))
+        if page_serial != serial:
+            continue
+        position = 0
+        for lacing in segments:
+            packet += body[position:position + lacing]
+            position += lacing
+            total += lacing
+            if lacing < 255:
+                packets.append(packet)
+                packet = b""
+                if len(packets) == count:
+                    break
+        if total > MAX_TAG_BYTES:
+            break
+    return packets, serial
+
+def _last_granule(f, file_size, serial):
+    """Granule position of the last page of a stream (read from the file end)."""
+    tail_size = min(file_size, 65536)
+    f.seek(file_size - tail_size)
+    data = f.read(tail_size)
+    index = data.rfind(b"OggS")
+    while index >= 0:
+        if len(data) >= index + 18 and struct.unpack("<I", data[index + 14:index + 18])[0] == serial:
+            return struct.unpack("<q", data[index + 6:index + 14])[0]
+        index = data.rfind(b"OggS", 0, index)
+    return None
+
+def _read_ogg(f, file_size, tags):
+    packets, serial = _read_ogg_packets(f, 2)
+    if len(packets) < 2:
+        return
+    identification, comments = packets
+    if identification[:7] == b"\x01vorbis" and comments[:7] == b"\x03vorbis":
+        sample_rate = struct.unpack("<I", identification[12:16])[0]
+        pre_skip = 0
+        _apply_vorbis_comments(comments[7:], tags)
+    elif identification[:8] == b"OpusHead" and comments[:8] == b"OpusTags":
+        sample_rate = 48000  # Opus granules always count 48 kHz samples
+        pre_skip = struct.unpack("<H", identification[10:12])[0]
+        _apply_vorbis_comments(comments[8:], tags)
+    else:
+        return
+
+    granule = _last_granule(f, file_size, serial)
+    if granule and granule > pre_skip and sample_rate:
+        tags['duration'] = (granule - pre_skip) / sample_rate
+
+# Extraction
+
+def extract_tags(paths, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Read tags for many files, across a process pool for large batches.
+
+    Args:
+        paths: List of audio file paths.
+        max_workers: Process pool size.
+
+    Returns:
+        List of tag dicts, in the order of paths.
+    """
+    if len(paths) < POOL_THRESHOLD or max_workers <= 1:
+        return [read_tags(path) for path in paths]
+    try:
+        # Spawned, not forked: the caller (e.g. Streamlit) is multi-threaded
+        # and a forked child could inherit a lock held by another thread
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            chunk_size = max(1, len(paths) // (max_workers * 4))
+            return list(executor.map(read_tags, paths, chunksize=chunk_size))
+    except (OSError, RuntimeError):
+        # No process support here (e.g. restricted sandbox): parse inline
+        return [read_tags(path) for path in paths]
+
+class MetadataStore:
+    """
+    SQLite store of parsed tags keyed by (path, size, mtime).
+
+    Embedded pictures are stored once per distinct image (by SHA-256),
+    so all tracks of an album share one copy. Safe to share between threads.
+    """
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path: SQLite database file (created if missing).
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._db:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS tracks")
+                self._db.execute("DROP TABLE IF EXISTS pictures")
+                self._db.execute(f"PRAGMA user_version = {STORE_VERSION}")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS tracks (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,
+                title TEXT, artist TEXT, album TEXT, duration REAL, picture TEXT)""")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS pictures (
+                hash TEXT PRIMARY KEY, mime TEXT, data BLOB)""")
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def get(self, path):
+        """
+        Get stored tags for a file.
+
+        Returns:
+            Dict with 'title', 'artist', 'album', 'duration' and 'picture'
+            (the picture's hash, see picture()), or None if not stored.
+        """
+        if not path:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT title, artist, album, duration, picture FROM tracks WHERE path = ?",
+                (path,)).fetchone()
+        if not row:
+            return None
+        return dict(zip(('title', 'artist', 'album', 'duration', 'picture'), row))
+
+    def picture(self, picture_hash):
+        """
+        Get an embedded picture by hash.
+
+        Returns:
+            (bytes, mime) or None.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT data, mime FROM pictures WHERE hash = ?",
+                                   (picture_hash,)).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def stale(self, files):
+        """
+        Find files whose stored tags are missing or out of date.
+
+        Args:
+            files: Dict mapping path -> (size, mtime_ns).
+
+        Returns:
+            Sorted list of paths to (re)parse.
+        """
+        with self._lock:
+            stored = {path: (size, mtime_ns) for path, size, mtime_ns in
+                      self._db.execute("SELECT path, size, mtime_ns FROM tracks")}
+        return sorted(path for path, stat in files.items() if stored.get(path) != tuple(stat))
+
+    def refresh(self, files, max_workers=DEFAULT_MAX_WORKERS, prune=True):
+        """
+        Parse new and changed files and store their tags.
+
+        Args:
+            files: Dict mapping path -> (size, mtime_ns), e.g. from scan_tree.
+            max_workers: Process pool size for parsing.
+            prune: Also drop stored files that are not in files.
+
+        Returns:
+            Number of files parsed.
+        """
+        paths = self.stale(files)
+        results = extract_tags(paths, max_workers=max_workers)
+
+        with self._lock, self._db:
+            for path, tags in zip(paths, results):
+                picture_hash = None
+                if tags['picture']:
+                    picture_hash = hashlib.sha256(tags['picture']).hexdigest()
+                    self._db.execute("INSERT OR IGNORE INTO pictures VALUES (?, ?, ?)",
+                                     (picture_hash, tags['picture_mime'], tags['picture']))
+                size, mtime_ns = files[path]
+                self._db.execute(
+                    "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, size, mtime_ns, tags['title'], tags['artist'], tags['album'],
+                     tags['duration'], picture_hash))
+
+            if prune:
+                stored = [row[0] for row in self._db.execute("SELECT path FROM tracks")]
+                self._db.executemany("DELETE FROM tracks WHERE path = ?",
+                                     [(path,) for path in stored if path not in files])
+            self._db.execute("DELETE FROM pictures WHERE hash NOT IN "
+                             "(SELECT picture FROM tracks WHERE picture IS NOT NULL)")
+        return len(paths)
@@ -7,12 +7,117 @@ import ctypes
 import os
 import sys
 import platform
+import weakref
+from collections.abc import Sequence
+
+# Files with this extension use the binary format; anything else is CSV
+BINARY_EXTENSION = ".bin"
+
+# Journal size (bytes) past which maybe_compact() rewrites the snapshot
+DEFAULT_COMPACT_BYTES = 1 << 20
+
+def song_basename(filepath):
+    """
+    Song title for a file path, using the same rule as the C extractBasename:
+    strip everything up to the last '/' or '\\', then the last extension,
+    and cap the result at 255 bytes.
+    
+    Args:
+        filepath: Path to a song file.
+    
+    Returns:
+        Song title as stored by the backend.
+    """
+    start = max(filepath.rfind('/'), filepath.rfind('\\')) + 1
+    name = filepath[start:]
+    dot = name.rfind('.')
+    if dot != -1:
+        name = name[:dot]
+    return name.encode('utf-8')[:255].decode('utf-8', 'ignore')
+
+class SongRecord(ctypes.Structure):
+    """Mirror of the C SongRecord struct used by snapshotPlaylist."""
+    _fields_ = [
+        ("songName", ctypes.c_char * 256),
+        ("playCount", ctypes.c_int),
+        ("isFavorite", ctypes.c_int),
+        ("position", ctypes.c_int),
+    ]
+
+class NameBuffer(ctypes.Structure):
+    """Mirror of the C NameBuffer struct filled by exportNames."""
+    _fields_ = [
+        ("data", ctypes.c_void_p),
+        ("size", ctypes.c_size_t),
+        ("offsets", ctypes.c_void_p),
+        ("count", ctypes.c_int),
+    ]
+
+class NameView(Sequence):
+    """
+    Read-only sequence of song titles backed by a single C buffer.
+    
+    Titles are decoded lazily on access straight from a memoryview over
+    the C memory, which is freed when the view is garbage collected.
+    """
+    
+    def __init__(self, lib, buffer):
+        self._count = buffer.count
+        if self._count:
+            self._data = memoryview((ctypes.c_char * buffer.size).from_address(buffer.data)).cast('B')
+            self._offsets = memoryview((ctypes.c_uint32 * (self._count + 1)).from_address(
+                buffer.offsets)).cast('B').cast('I')
+        else:
+            self._data = memoryview(b"")
+            self._offsets = memoryview(b"").cast('I')
+        self._finalizer = weakref.finalize(self, lib.freeNameBuffer, ctypes.byref(buffer))
+    
+    def __len__(self):
+        return self._count
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("NameView index out of range")
+        # Exclude the NUL terminator
+        return str(self._data[self._offsets[index]:self._offsets[index + 1] - 1], 'utf-8')
+    
+    def __iter__(self):
+        data = self._data
+        offsets = self._offsets
+        for i in range(self._count):
+            yield str(data[offsets[i]:offsets[i + 1] - 1], 'utf-8')
+    
+    def __repr__(self):
+        return f"NameView({self._count} names)"
 
 class PlaylistBackend:
-    """Wrapper class for the C playlist library."""
+    """
+    Wrapper class for the C playlist library.
+    
+    Each backend owns its own C playlist handle, so any number of
+    backends in one process hold independent playlists.
+    
+    Methods are safe to call from several threads at once. The library
+    guards each playlist with a reader-writer lock and ctypes releases
+    the GIL during calls, so reads (searches, listings, snapshots,
+    saves) run in parallel across cores while mutations (adds, deletes,
+    plays, loads, journal changes) are serialized. size() and generation
+    never block. Only close() must not race with other calls.
+    
+    Backends in different processes can share one playlist through
+    open_journal(..., shared=True).
+    """
     
     def __init__(self):
         self.lib = None
+        self.handle = None  # Playlist* from playlist_create
+        self._handle_finalizer = None
+        self._snapshot_file = None
+        self._last_save = None  # (path, generation) of the last successful save
         self._setup_functions()
     
     def load_library(self, lib_path=None):
@@ -75,52 +180,106 @@ class PlaylistBackend:
         if not self.lib:
             return
         
+        # playlist_create / playlist_destroy
+        self.lib.playlist_create.argtypes = []
+        self.lib.playlist_create.restype = ctypes.c_void_p
+        self.lib.playlist_destroy.argtypes = [ctypes.c_void_p]
+        self.lib.playlist_destroy.restype = None
+        
         # initializePlaylist
-        self.lib.initializePlaylist.argtypes = []
+        self.lib.initializePlaylist.argtypes = [ctypes.c_void_p]
         self.lib.initializePlaylist.restype = None
         
         # addSong
-        self.lib.addSong.argtypes = [ctypes.c_char_p]
+        self.lib.addSong.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
         self.lib.addSong.restype = ctypes.c_int
         
         # deleteSong
-        self.lib.deleteSong.argtypes = [ctypes.c_char_p]
+        self.lib.deleteSong.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
         self.lib.deleteSong.restype = ctypes.c_int
         
+        # addSongs
+        self.lib.addSongs.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_char_p), ctypes.c_int, ctypes.POINTER(ctypes.c_int)]
+        self.lib.addSongs.restype = ctypes.c_int
+        
+        # deleteSongs
+        self.lib.deleteSongs.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_char_p), ctypes.c_int, ctypes.POINTER(ctypes.c_int)]
+        self.lib.deleteSongs.restype = ctypes.c_int
+        
         # playSong
-        self.lib.playSong.argtypes = [ctypes.c_char_p]
+        self.lib.playSong.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
         self.lib.playSong.restype = ctypes.POINTER(ctypes.c_char)
         
         # playNext
-        self.lib.playNext.argtypes = []
+        self.lib.playNext.argtypes = [ctypes.c_void_p]
         self.lib.playNext.restype = ctypes.POINTER(ctypes.c_char)
         
         # playPrevious
-        self.lib.playPrevious.argtypes = []
+        self.lib.playPrevious.argtypes = [ctypes.c_void_p]
         self.lib.playPrevious.restype = ctypes.POINTER(ctypes.c_char)
         
+        # playSongRecord / playNextRecord / playPreviousRecord
+        self.lib.playSongRecord.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.POINTER(SongRecord)]
+        self.lib.playSongRecord.restype = ctypes.c_int
+        self.lib.playNextRecord.argtypes = [ctypes.c_void_p, ctypes.POINTER(SongRecord)]
+        self.lib.playNextRecord.restype = ctypes.c_int
+        self.lib.playPreviousRecord.argtypes = [ctypes.c_void_p, ctypes.POINTER(SongRecord)]
+        self.lib.playPreviousRecord.restype = ctypes.c_int
+        
         # searchSong
-        self.lib.searchSong.argtypes = [ctypes.c_char_p]
+        self.lib.searchSong.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
         self.lib.searchSong.restype = ctypes.POINTER(ctypes.c_char)
         
         # displayPlaylist
-        self.lib.displayPlaylist.argtypes = [ctypes.POINTER(ctypes.c_int)]
+        self.lib.displayPlaylist.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int)]
         self.lib.displayPlaylist.restype = ctypes.POINTER(ctypes.POINTER(ctypes.c_char))
         
         # displayFavorites
-        self.lib.displayFavorites.argtypes = [ctypes.POINTER(ctypes.c_int)]
+        self.lib.displayFavorites.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int)]
         self.lib.displayFavorites.restype = ctypes.POINTER(ctypes.POINTER(ctypes.c_char))
         
         # savePlaylistToFile
-        self.lib.savePlaylistToFile.argtypes = [ctypes.c_char_p]
-        self.lib.savePlaylistToFile.restype = None
+        self.lib.savePlaylistToFile.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        self.lib.savePlaylistToFile.restype = ctypes.c_int
         
         # loadPlaylistFromFile
-        self.lib.loadPlaylistFromFile.argtypes = [ctypes.c_char_p]
+        self.lib.loadPlaylistFromFile.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
         self.lib.loadPlaylistFromFile.restype = None
         
+        # savePlaylistBinary
+        self.lib.savePlaylistBinary.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        self.lib.savePlaylistBinary.restype = ctypes.c_int
+        
+        # loadPlaylistBinary
+        self.lib.loadPlaylistBinary.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        self.lib.loadPlaylistBinary.restype = ctypes.c_int
+        
+        # journalOpen
+        self.lib.journalOpen.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        self.lib.journalOpen.restype = ctypes.c_int
+        
+        # journalOpenShared
+        self.lib.journalOpenShared.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        self.lib.journalOpenShared.restype = ctypes.c_int
+        
+        # journalClose
+        self.lib.journalClose.argtypes = [ctypes.c_void_p]
+        self.lib.journalClose.restype = None
+        
+        # journalSize
+        self.lib.journalSize.argtypes = [ctypes.c_void_p]
+        self.lib.journalSize.restype = ctypes.c_long
+        
+        # journalReplay
+        self.lib.journalReplay.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        self.lib.journalReplay.restype = ctypes.c_int
+        
+        # journalCompact
+        self.lib.journalCompact.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        self.lib.journalCompact.restype = ctypes.c_int
+        
         # cleanupPlaylist
-        self.lib.cleanupPlaylist.argtypes = []
+        self.lib.cleanupPlaylist.argtypes = [ctypes.c_void_p]
         self.lib.cleanupPlaylist.restype = None
         
         # freeStringArray
@@ -130,6 +289,86 @@ class PlaylistBackend:
         # freeString
         self.lib.freeString.argtypes = [ctypes.POINTER(ctypes.c_char)]
         self.lib.freeString.restype = None
+        
+        # getPlaylistSize
+        self.lib.getPlaylistSize.argtypes = [ctypes.c_void_p]
+        self.lib.getPlaylistSize.restype = ctypes.c_int
+        
+        # getGeneration
+        self.lib.getGeneration.argtypes = [ctypes.c_void_p]
+        self.lib.getGeneration.restype = ctypes.c_ulong
+        
+        # getMemoryUsage
+        self.lib.getMemoryUsage.argtypes = [ctypes.c_void_p]
+        self.lib.getMemoryUsage.restype = ctypes.c_size_t
+        
+        # exportNames
+        self.lib.exportNames.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.POINTER(NameBuffer)]
+        self.lib.exportNames.restype = ctypes.c_int
+        
+        # freeNameBuffer
+        self.lib.freeNameBuffer.argtypes = [ctypes.POINTER(NameBuffer)]
+        self.lib.freeNameBuffer.restype = None
+        
+        # snapshotPlaylist
+        self.lib.snapshotPlaylist.argtypes = [ctypes.c_void_p, ctypes.POINTER(SongRecord), ctypes.c_int]
+        self.lib.snapshotPlaylist.restype = ctypes.c_int
+        
+        # searchSongs
+        self.lib.searchSongs.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_int,
+                                         ctypes.POINTER(SongRecord), ctypes.POINTER(ctypes.c_int)]
+        self.lib.searchSongs.restype = ctypes.c_int
+        
+        # fuzzySearchSongs
+        self.lib.fuzzySearchSongs.argtypes = self.lib.searchSongs.argtypes
+        self.lib.fuzzySearchSongs.restype = ctypes.c_int
+        
+        # Play-count ranking
+        self.lib.topPlayed.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.POINTER(SongRecord)]
+        self.lib.topPlayed.restype = ctypes.c_int
+        self.lib.favoritesPage.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.POINTER(SongRecord),
+                                           ctypes.POINTER(ctypes.c_int)]
+        self.lib.favoritesPage.restype = ctypes.c_int
+        self.lib.getFavoriteCount.argtypes = [ctypes.c_void_p]
+        self.lib.getFavoriteCount.restype = ctypes.c_int
+        self.lib.getPlayRank.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        self.lib.getPlayRank.restype = ctypes.c_int
+        
+        # Positional index
+        self.lib.getRange.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.POINTER(SongRecord)]
+        self.lib.getRange.restype = ctypes.c_int
+        self.lib.getSongPosition.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        self.lib.getSongPosition.restype = ctypes.c_int
+        
+        # This backend's playlist, destroyed with the backend (or by close())
+        if self._handle_finalizer:
+            self._handle_finalizer()
+        self.handle = self.lib.playlist_create()
+        if not self.handle:
+            raise MemoryError("Could not create playlist")
+        self._handle_finalizer = weakref.finalize(self, self.lib.playlist_destroy, self.handle)
+    
+    def _run_batch(self, func, items):
+        """Marshal a batch of strings into one C call and return per-item status."""
+        encoded = [item.encode('utf-8') for item in items]
+        if not encoded:
+            return []
+        
+        n = len(encoded)
+        strings = (ctypes.c_char_p * n)(*encoded)
+        results = (ctypes.c_int * n)()
+        func(self.handle, strings, n, results)
+        return [status == 1 for status in results]
+    
+    @staticmethod
+    def _record_to_dict(record):
+        """Convert a SongRecord to a dict."""
+        return {
+            'name': record.songName.decode('utf-8'),
+            'play_count': record.playCount,
+            'is_favorite': bool(record.isFavorite),
+            'position': record.position,
+        }
     
     def _cstring_to_python(self, c_string_ptr):
         """Convert C string pointer to Python string and free C memory."""
@@ -146,11 +385,30 @@ class PlaylistBackend:
                 self.lib.freeString(c_string_ptr)
             return None
     
+    @property
+    def generation(self):
+        """Mutation counter, bumped by the C library on every state change."""
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        return self.lib.getGeneration(self.handle)
+    
+    def size(self):
+        """Number of songs in the playlist."""
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        return self.lib.getPlaylistSize(self.handle)
+    
+    def memory_usage(self):
+        """Bytes held by the C playlist (node slabs, name arena, hash index)."""
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        return self.lib.getMemoryUsage(self.handle)
+    
     def initialize(self):
         """Initialize the playlist."""
         if not self.lib:
             raise RuntimeError("Library not loaded")
-        self.lib.initializePlaylist()
+        self.lib.initializePlaylist(self.handle)
     
     def add_song(self, filepath):
         """
@@ -166,7 +424,7 @@ class PlaylistBackend:
             raise RuntimeError("Library not loaded")
         
         filepath_bytes = filepath.encode('utf-8')
-        result = self.lib.addSong(filepath_bytes)
+        result = self.lib.addSong(self.handle, filepath_bytes)
         return result == 1
     
     def delete_song(self, title):
@@ -183,9 +441,39 @@ class PlaylistBackend:
             raise RuntimeError("Library not loaded")
         
         title_bytes = title.encode('utf-8')
-        result = self.lib.deleteSong(title_bytes)
+        result = self.lib.deleteSong(self.handle, title_bytes)
         return result == 1
     
+    def add_songs(self, filepaths):
+        """
+        Add many songs in a single C call.
+        
+        Args:
+            filepaths: Iterable of full paths to song files.
+        
+        Returns:
+            List of booleans, True where the song was added.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        
+        return self._run_batch(self.lib.addSongs, filepaths)
+    
+    def delete_songs(self, titles):
+        """
+        Delete many songs in a single C call.
+        
+        Args:
+            titles: Iterable of song titles (basenames).
+        
+        Returns:
+            List of booleans, True where the song was deleted.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        
+        return self._run_batch(self.lib.deleteSongs, titles)
+    
     def play_song(self, title):
         """
         Play a song (increments play count, marks favorite if >= 3).
@@ -200,7 +488,7 @@ class PlaylistBackend:
             raise RuntimeError("Library not loaded")
         
         title_bytes = title.encode('utf-8')
-        result_ptr = self.lib.playSong(title_bytes)
+        result_ptr = self.lib.playSong(self.handle, title_bytes)
         return self._cstring_to_python(result_ptr)
     
     def play_next(self):
@@ -213,7 +501,7 @@ class PlaylistBackend:
         if not self.lib:
             raise RuntimeError("Library not loaded")
         
-        result_ptr = self.lib.playNext()
+        result_ptr = self.lib.playNext(self.handle)
         return self._cstring_to_python(result_ptr)
     
     def play_previous(self):
@@ -226,9 +514,58 @@ class PlaylistBackend:
         if not self.lib:
             raise RuntimeError("Library not loaded")
         
-        result_ptr = self.lib.playPrevious()
+        result_ptr = self.lib.playPrevious(self.handle)
         return self._cstring_to_python(result_ptr)
     
+    def play_song_record(self, title):
+        """
+        Play a song and return its updated record.
+        
+        Args:
+            title: Song title.
+        
+        Returns:
+            Dict with 'name', 'play_count', 'is_favorite' and 'position'
+            (-1, not computed) keys, or None if not found.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        
+        record = SongRecord()
+        if not self.lib.playSongRecord(self.handle, title.encode('utf-8'), ctypes.byref(record)):
+            return None
+        return self._record_to_dict(record)
+    
+    def play_next_record(self):
+        """
+        Play the next song and return its updated record.
+        
+        Returns:
+            Record dict (see play_song_record), or None if playlist is empty.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        
+        record = SongRecord()
+        if not self.lib.playNextRecord(self.handle, ctypes.byref(record)):
+            return None
+        return self._record_to_dict(record)
+    
+    def play_previous_record(self):
+        """
+        Play the previous song and return its updated record.
+        
+        Returns:
+            Record dict (see play_song_record), or None if playlist is empty.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        
+        record = SongRecord()
+        if not self.lib.playPreviousRecord(self.handle, ctypes.byref(record)):
+            return None
+        return self._record_to_dict(record)
+    
     def search_song(self, title):
         """
         Search for a song and return info string.
@@ -243,35 +580,141 @@ class PlaylistBackend:
             raise RuntimeError("Library not loaded")
         
         title_bytes = title.encode('utf-8')
-        result_ptr = self.lib.searchSong(title_bytes)
+        result_ptr = self.lib.searchSong(self.handle, title_bytes)
         return self._cstring_to_python(result_ptr)
     
-    def get_playlist(self):
+    def search(self, query, limit=20, offset=0):
         """
-        Get all songs in the playlist.
+        Case-insensitive substring search over song titles, ranked in C.
+        
+        Title prefixes rank first, then matches at a word start, then
+        matches inside a word; ties go to earlier matches, shorter titles
+        and playlist order.
+        
+        Args:
+            query: Text to look for.
+            limit: Maximum number of results to return.
+            offset: Number of ranked results to skip.
         
         Returns:
-            List of song titles.
+            Dict with 'total' (number of matching songs) and 'results'
+            (list of record dicts for the requested page; position is -1).
+        """
+        return self._run_search(self.lib.searchSongs if self.lib else None, query, limit, offset)
+    
+    def fuzzy_search(self, query, limit=20, offset=0):
+        """
+        Typo-tolerant search over the words of song titles, ranked in C.
+        
+        Every query word must match a title word within a small edit
+        distance (none for 1-2 letters, 1 up to 5 letters, 2 beyond).
+        Bitrate noise such as "128 Kbps" is ignored on both sides.
+        Results are ranked by total edit distance.
+        
+        Args:
+            query: Words to look for, e.g. "chaleya jwan".
+            limit: Maximum number of results to return.
+            offset: Number of ranked results to skip.
+        
+        Returns:
+            Dict with 'total' and 'results', as returned by search().
+        """
+        return self._run_search(self.lib.fuzzySearchSongs if self.lib else None, query, limit, offset)
+    
+    def top_played(self, k=10):
+        """
+        Get the most played songs from the C ranking index in O(k + log n).
+        
+        Args:
+            k: Number of songs to return.
+        
+        Returns:
+            List of record dicts, highest play count first (ties go to the
+            song that reached the count first). Unplayed songs are left out.
         """
         if not self.lib:
             raise RuntimeError("Library not loaded")
         
-        count = ctypes.c_int(0)
-        result_ptr = self.lib.displayPlaylist(ctypes.byref(count))
-        
-        if not result_ptr or count.value == 0:
+        if k <= 0:
             return []
+        records = (SongRecord * k)()
+        count = self.lib.topPlayed(self.handle, 0, k, records)
+        return [self._record_to_dict(record) for record in records[:count]]
+    
+    def favorites(self, offset=0, limit=20):
+        """
+        Get a page of favorite songs, most played first.
+        
+        Args:
+            offset: Number of favorites to skip.
+            limit: Maximum number of favorites to return.
         
-        songs = []
-        for i in range(count.value):
-            if result_ptr[i]:
-                song = ctypes.string_at(result_ptr[i]).decode('utf-8')
-                songs.append(song)
+        Returns:
+            Dict with 'total' (number of favorites) and 'results' (list of
+            record dicts for the requested page; position is -1).
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
         
-        # Free the array
-        self.lib.freeStringArray(result_ptr, count.value)
+        limit = max(limit, 0)
+        records = (SongRecord * max(limit, 1))()
+        total = ctypes.c_int(0)
+        count = self.lib.favoritesPage(self.handle, max(offset, 0), limit, records, ctypes.byref(total))
+        return {
+            'total': total.value,
+            'results': [self._record_to_dict(record) for record in records[:count]],
+        }
+    
+    def favorite_count(self):
+        """Get the number of favorite songs (O(1))."""
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        return self.lib.getFavoriteCount(self.handle)
+    
+    def play_rank(self, title):
+        """
+        Get a song's rank by play count (1 = most played).
+        
+        Songs with equal play counts share a rank; the rank is 1 plus the
+        number of songs with strictly more plays.
+        
+        Args:
+            title: Song title.
+        
+        Returns:
+            Rank as int, or None if the song is not in the playlist.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        
+        rank = self.lib.getPlayRank(self.handle, title.encode('utf-8'))
+        return rank or None
+    
+    def _run_search(self, func, query, limit, offset):
+        """Run a paged C search function and convert its records."""
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        
+        if not query:
+            return {'total': 0, 'results': []}
+        
+        limit = max(limit, 0)
+        records = (SongRecord * max(limit, 1))()
+        total = ctypes.c_int(0)
+        count = func(self.handle, query.encode('utf-8'), max(offset, 0), limit, records, ctypes.byref(total))
+        return {
+            'total': total.value,
+            'results': [self._record_to_dict(record) for record in records[:count]],
+        }
+    
+    def get_playlist(self):
+        """
+        Get all songs in the playlist.
         
-        return songs
+        Returns:
+            List of song titles.
+        """
+        return list(self.get_playlist_view())
     
     def get_favorites(self):
         """
@@ -280,55 +723,259 @@ class PlaylistBackend:
         Returns:
             List of favorite song titles.
         """
+        return list(self.get_favorites_view())
+    
+    def get_playlist_view(self):
+        """
+        Get all songs as a lazily decoded view over one C buffer.
+        
+        Returns:
+            NameView of song titles in playlist order.
+        """
+        return self._export_names(favorites_only=False)
+    
+    def get_favorites_view(self):
+        """
+        Get favorite songs as a lazily decoded view over one C buffer.
+        
+        Returns:
+            NameView of favorite song titles in playlist order.
+        """
+        return self._export_names(favorites_only=True)
+    
+    def _export_names(self, favorites_only):
+        """Export names in one C call and wrap them in a NameView."""
         if not self.lib:
             raise RuntimeError("Library not loaded")
         
-        count = ctypes.c_int(0)
-        result_ptr = self.lib.displayFavorites(ctypes.byref(count))
+        buffer = NameBuffer()
+        self.lib.exportNames(self.handle, 1 if favorites_only else 0, ctypes.byref(buffer))
+        return NameView(self.lib, buffer)
+    
+    def snapshot(self):
+        """
+        Get every song record in a single C call.
+        
+        Returns:
+            List of dicts with 'name', 'play_count', 'is_favorite' and
+            'position' keys, in playlist order.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        
+        size = self.lib.getPlaylistSize(self.handle)
+        if size <= 0:
+            return []
+        
+        records = (SongRecord * size)()
+        count = self.lib.snapshotPlaylist(self.handle, records, size)
+        
+        return [self._record_to_dict(record) for record in records[:count]]
+    
+    def get_range(self, offset, limit):
+        """
+        Get a window of songs in playlist order in O(log n + limit).
+        
+        Args:
+            offset: 0-based position of the first song.
+            limit: Maximum number of songs to return.
+        
+        Returns:
+            List of record dicts; 'position' is each song's list position.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
         
-        if not result_ptr or count.value == 0:
+        if offset < 0 or limit <= 0:
             return []
+        records = (SongRecord * limit)()
+        count = self.lib.getRange(self.handle, offset, limit, records)
+        return [self._record_to_dict(record) for record in records[:count]]
+    
+    def song_position(self, title):
+        """
+        Get a song's 0-based position in playlist order in O(log n).
         
-        favorites = []
-        for i in range(count.value):
-            if result_ptr[i]:
-                song = ctypes.string_at(result_ptr[i]).decode('utf-8')
-                favorites.append(song)
+        Args:
+            title: Song title.
         
-        # Free the array
-        self.lib.freeStringArray(result_ptr, count.value)
+        Returns:
+            Position as int, or None if the song is not in the playlist.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
         
-        return favorites
+        position = self.lib.getSongPosition(self.handle, title.encode('utf-8'))
+        return None if position < 0 else position
     
-    def save(self, filename):
+    def save(self, filename, force=False):
         """
         Save playlist to file.
         
+        Files ending in BINARY_EXTENSION use the binary format, anything
+        else is written as CSV. Saves are written to a temp file and
+        renamed into place. Saving to the same path again is skipped
+        when nothing changed since the last save.
+        
         Args:
             filename: Path to save file.
+            force: Write even if the playlist is unchanged.
+        
+        Returns:
+            True if successful (or skipped), False otherwise.
         """
         if not self.lib:
             raise RuntimeError("Library not loaded")
         
+        generation = self.generation
+        save_key = (os.path.abspath(filename), generation)
+        if not force and self._last_save == save_key and os.path.exists(filename):
+            return True
+        
         filename_bytes = filename.encode('utf-8')
-        self.lib.savePlaylistToFile(filename_bytes)
+        if filename.lower().endswith(BINARY_EXTENSION):
+            ok = self.lib.savePlaylistBinary(self.handle, filename_bytes) == 1
+        else:
+            ok = self.lib.savePlaylistToFile(self.handle, filename_bytes) == 1
+        
+        if ok:
+            self._last_save = save_key
+        return ok
     
     def load(self, filename):
         """
         Load playlist from file.
         
+        Files ending in BINARY_EXTENSION use the binary format, anything
+        else is read as CSV.
+        
         Args:
             filename: Path to load file from.
+        
+        Returns:
+            True if successful, False otherwise (CSV loads always report True).
         """
         if not self.lib:
             raise RuntimeError("Library not loaded")
         
         filename_bytes = filename.encode('utf-8')
-        self.lib.loadPlaylistFromFile(filename_bytes)
+        if filename.lower().endswith(BINARY_EXTENSION):
+            return self.lib.loadPlaylistBinary(self.handle, filename_bytes) == 1
+        
+        self.lib.loadPlaylistFromFile(self.handle, filename_bytes)
+        return True
+    
+    def open_journal(self, snapshot_file, journal_file=None, shared=False):
+        """
+        Switch to journaling mode.
+        
+        Loads the binary snapshot (if present), replays the journal on top
+        of it, then appends every later mutation (add, delete, play,
+        favorite change) to the journal instead of requiring full saves.
+        A non-empty journal is compacted into the snapshot right away.
+        
+        In shared mode (POSIX only) the journal is the playlist's source
+        of truth for every backend that opens it, in any process: each
+        call first applies the records others appended, and mutations are
+        serialized with a file lock, so no play or favorite is lost.
+        Compacting in one backend makes the others reload the snapshot.
+        
+        Args:
+            snapshot_file: Path to the binary snapshot; must end in
+                BINARY_EXTENSION, since compaction always writes the
+                binary format.
+            journal_file: Path to the journal. Defaults to snapshot_file + ".journal".
+            shared: Follow changes made by other backends and processes.
+        
+        Returns:
+            Number of journal records replayed.
+        
+        Raises:
+            ValueError: If snapshot_file doesn't end in BINARY_EXTENSION.
+            RuntimeError: If the journal cannot be opened (or shared mode
+                is unsupported on this platform).
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        if not snapshot_file.lower().endswith(BINARY_EXTENSION):
+            raise ValueError(f"Journal snapshot must be a {BINARY_EXTENSION} file: {snapshot_file}")
+        
+        self.close_journal()
+        if journal_file is None:
+            journal_file = snapshot_file + ".journal"
+        
+        if shared:
+            replayed = self.lib.journalOpenShared(self.handle, snapshot_file.encode('utf-8'),
+                                                  journal_file.encode('utf-8'))
+            if replayed < 0:
+                raise RuntimeError(f"Could not open shared journal {journal_file}")
+            self._snapshot_file = snapshot_file
+            if replayed > 0:
+                self.compact()
+            return replayed
+        
+        if os.path.exists(snapshot_file):
+            self.lib.loadPlaylistBinary(self.handle, snapshot_file.encode('utf-8'))
+        replayed = self.lib.journalReplay(self.handle, journal_file.encode('utf-8'))
+        
+        if not self.lib.journalOpen(self.handle, journal_file.encode('utf-8')):
+            raise RuntimeError(f"Could not open journal {journal_file}")
+        self._snapshot_file = snapshot_file
+        
+        if replayed >= 0 and os.path.getsize(journal_file) > 0:
+            self.compact()
+        return max(replayed, 0)
+    
+    def close_journal(self):
+        """Stop journaling (mutations since the last compaction stay in the journal)."""
+        if not self.lib:
+            return
+        self.lib.journalClose(self.handle)
+        self._snapshot_file = None
+    
+    def journal_size(self):
+        """Bytes in the open journal, or 0 when journaling is off."""
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        return self.lib.journalSize(self.handle)
+    
+    def compact(self):
+        """
+        Rewrite the snapshot and empty the journal.
+        
+        Returns:
+            True if successful, False otherwise (or if journaling is off).
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        if not self._snapshot_file:
+            return False
+        return self.lib.journalCompact(self.handle, self._snapshot_file.encode('utf-8')) == 1
+    
+    def maybe_compact(self, threshold=DEFAULT_COMPACT_BYTES):
+        """
+        Compact only once the journal has grown past threshold bytes.
+        
+        Returns:
+            True if a compaction ran and succeeded, False otherwise.
+        """
+        if not self.lib:
+            raise RuntimeError("Library not loaded")
+        if self.journal_size() <= threshold:
+            return False
+        return self.compact()
     
     def cleanup(self):
         """Cleanup and free all memory."""
         if not self.lib:
             return
-        self.lib.cleanupPlaylist()
+        self.lib.cleanupPlaylist(self.handle)
+    
+    def close(self):
+        """Destroy this backend's playlist (and close its journal); the backend can't be used afterwards."""
+        if self._handle_finalizer:
+            self._handle_finalizer()
+        self._handle_finalizer = None
+        self.handle = None
+        self.lib = None
 
@@ -0,0 +1,178 @@
+"""
+Incremental library scanner.
+Walks nested song directories with os.scandir across a thread pool and
+keeps a manifest of (path, size, mtime) so later sessions only feed new,
+changed or removed files to the playlist backend.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from playlist import song_basename
+
+# Supported audio formats
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.m4a', '.flac')
+
+# Directories scanned concurrently (slow/network filesystems benefit most)
+DEFAULT_MAX_WORKERS = 8
+
+# Paths handed to the backend per add_songs/delete_songs call
+DEFAULT_BATCH_SIZE = 5000
+
+MANIFEST_VERSION = 1
+
+def _scan_directory(directory):
+    """
+    Scan one directory level.
+
+    Returns:
+        (files, subdirectories) where files maps path -> (size, mtime_ns).
+    """
+    files = {}
+    subdirectories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    pass  # Entry vanished or is unreadable
+    except OSError:
+        pass  # Directory vanished or is unreadable
+    return files, subdirectories
+
+def scan_tree(roots, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Recursively find audio files under roots, one directory per task.
+
+    Args:
+        roots: Iterable of directory paths (missing ones are skipped).
+        max_workers: Thread pool size.
+
+    Returns:
+        Dict mapping file path -> (size, mtime_ns).
+    """
+    files = {}
+    seen = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for root in roots:
+            # Case-insensitive filesystems can list "songs" and "Songs" twice
+            key = os.path.normcase(os.path.realpath(root))
+            if os.path.isdir(root) and key not in seen:
+                seen.add(key)
+                pending.add(executor.submit(_scan_directory, root))
+
+        while pending:
+            future = pending.pop()
+            dir_files, subdirectories = future.result()
+            files.update(dir_files)
+            for subdirectory in subdirectories:
+                pending.add(executor.submit(_scan_directory, subdirectory))
+    return files
+
+def load_manifest(manifest_path):
+    """
+    Load a manifest written by save_manifest.
+
+    Returns:
+        Dict mapping file path -> (size, mtime_ns); empty if missing or unreadable.
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+        return {}
+    return {path: tuple(entry) for path, entry in data.get('files', {}).items()}
+
+def save_manifest(manifest_path, files):
+    """Write the manifest atomically (temp file + rename)."""
+    # Unique per writer: every session syncs into the same manifest
+    temp_path = f"{manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': MANIFEST_VERSION, 'files': files}, f)
+    os.replace(temp_path, manifest_path)
+
+def diff_manifest(old_files, new_files):
+    """
+    Compare two manifests.
+
+    Returns:
+        (added, changed, removed) sorted lists of paths.
+    """
+    added = sorted(path for path in new_files if path not in old_files)
+    changed = sorted(path for path in new_files
+                     if path in old_files and tuple(old_files[path]) != tuple(new_files[path]))
+    removed = sorted(path for path in old_files if path not in new_files)
+    return added, changed, removed
+
+def _batches(items, batch_size):
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+def sync_library(backend, roots, manifest_path, max_workers=DEFAULT_MAX_WORKERS,
+                 batch_size=DEFAULT_BATCH_SIZE, metadata=None):
+    """
+    Scan roots and apply only the differences since the last scan to backend.
+
+    New files are added and titles whose files were all removed are
+    deleted, in batches. If the backend is empty (e.g. no saved playlist),
+    every file is treated as new.
+
+    Args:
+        backend: PlaylistBackend to update.
+        roots: Iterable of directory paths to scan recursively.
+        manifest_path: Where the (path, size, mtime) manifest is kept.
+        max_workers: Thread pool size for the scan.
+        batch_size: Paths per backend call.
+        metadata: Optional MetadataStore; tags of new and changed files
+            are parsed (across a process pool) and stored once the
+            library itself is synced. Tagging errors are ignored.
+
+    Returns:
+        Dict with 'added', 'changed' and 'removed' path lists,
+        'song_paths', mapping each title to its file (first path wins),
+        'files', the scanned path -> (size, mtime_ns) map, and 'tagged',
+        the number of files whose tags were parsed.
+    """
+    old_files = load_manifest(manifest_path) if backend.size() > 0 else {}
+    new_files = scan_tree(roots, max_workers=max_workers)
+    added, changed, removed = diff_manifest(old_files, new_files)
+
+    song_paths = {}
+    for path in sorted(new_files):
+        song_paths.setdefault(song_basename(path), path)
+
+    for batch in _batches(added, batch_size):
+        backend.add_songs(batch)
+
+    # A title stays while any file still maps to it
+    removed_titles = sorted({song_basename(path) for path in removed} - song_paths.keys())
+    for batch in _batches(removed_titles, batch_size):
+        backend.delete_songs(batch)
+
+    save_manifest(manifest_path, new_files)
+    result = {
+        'added': added,
+        'changed': changed,
+        'removed': removed,
+        'song_paths': song_paths,
+        'files': new_files,
+        'tagged': 0,
+    }
+
+    if metadata is not None:
+        try:
+            result['tagged'] = metadata.refresh(new_files)
+        except Exception:
+            pass  # Tags are optional (e.g. store locked); the next sync retries
+    return result
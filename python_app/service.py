@@ -0,0 +1,525 @@
+"""
+Playlist service.
+A standalone daemon owns one PlaylistBackend and serves its operations
+over a Unix-domain socket, so any number of UI processes share one warm
+playlist. Requests and responses are length-prefixed binary frames;
+clients may pipeline several requests before reading the responses.
+PlaylistClient pools connections and mirrors the PlaylistBackend API.
+
+Run the daemon with:
+    python python_app/service.py --socket /tmp/playlist.sock --snapshot playlist_data.bin
+"""
+
+import argparse
+import inspect
+import os
+import signal
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+from collections.abc import Iterable
+
+from playlist import PlaylistBackend
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "playlist.sock")
+
+# Connections a client keeps open at once
+DEFAULT_POOL_SIZE = 4
+
+# Largest frame either side accepts (a snapshot of a very large library)
+MAX_FRAME_SIZE = 1 << 28
+
+# PlaylistBackend operations served, by opcode (append only: the index is
+# the wire opcode). None marks a retired opcode: operations on client-chosen
+# file paths (save, load, open_journal) and close_journal are not served,
+# since the daemon owns its snapshot and journal
+METHODS = (
+    'generation', 'size', 'memory_usage', 'initialize',
+    'add_song', 'delete_song', 'add_songs', 'delete_songs',
+    'play_song', 'play_next', 'play_previous',
+    'play_song_record', 'play_next_record', 'play_previous_record',
+    'search_song', 'search', 'fuzzy_search', 'top_played',
+    'favorites', 'favorite_count', 'play_rank',
+    'get_playlist', 'get_favorites', 'snapshot', 'get_range', 'song_position',
+    None, None, None, None, 'journal_size',
+    'compact', 'maybe_compact', 'cleanup',
+)
+OPCODES = {name: opcode for opcode, name in enumerate(METHODS) if name}
+
+# Exceptions re-raised by the client under their own type; anything else
+# becomes RuntimeError
+REMOTE_ERRORS = {error.__name__: error for error in
+                 (RuntimeError, ValueError, TypeError, MemoryError, OSError, KeyError)}
+
+# Frame layout (big-endian):
+#   request:  u32 length | u32 request id | u16 opcode | encoded argument list
+#   response: u32 length | u32 request id | u8 status  | encoded value
+# length counts the bytes after itself. status 0 carries the return
+# value, status 1 a [exception type, message] list.
+_LENGTH = struct.Struct('>I')
+_REQUEST = struct.Struct('>IH')
+_RESPONSE = struct.Struct('>IB')
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# Values are tagged: N None, T/F bools, i int64, s UTF-8 string, l list,
+# d dict, r list of song records (the shape of snapshot()/search() rows)
+_INT = struct.Struct('>q')
+_COUNT = struct.Struct('>I')
+_RECORD = struct.Struct('>iBi')
+_NAME_LENGTH = struct.Struct('>H')
+RECORD_KEYS = ('name', 'play_count', 'is_favorite', 'position')
+
+def _is_record(value):
+    return type(value) is dict and tuple(value) == RECORD_KEYS
+
+def encode_value(value, out):
+    """Append the wire encoding of value to the bytearray out."""
+    if value is None:
+        out += b'N'
+    elif value is True:
+        out += b'T'
+    elif value is False:
+        out += b'F'
+    elif isinstance(value, int):
+        out += b'i'
+        out += _INT.pack(value)
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        out += b's'
+        out += _COUNT.pack(len(data))
+        out += data
+    elif isinstance(value, dict):
+        out += b'd'
+        out += _COUNT.pack(len(value))
+        for key, item in value.items():
+            encode_value(key, out)
+            encode_value(item, out)
+    elif isinstance(value, Iterable) and not isinstance(value, (bytes, bytearray)):
+        items = value if isinstance(value, (list, tuple)) else list(value)
+        if items and all(_is_record(item) for item in items):
+            out += b'r'
+            out += _COUNT.pack(len(items))
+            for record in items:
+                name = record['name'].encode('utf-8')
+                out += _NAME_LENGTH.pack(len(name))
+                out += name
+                out += _RECORD.pack(record['play_count'], record['is_favorite'], record['position'])
+        else:
+            out += b'l'
+            out += _COUNT.pack(len(items))
+            for item in items:
+                encode_value(item, out)
+    else:
+        raise TypeError(f"Cannot encode {type(value).__name__}")
+
+def decode_value(data, offset=0):
+    """
+    Decode one value from data (bytes or memoryview) at offset.
+
+    Returns:
+        (value, offset just past it).
+
+    Raises:
+        ValueError: On a malformed or truncated encoding.
+    """
+    try:
+        tag = data[offset:offset + 1]
+        offset += 1
+        if tag == b'N':
+            return None, offset
+        if tag == b'T':
+            return True, offset
+        if tag == b'F':
+            return False, offset
+        if tag == b'i':
+            return _INT.unpack_from(data, offset)[0], offset + _INT.size
+        if tag == b's':
+            length = _COUNT.unpack_from(data, offset)[0]
+            offset += _COUNT.size
+            if offset + length > len(data):
+                raise ValueError("Truncated string")
+            return str(data[offset:offset + length], 'utf-8'), offset + length
+
+        count = _COUNT.unpack_from(data, offset)[0]
+        offset += _COUNT.size
+        if tag == b'l':
+            items = []
+            for _ in range(count):
+                item, offset = decode_value(data, offset)
+                items.append(item)
+            return items, offset
+        if tag == b'd':
+            result = {}
+            for _ in range(count):
+                key, offset = decode_value(data, offset)
+                result[key], offset = decode_value(data, offset)
+            return result, offset
+        if tag == b'r':
+            records = []
+            for _ in range(count):
+                length = _NAME_LENGTH.unpack_from(data, offset)[0]
+                offset += _NAME_LENGTH.size
+                name = str(data[offset:offset + length], 'utf-8')
+                offset += length
+                play_count, is_favorite, position = _RECORD.unpack_from(data, offset)
+                offset += _RECORD.size
+                records.append({
+                    'name': name,
+                    'play_count': play_count,
+                    'is_favorite': bool(is_favorite),
+                    'position': position,
+                })
+            return records, offset
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed value: {e}") from None
+    raise ValueError(f"Unknown value tag {tag!r}")
+
+def _read_frame(reader):
+    """Read one frame body from a buffered binary file; None at EOF."""
+    header = reader.read(_LENGTH.size)
+    if len(header) < _LENGTH.size:
+        return None
+    length = _LENGTH.unpack(header)[0]
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {length} bytes exceeds the limit")
+    body = reader.read(length)
+    if len(body) < length:
+        return None
+    return body
+
+def _frame(body):
+    return _LENGTH.pack(len(body)) + body
+
+class _ServiceHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        backend = self.server.backend
+        while True:
+            try:
+                body = _read_frame(self.rfile)
+            except ValueError:
+                return  # Oversized frame: drop the connection
+            if body is None:
+                return
+            if len(body) < _REQUEST.size:
+                return
+
+            request_id, opcode = _REQUEST.unpack_from(body)
+            try:
+                if opcode >= len(METHODS) or METHODS[opcode] is None:
+                    raise ValueError(f"Unknown opcode {opcode}")
+                args, _ = decode_value(memoryview(body), _REQUEST.size)
+                name = METHODS[opcode]
+                if name == 'generation':
+                    result = backend.generation
+                else:
+                    result = getattr(backend, name)(*args)
+                out = bytearray(_RESPONSE.pack(request_id, STATUS_OK))
+                encode_value(result, out)
+            except Exception as e:
+                out = bytearray(_RESPONSE.pack(request_id, STATUS_ERROR))
+                encode_value([type(e).__name__, str(e)], out)
+
+            try:
+                self.wfile.write(_frame(out))
+            except OSError:
+                return  # Client went away
+
+class PlaylistServer:
+    """
+    Unix-socket server for one PlaylistBackend, one thread per connection.
+
+    Requests on a connection are answered in order; PlaylistBackend is
+    thread-safe, so requests from different connections run in parallel.
+    """
+
+    def __init__(self, backend, socket_path=DEFAULT_SOCKET_PATH):
+        """
+        Args:
+            backend: Loaded PlaylistBackend to serve.
+            socket_path: Filesystem path of the socket (created owner-only).
+        """
+        self.backend = backend
+        self.socket_path = socket_path
+
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """
+        Bind the socket and serve on a daemon thread.
+
+        Raises:
+            OSError: If another server is already listening on socket_path.
+        """
+        if self._server:
+            return
+        self._remove_stale_socket()
+        # Created owner-only: a socket chmod-ed after bind() could be
+        # connected to by other users in between
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, _ServiceHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+        self._server.backend = self.backend
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="playlist-service", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and remove the socket."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def _remove_stale_socket(self):
+        """Unlink a socket file left behind by a server that died."""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise OSError(f"A playlist service is already running on {self.socket_path}")
+        finally:
+            probe.close()
+
+class _Connection:
+    def __init__(self, socket_path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.settimeout(timeout)
+            self.sock.connect(socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile('rb')
+        self.next_id = 0
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+class PlaylistClient:
+    """
+    Drop-in PlaylistBackend replacement talking to a PlaylistServer.
+
+    Every PlaylistBackend operation listed in METHODS is available with
+    the same signature and return value; the playlist lives in the
+    service, so all clients see the same songs, plays and favorites.
+    Safe to share between threads: each call borrows one of up to
+    pool_size connections. call_many() pipelines several calls over one
+    connection in a single round trip.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, pool_size=DEFAULT_POOL_SIZE, timeout=None):
+        """
+        Args:
+            socket_path: The service's socket.
+            pool_size: Connections kept open at once.
+            timeout: Seconds to wait for a connection slot or a reply
+                (None waits forever).
+        """
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._idle = []  # open connections not in use
+        self._closed = False
+
+    def load_library(self, lib_path=None):
+        """
+        Check that the service is reachable (mirrors PlaylistBackend.load_library).
+
+        Args:
+            lib_path: Ignored; the service loads the library.
+
+        Returns:
+            True if a connection could be made, False otherwise.
+        """
+        try:
+            connection = self._acquire()
+        except (OSError, RuntimeError):
+            return False
+        self._release(connection)
+        return True
+
+    @property
+    def generation(self):
+        """Mutation counter of the served playlist."""
+        return self._call('generation')
+
+    def get_playlist_view(self):
+        """Get all songs (a list; views over C memory cannot cross processes)."""
+        return self.get_playlist()
+
+    def get_favorites_view(self):
+        """Get favorite songs (a list; views over C memory cannot cross processes)."""
+        return self.get_favorites()
+
+    def call_many(self, calls):
+        """
+        Pipeline several calls over one connection.
+
+        All requests are sent before any response is read, so N calls
+        cost one round trip instead of N.
+
+        Args:
+            calls: Iterable of (method name, arg, ...) tuples, e.g.
+                [('play_song', 'a'), ('search', 'b', 5, 0)].
+
+        Returns:
+            List of return values, in call order.
+
+        Raises:
+            The first call's exception if any call failed (every response
+            is still read, so later calls have run).
+        """
+        requests = []
+        for call in calls:
+            name, args = call[0], list(call[1:])
+            if name not in OPCODES:
+                raise ValueError(f"Unknown playlist method {name!r}")
+            requests.append((OPCODES[name], args))
+        if not requests:
+            return []
+
+        connection = self._acquire()
+        try:
+            out = bytearray()
+            request_ids = []
+            for opcode, args in requests:
+                request_id = connection.next_id
+                connection.next_id = (request_id + 1) & 0xFFFFFFFF
+                request_ids.append(request_id)
+                body = bytearray(_REQUEST.pack(request_id, opcode))
+                encode_value(args, body)
+                out += _frame(body)
+            connection.sock.sendall(out)
+
+            responses = []
+            for request_id in request_ids:
+                body = _read_frame(connection.reader)
+                if body is None:
+                    raise ConnectionError("Playlist service closed the connection")
+                response_id, status = _RESPONSE.unpack_from(body)
+                if response_id != request_id:
+                    raise ConnectionError("Playlist service replied out of order")
+                value, _ = decode_value(memoryview(body), _RESPONSE.size)
+                responses.append((status, value))
+        except BaseException:
+            # The stream may be mid-frame: never reuse this connection
+            connection.close()
+            self._slots.release()
+            raise
+        self._release(connection)
+
+        for status, value in responses:
+            if status == STATUS_ERROR:
+                error_name, message = value
+                raise REMOTE_ERRORS.get(error_name, RuntimeError)(message)
+        return [value for _, value in responses]
+
+    def _call(self, name, *args):
+        return self.call_many([(name,) + args])[0]
+
+    def _acquire(self):
+        """Borrow a pooled connection, opening one if none is idle."""
+        if self._closed:
+            raise RuntimeError("Client closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("No free connection to the playlist service")
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            try:
+                connection = _Connection(self.socket_path, self.timeout)
+            except BaseException:
+                self._slots.release()
+                raise
+        return connection
+
+    def _release(self, connection):
+        with self._lock:
+            if self._closed:
+                connection.close()
+            else:
+                self._idle.append(connection)
+        self._slots.release()
+
+    def close(self):
+        """Close pooled connections; the client can't be used afterwards."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+def _remote_method(name):
+    """Build a PlaylistClient method forwarding PlaylistBackend.<name>."""
+    backend_method = getattr(PlaylistBackend, name)
+    signature = inspect.signature(backend_method)
+
+    def method(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        return self._call(name, *list(bound.arguments.values())[1:])
+
+    method.__name__ = name
+    method.__qualname__ = f"PlaylistClient.{name}"
+    method.__doc__ = backend_method.__doc__
+    method.__signature__ = signature
+    return method
+
+for _name in METHODS:
+    if _name not in (None, 'generation'):
+        setattr(PlaylistClient, _name, _remote_method(_name))
+
+def main(argv=None):
+    """Run the playlist service until SIGINT or SIGTERM."""
+    parser = argparse.ArgumentParser(description="Serve a playlist over a Unix-domain socket.")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help="socket path")
+    parser.add_argument('--snapshot', help="binary snapshot to journal to (kept up to date)")
+    parser.add_argument('--library', help="path to the compiled playlist library")
+    args = parser.parse_args(argv)
+
+    backend = PlaylistBackend()
+    if not backend.load_library(args.library):
+        parser.error("Failed to load playlist library. Please build it first.")
+    backend.initialize()
+    if args.snapshot:
+        backend.open_journal(args.snapshot)
+
+    server = PlaylistServer(backend, args.socket)
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    server.start()
+    print(f"Playlist service listening on {args.socket}")
+    try:
+        while not stop.wait(60):
+            backend.maybe_compact()
+    finally:
+        server.stop()
+        if args.snapshot:
+            backend.compact()
+        backend.close()
+
+if __name__ == "__main__":
+    main()
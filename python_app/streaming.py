@@ -0,0 +1,257 @@
+"""
+Local audio streaming server.
+Serves song files over HTTP with Range, ETag and Cache-Control support so
+the player can reference a URL instead of embedding the whole file: the
+browser fetches only what it plays and replays come from its cache.
+Only files registered through url_for() can be fetched.
+
+The server listens on loopback, so its URLs only work for a browser on
+the same machine unless a public_url (e.g. a reverse proxy) is set;
+is_loopback_host() helps callers tell which case they are in.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+DEFAULT_HOST = "127.0.0.1"
+
+# Registered files kept before the least recently requested is forgotten
+DEFAULT_MAX_FILES = 4096
+
+# Browsers may keep a song for this long; changed files get a new URL
+CACHE_MAX_AGE = 86400
+
+AUDIO_TYPES = {
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.ogg': 'audio/ogg',
+    '.m4a': 'audio/mp4',
+    '.flac': 'audio/flac',
+}
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+LOOPBACK_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+def audio_type(path):
+    """MIME type for an audio file."""
+    ext = os.path.splitext(path)[1].lower()
+    return AUDIO_TYPES.get(ext) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+def is_loopback_host(host_header):
+    """
+    Whether a Host header names this machine's loopback interface.
+
+    A browser that reached the app through such a host runs on the same
+    machine and can fetch the server's loopback URLs.
+
+    Args:
+        host_header: "host[:port]" (IPv6 in brackets), or None.
+
+    Returns:
+        True for localhost, 127.0.0.1, ::1 and *.localhost; False otherwise.
+    """
+    if not host_header:
+        return False
+    host = host_header.strip().lower()
+    if host.startswith('['):
+        host = host[1:host.find(']')] if ']' in host else host[1:]
+    elif host.count(':') == 1:
+        host = host.split(':')[0]
+    return host in LOOPBACK_HOSTS or host.endswith('.localhost') or host.startswith('127.')
+
+def parse_range(header, size):
+    """
+    Parse a single-range "Range: bytes=..." header.
+
+    Args:
+        header: Header value, or None.
+        size: File size in bytes.
+
+    Returns:
+        (start, end) inclusive, None to serve the whole file (no header,
+        multiple ranges or bad syntax), or 'unsatisfiable'.
+    """
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+class _AudioHandler(BaseHTTPRequestHandler):
+    server_version = "PlaylistAudio/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):
+        pass  # Range requests are frequent; keep the console quiet
+
+    def _serve(self, send_body):
+        # /audio/<token>/<file name>; the name is only there for the browser
+        parts = self.path.split('?')[0].split('/')
+        path = self.server.audio_server.lookup(parts[2]) if len(parts) > 2 and parts[1] == 'audio' else None
+        if not path:
+            self._send_empty(404)
+            return
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self._send_empty(404)
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send_empty(304, etag)
+                return
+
+            byte_range = parse_range(self.headers.get('Range'), size)
+            if_range = self.headers.get('If-Range')
+            if if_range and if_range != etag:
+                byte_range = None  # File changed since the partial copy: send it whole
+            if byte_range == 'unsatisfiable':
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = end - start + 1 if size else 0
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-Type', audio_type(path))
+            self.send_header('Content-Length', str(length))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f"private, max-age={CACHE_MAX_AGE}")
+            if byte_range:
+                self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+            self.end_headers()
+
+            if send_body and length:
+                try:
+                    self.wfile.flush()
+                    self.connection.sendfile(f, start, length)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # Player seeked or stopped
+
+    def _send_empty(self, status, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+class AudioServer:
+    """
+    HTTP server for registered song files, run on a daemon thread.
+
+    One instance can serve every session of the app; memory per request
+    is constant (files are sent with sendfile, never read whole).
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=0, public_url=None, max_files=DEFAULT_MAX_FILES):
+        """
+        Args:
+            host: Interface to listen on.
+            port: Port to listen on (0 picks a free one).
+            public_url: Base URL the browser should use (e.g. behind a
+                reverse proxy); default http://host:port.
+            max_files: Registered files remembered at once.
+        """
+        self.host = host
+        self.port = port
+        self.public_url = public_url
+        self.max_files = max_files
+
+        self._lock = threading.Lock()
+        self._files = OrderedDict()  # token -> path
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """URL prefix for served files."""
+        if self.public_url:
+            return self.public_url.rstrip('/')
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Bind the socket and start serving."""
+        if self._httpd:
+            return
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _AudioHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.audio_server = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="audio-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+            self._thread = None
+
+    def url_for(self, path):
+        """
+        Register a file and get its URL.
+
+        The URL depends on the file's path, size and mtime, so it is
+        stable across reruns (browser cache hits) and changes when the
+        file is replaced.
+
+        Returns:
+            URL string.
+
+        Raises:
+            OSError: If the file cannot be stat'ed.
+        """
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        token = hashlib.sha256(key.encode('utf-8', 'surrogateescape')).hexdigest()[:24]
+        with self._lock:
+            self._files[token] = path
+            self._files.move_to_end(token)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+        return f"{self.base_url}/audio/{token}/{quote(os.path.basename(path))}"
+
+    def lookup(self, token):
+        """Path registered under token, or None."""
+        with self._lock:
+            path = self._files.get(token)
+            if path:
+                self._files.move_to_end(token)
+            return path
@@ -0,0 +1,340 @@
+"""
+Filesystem watcher that keeps the playlist in sync without rescans.
+Uses inotify on Linux (through ctypes, no extra dependencies) and falls
+back to periodic polling elsewhere. Events are debounced and applied to
+the backend as add/delete deltas, or logged so several backends can each
+apply them.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from playlist import song_basename
+from scanner import AUDIO_EXTENSIONS, diff_manifest, scan_tree
+
+# Quiet period before collected events are released
+DEFAULT_DEBOUNCE_SECONDS = 1.0
+
+# Interval between full scans in polling mode
+DEFAULT_POLL_INTERVAL = 10.0
+
+# Released deltas kept for changes_since() when there is no backend
+DEFAULT_HISTORY = 256
+
+# inotify constants (<sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF)
+
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+def _load_inotify():
+    """Return libc if it provides inotify, otherwise None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_init1.restype = ctypes.c_int
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_add_watch.restype = ctypes.c_int
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+def _is_audio(path):
+    return os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS
+
+def apply_delta(backend, delta):
+    """Apply one watcher delta to backend in (at most) two batch calls."""
+    if delta['added']:
+        backend.add_songs(delta['added'])
+    if delta['removed_titles']:
+        backend.delete_songs(delta['removed_titles'])
+
+class LibraryWatcher:
+    """
+    Watch song directories and turn file changes into playlist deltas.
+
+    The watcher thread only collects and debounces events. Deltas are
+    applied by apply_pending(), which the caller runs on the thread that
+    owns the backend (e.g. once per Streamlit rerun). Pass auto_apply=True
+    to have the watcher thread apply them itself.
+
+    With backend=None the watcher serves any number of backends: released
+    deltas are numbered and logged, and each caller applies the ones after
+    its own cursor with changes_since().
+    """
+
+    def __init__(self, backend, roots, debounce=DEFAULT_DEBOUNCE_SECONDS,
+                 poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=None, auto_apply=False,
+                 history=DEFAULT_HISTORY):
+        """
+        Args:
+            backend: PlaylistBackend to update, or None to log deltas instead.
+            roots: Directories to watch recursively (missing ones are skipped).
+            debounce: Seconds without new events before deltas are released.
+            poll_interval: Seconds between scans in polling mode.
+            use_inotify: Force (True) or disable (False) inotify; None auto-detects.
+            auto_apply: Apply deltas from the watcher thread.
+            history: Deltas logged for changes_since() (backend=None only).
+        """
+        self.backend = backend
+        self.roots = [root for root in roots if os.path.isdir(root)]
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.auto_apply = auto_apply
+
+        self._libc = _load_inotify() if use_inotify is not False else None
+        if use_inotify and not self._libc:
+            raise RuntimeError("inotify is not available on this platform")
+
+        self._lock = threading.Lock()
+        self._files = {}        # known path -> (size, mtime_ns)
+        self._pending = {}      # path -> 'add' | 'remove', still settling
+        self._ready = {}        # debounced deltas waiting for apply_pending()
+        self._last_event = 0.0
+        self._last_poll = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = -1
+        self._watches = {}      # inotify wd -> directory
+        self._start_lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._history = deque(maxlen=history)  # (sequence, delta), backend=None only
+        self._sequence = 0
+
+    @property
+    def mode(self):
+        """'inotify' or 'polling'."""
+        return "inotify" if self._libc else "polling"
+
+    @property
+    def cursor(self):
+        """Sequence number of the latest logged delta."""
+        with self._lock:
+            return self._sequence
+
+    def start(self, files=None):
+        """
+        Take the initial file list and start the watcher thread.
+
+        Args:
+            files: Current path -> (size, mtime_ns) map, e.g. the 'files'
+                sync_library just returned; scanned when omitted.
+        """
+        with self._start_lock:
+            if not self._thread:
+                self._start(files)
+
+    def _start(self, files):
+        self._files = dict(files) if files is not None else scan_tree(self.roots)
+        self._last_poll = time.monotonic()
+        if self._libc:
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self._fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            for root in self.roots:
+                self._watch_tree(root)
+            target = self._run_inotify
+        else:
+            target = self._run_polling
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=target, name="library-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread and release inotify resources."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._watches = {}
+
+    def apply_pending(self):
+        """
+        Apply debounced deltas to the backend in two batch calls.
+
+        Returns:
+            Dict with 'added' and 'removed' path lists and 'song_paths',
+            the title -> path entries that changed (None for titles that
+            no longer have a file).
+        """
+        delta = self._take_ready()
+        apply_delta(self.backend, delta)
+        return {'added': delta['added'], 'removed': delta['removed'], 'song_paths': delta['song_paths']}
+
+    def changes_since(self, cursor):
+        """
+        Get the deltas logged after cursor (for a watcher without backend).
+
+        Args:
+            cursor: cursor at the caller's last sync, or the cursor
+                returned by the previous call.
+
+        Returns:
+            (new cursor, deltas), where deltas is a list of dicts as
+            returned by apply_pending() plus 'removed_titles', to be
+            passed to apply_delta(). deltas is None when the log no longer
+            reaches back to cursor and the caller must rescan.
+        """
+        self._publish()
+        with self._lock:
+            if cursor < self._sequence - len(self._history):
+                return self._sequence, None
+            return self._sequence, [delta for sequence, delta in self._history if sequence > cursor]
+
+    def _take_ready(self):
+        """Turn debounced events into a delta."""
+        self._release_settled()
+        with self._lock:
+            ready, self._ready = self._ready, {}
+            if not ready:
+                return {'added': [], 'removed': [], 'removed_titles': [], 'song_paths': {}}
+
+            # A title stays while any known file still maps to it
+            live_titles = {}
+            for path in sorted(self._files):
+                live_titles.setdefault(song_basename(path), path)
+
+        added = sorted(path for path, action in ready.items() if action == 'add')
+        removed = sorted(path for path, action in ready.items() if action == 'remove')
+        removed_titles = sorted({song_basename(path) for path in removed} - live_titles.keys())
+
+        song_paths = {song_basename(path): None for path in added + removed}
+        for title in song_paths:
+            song_paths[title] = live_titles.get(title)
+        return {'added': added, 'removed': removed, 'removed_titles': removed_titles,
+                'song_paths': song_paths}
+
+    def _publish(self):
+        """Log released deltas under the next sequence number."""
+        with self._publish_lock:
+            delta = self._take_ready()
+            if delta['added'] or delta['removed']:
+                with self._lock:
+                    self._sequence += 1
+                    self._history.append((self._sequence, delta))
+
+    # Event collection
+
+    def _record(self, path, action):
+        """Note a file event; the latest action for a path wins."""
+        with self._lock:
+            if action == 'add':
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    return
+                self._files[path] = (stat.st_size, stat.st_mtime_ns)
+            else:
+                if path not in self._files:
+                    return
+                del self._files[path]
+            self._pending[path] = action
+            self._last_event = time.monotonic()
+
+    def _release_settled(self):
+        """Move pending events to ready once the debounce period has passed."""
+        with self._lock:
+            if self._pending and time.monotonic() - self._last_event >= self.debounce:
+                self._ready.update(self._pending)
+                self._pending = {}
+                return True
+        return False
+
+    def _after_tick(self):
+        if self._release_settled():
+            if self.backend is None:
+                self._publish()
+            elif self.auto_apply:
+                self.apply_pending()
+
+    # Polling mode
+
+    def _run_polling(self):
+        while not self._stop.wait(min(self.poll_interval, self.debounce)):
+            if time.monotonic() - self._last_poll >= self.poll_interval:
+                self._last_poll = time.monotonic()
+                with self._lock:
+                    old_files = dict(self._files)
+                added, changed, removed = diff_manifest(old_files, scan_tree(self.roots))
+                for path in added:
+                    self._record(path, 'add')
+                for path in removed:
+                    self._record(path, 'remove')
+            self._after_tick()
+
+    # inotify mode
+
+    def _watch_tree(self, directory):
+        """Add a watch on directory and every directory below it."""
+        for dirpath, dirnames, _ in os.walk(directory):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = dirpath
+
+    def _run_inotify(self):
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._fd], [], [], min(self.debounce, 0.5))
+            if readable:
+                try:
+                    data = os.read(self._fd, 65536)
+                except BlockingIOError:
+                    data = b""
+                self._handle_events(data)
+            self._after_tick()
+
+    def _handle_events(self, data):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length]
+            offset += EVENT_HEADER.size + length
+
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name.rstrip(b"\0")))
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # New directory: watch it and pick up files already inside
+                    self._watch_tree(path)
+                    for file_path in scan_tree([path]):
+                        self._record(file_path, 'add')
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    prefix = path + os.sep
+                    with self._lock:
+                        gone = [p for p in self._files if p.startswith(prefix)]
+                    for file_path in gone:
+                        self._record(file_path, 'remove')
+            elif _is_audio(path):
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self._record(path, 'add')
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._record(path, 'remove')
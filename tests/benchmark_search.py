@@ -0,0 +1,91 @@
+"""
+Search Benchmark for Playlist Backend
+Builds a 100k-song playlist and times substring and fuzzy searches.
+Run: python tests/benchmark_search.py [--songs N] [--budget-ms MS]
+Exits with status 1 if any query's median time exceeds the budget.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_app'))
+from playlist import PlaylistBackend
+
+SYLLABLES = ["cha", "le", "ya", "ja", "wan", "ish", "q", "pya", "ar", "dil", "ra", "ni",
+             "kar", "an", "mah", "i", "tu", "mhe", "sa", "jan", "ba", "dal", "ga", "ya",
+             "ro", "shan", "ku", "di", "ye", "aa", "ti", "la", "mo", "hab", "bat", "ke"]
+
+# Typo queries in the shape users type them, plus exact words and substrings
+FUZZY_QUERIES = ["chaleya jwan", "chaleya jawan", "ishq vishk", "mahiya", "raanjhan",
+                 "tum kya mile", "karan aujla", "anirudh", "jwan"]
+SUBSTRING_QUERIES = ["jawan", "cha", "ya ja", "ish", "zzz"]
+
+def make_words(rng, count):
+    """Generate a vocabulary of distinct pseudo-words."""
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def make_titles(rng, count, vocabulary):
+    """Song file names shaped like the library's ("Title Film Artist 128 Kbps.mp3")."""
+    known = ["Chaleya Jawan", "Ishq Vishk Pyaar Vyaar", "Tum Kya Mile", "Raanjhan Do Patti",
+             "O Maahi Dunki", "Courtside Karan Aujla", "Jawan Title Track Anirudh Ravichander"]
+    titles = [f"{title} 128 Kbps.mp3" for title in known]
+    while len(titles) < count:
+        words = " ".join(rng.choice(vocabulary).title() for _ in range(rng.randint(2, 6)))
+        titles.append(f"{words} {len(titles)} 128 Kbps.mp3")
+    return titles
+
+def time_query(func, query, repeats):
+    """Median wall time of func(query) in milliseconds, and the last result."""
+    samples = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(query, limit=12)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--songs", type=int, default=100000, help="playlist size")
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="per-query budget")
+    parser.add_argument("--repeats", type=int, default=15, help="runs per query")
+    args = parser.parse_args()
+
+    backend = PlaylistBackend()
+    if not backend.load_library():
+        print("Playlist library not found. Please build it first.")
+        return 2
+    backend.initialize()
+
+    rng = random.Random(42)
+    titles = make_titles(rng, args.songs, make_words(rng, 20000))
+    start = time.perf_counter()
+    backend.add_songs(titles)
+    print(f"Indexed {backend.size()} songs in {time.perf_counter() - start:.2f}s "
+          f"({backend.memory_usage() / 1e6:.1f} MB)")
+
+    worst = 0.0
+    for label, func, queries in (("search", backend.search, SUBSTRING_QUERIES),
+                                 ("fuzzy_search", backend.fuzzy_search, FUZZY_QUERIES)):
+        for query in queries:
+            elapsed, result = time_query(func, query, args.repeats)
+            worst = max(worst, elapsed)
+            top = result['results'][0]['name'] if result['results'] else "-"
+            print(f"{label:>13} {query!r:>24}: {elapsed:6.2f} ms  "
+                  f"{result['total']:>6} hits  top: {top}")
+
+    backend.cleanup()
+    verdict = "OK" if worst <= args.budget_ms else "OVER BUDGET"
+    print(f"Slowest query: {worst:.2f} ms (budget {args.budget_ms:.0f} ms) {verdict}")
+    return 0 if worst <= args.budget_ms else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 /*
  * C Unit Tests for Playlist Library
- * Compile: gcc -o test_playlist test_playlist_c.c playlist.c
+ * Compile: gcc -pthread -o test_playlist test_playlist_c.c playlist.c
  * Run: ./test_playlist
  */
 
@@ -8,38 +8,44 @@
 #include <stdlib.h>
 #include <string.h>
 #include <assert.h>
+#include <pthread.h>
+#include <unistd.h>
+#include <sys/wait.h>
 #include "../c_code/playlist.h"
 
+// Playlist used by the tests below (created in main)
+static Playlist* pl = NULL;
+
 void test_initialize() {
     printf("Testing initializePlaylist()...\n");
-    initializePlaylist();
+    initializePlaylist(pl);
     printf("✓ Passed\n\n");
 }
 
 void test_add_song() {
     printf("Testing addSong()...\n");
-    initializePlaylist();
+    initializePlaylist(pl);
     
-    assert(addSong("test1.mp3") == 1);
-    assert(addSong("test2.mp3") == 1);
-    assert(addSong("test3.mp3") == 1);
+    assert(addSong(pl, "test1.mp3") == 1);
+    assert(addSong(pl, "test2.mp3") == 1);
+    assert(addSong(pl, "test3.mp3") == 1);
     
     // Test duplicate
-    assert(addSong("test1.mp3") == 0);
+    assert(addSong(pl, "test1.mp3") == 0);
     
     printf("✓ Passed\n\n");
 }
 
 void test_display_playlist() {
     printf("Testing displayPlaylist()...\n");
-    initializePlaylist();
+    initializePlaylist(pl);
     
-    addSong("song1.mp3");
-    addSong("song2.mp3");
-    addSong("song3.mp3");
+    addSong(pl, "song1.mp3");
+    addSong(pl, "song2.mp3");
+    addSong(pl, "song3.mp3");
     
     int count = 0;
-    char** songs = displayPlaylist(&count);
+    char** songs = displayPlaylist(pl, &count);
     
     assert(count == 3);
     assert(strcmp(songs[0], "song1") == 0);
@@ -52,17 +58,17 @@ void test_display_playlist() {
 
 void test_play_song() {
     printf("Testing playSong()...\n");
-    initializePlaylist();
+    initializePlaylist(pl);
     
-    addSong("test.mp3");
+    addSong(pl, "test.mp3");
     
-    char* result = playSong("test");
+    char* result = playSong(pl, "test");
     assert(result != NULL);
     assert(strcmp(result, "test") == 0);
     freeString(result);
     
     // Test search to verify play count
-    char* info = searchSong("test");
+    char* info = searchSong(pl, "test");
     assert(info != NULL);
     assert(strstr(info, "Plays: 1") != NULL);
     freeString(info);
@@ -72,24 +78,24 @@ void test_play_song() {
 
 void test_play_next_previous() {
     printf("Testing playNext() and playPrevious()...\n");
-    initializePlaylist();
+    initializePlaylist(pl);
     
-    addSong("song1.mp3");
-    addSong("song2.mp3");
-    addSong("song3.mp3");
+    addSong(pl, "song1.mp3");
+    addSong(pl, "song2.mp3");
+    addSong(pl, "song3.mp3");
     
     // Play first song
-    char* result = playSong("song1");
+    char* result = playSong(pl, "song1");
     freeString(result);
     
     // Play next
-    result = playNext();
+    result = playNext(pl);
     assert(result != NULL);
     assert(strcmp(result, "song2") == 0);
     freeString(result);
     
     // Play previous
-    result = playPrevious();
+    result = playPrevious(pl);
     assert(result != NULL);
     assert(strcmp(result, "song1") == 0);
     freeString(result);
@@ -99,17 +105,17 @@ void test_play_next_previous() {
 
 void test_favorites() {
     printf("Testing favorites system...\n");
-    initializePlaylist();
+    initializePlaylist(pl);
     
-    addSong("fav_test.mp3");
+    addSong(pl, "fav_test.mp3");
     
     // Play 3 times to make it favorite
-    playSong("fav_test");
-    playSong("fav_test");
-    playSong("fav_test");
+    playSong(pl, "fav_test");
+    playSong(pl, "fav_test");
+    playSong(pl, "fav_test");
     
     int count = 0;
-    char** favorites = displayFavorites(&count);
+    char** favorites = displayFavorites(pl, &count);
     
     assert(count == 1);
     assert(strcmp(favorites[0], "fav_test") == 0);
@@ -120,17 +126,17 @@ void test_favorites() {
 
 void test_delete_song() {
     printf("Testing deleteSong()...\n");
-    initializePlaylist();
+    initializePlaylist(pl);
     
-    addSong("delete1.mp3");
-    addSong("delete2.mp3");
-    addSong("delete3.mp3");
+    addSong(pl, "delete1.mp3");
+    addSong(pl, "delete2.mp3");
+    addSong(pl, "delete3.mp3");
     
-    assert(deleteSong("delete2") == 1);
-    assert(deleteSong("delete2") == 0); // Already deleted
+    assert(deleteSong(pl, "delete2") == 1);
+    assert(deleteSong(pl, "delete2") == 0); // Already deleted
     
     int count = 0;
-    char** songs = displayPlaylist(&count);
+    char** songs = displayPlaylist(pl, &count);
     assert(count == 2);
     freeStringArray(songs, count);
     
@@ -139,26 +145,27 @@ void test_delete_song() {
 
 void test_save_load() {
     printf("Testing savePlaylistToFile() and loadPlaylistFromFile()...\n");
-    initializePlaylist();
+    initializePlaylist(pl);
     
-    addSong("save1.mp3");
-    addSong("save2.mp3");
-    playSong("save1");
-    playSong("save1");
-    playSong("save1"); // Make it favorite
+    addSong(pl, "save1.mp3");
+    addSong(pl, "save2.mp3");
+    playSong(pl, "save1");
+    playSong(pl, "save1");
+    playSong(pl, "save1"); // Make it favorite
     
-    savePlaylistToFile("test_playlist.csv");
+    assert(savePlaylistToFile(pl, "test_playlist.csv") == 1);
+    assert(savePlaylistToFile(pl, "missing_dir/test_playlist.csv") == 0);
     
     // Clear and reload
-    cleanupPlaylist();
-    initializePlaylist();
-    loadPlaylistFromFile("test_playlist.csv");
+    cleanupPlaylist(pl);
+    initializePlaylist(pl);
+    loadPlaylistFromFile(pl, "test_playlist.csv");
     
     int count = 0;
-    char** songs = displayPlaylist(&count);
+    char** songs = displayPlaylist(pl, &count);
     assert(count == 2);
     
-    char* info = searchSong("save1");
+    char* info = searchSong(pl, "save1");
     assert(strstr(info, "Favorite: Yes") != NULL);
     freeString(info);
     
@@ -170,10 +177,787 @@ void test_save_load() {
     printf("✓ Passed\n\n");
 }
 
+void test_large_index() {
+    printf("Testing name index with many songs...\n");
+    initializePlaylist(pl);
+    
+    char path[64];
+    for (int i = 0; i < 5000; i++) {
+        snprintf(path, sizeof(path), "Songs/track%d.mp3", i);
+        assert(addSong(pl, path) == 1);
+    }
+    assert(addSong(pl, "other/dir/track42.wav") == 0); // Same basename
+    
+    char* info = searchSong(pl, "track4999");
+    assert(info != NULL);
+    freeString(info);
+    
+    assert(deleteSong(pl, "track0") == 1);
+    assert(deleteSong(pl, "track2500") == 1);
+    assert(searchSong(pl, "track2500") == NULL);
+    assert(addSong(pl, "track2500.mp3") == 1);
+    
+    // List order is unaffected by the index
+    int count = 0;
+    char** songs = displayPlaylist(pl, &count);
+    assert(count == 4999);
+    assert(strcmp(songs[0], "track1") == 0);
+    assert(strcmp(songs[count - 1], "track2500") == 0);
+    freeStringArray(songs, count);
+    
+    printf("✓ Passed\n\n");
+}
+
+void test_snapshot() {
+    printf("Testing snapshotPlaylist()...\n");
+    initializePlaylist(pl);
+    
+    addSong(pl, "snap1.mp3");
+    addSong(pl, "snap2.mp3");
+    addSong(pl, "snap3.mp3");
+    playSong(pl, "snap2");
+    playSong(pl, "snap2");
+    playSong(pl, "snap2");
+    
+    assert(getPlaylistSize(pl) == 3);
+    
+    SongRecord records[3];
+    int count = snapshotPlaylist(pl, records, 3);
+    assert(count == 3);
+    assert(strcmp(records[0].songName, "snap1") == 0);
+    assert(strcmp(records[1].songName, "snap2") == 0);
+    assert(records[1].playCount == 3);
+    assert(records[1].isFavorite == 1);
+    assert(records[2].position == 2);
+    
+    // Capacity smaller than the playlist
+    assert(snapshotPlaylist(pl, records, 2) == 2);
+    
+    printf("✓ Passed\n\n");
+}
+
+void test_batch_add_delete() {
+    printf("Testing addSongs() and deleteSongs()...\n");
+    initializePlaylist(pl);
+    
+    const char* paths[] = {"a/batch1.mp3", "b/batch2.mp3", "c/batch1.wav", "batch3.mp3"};
+    int results[4];
+    assert(addSongs(pl, paths, 4, results) == 3);
+    assert(results[0] == 1);
+    assert(results[1] == 1);
+    assert(results[2] == 0); // Duplicate basename within the batch
+    assert(results[3] == 1);
+    
+    const char* names[] = {"batch2", "missing", "batch3"};
+    assert(deleteSongs(pl, names, 3, results) == 2);
+    assert(results[0] == 1);
+    assert(results[1] == 0);
+    assert(results[2] == 1);
+    assert(getPlaylistSize(pl) == 1);
+    
+    // results is optional
+    assert(addSongs(pl, paths, 2, NULL) == 1);
+    
+    printf("✓ Passed\n\n");
+}
+
+void test_binary_save_load() {
+    printf("Testing savePlaylistBinary() and loadPlaylistBinary()...\n");
+    initializePlaylist(pl);
+    
+    addSong(pl, "bin1.mp3");
+    addSong(pl, "Title, With Commas.mp3");
+    playSong(pl, "Title, With Commas");
+    playSong(pl, "Title, With Commas");
+    playSong(pl, "Title, With Commas");
+    
+    assert(savePlaylistBinary(pl, "test_playlist.bin") == 1);
+    
+    initializePlaylist(pl);
+    assert(loadPlaylistBinary(pl, "test_playlist.bin") == 1);
+    
+    SongRecord records[2];
+    assert(snapshotPlaylist(pl, records, 2) == 2);
+    assert(strcmp(records[0].songName, "bin1") == 0);
+    assert(strcmp(records[1].songName, "Title, With Commas") == 0);
+    assert(records[1].playCount == 3);
+    assert(records[1].isFavorite == 1);
+    
+    // Corrupt one byte: checksum must reject the file
+    FILE* file = fopen("test_playlist.bin", "r+b");
+    fseek(file, -2, SEEK_END);
+    fputc('X', file);
+    fclose(file);
+    initializePlaylist(pl);
+    assert(loadPlaylistBinary(pl, "test_playlist.bin") == 0);
+    assert(getPlaylistSize(pl) == 0);
+    
+    assert(loadPlaylistBinary(pl, "does_not_exist.bin") == 0);
+    
+    remove("test_playlist.bin");
+    printf("✓ Passed\n\n");
+}
+
+void test_journal() {
+    printf("Testing journalOpen(), journalReplay() and journalCompact()...\n");
+    initializePlaylist(pl);
+    remove("test_journal.log");
+    
+    assert(journalOpen(pl, "test_journal.log") == 1);
+    addSong(pl, "jour1.mp3");
+    addSong(pl, "jour2.mp3");
+    addSong(pl, "v2.0 remix.mp3");
+    freeString(playSong(pl, "jour2"));
+    freeString(playNext(pl));
+    deleteSong(pl, "jour1");
+    assert(journalSize(pl) > 0);
+    journalClose(pl);
+    
+    // Replay onto an empty playlist, plus a torn record at the end
+    FILE* file = fopen("test_journal.log", "ab");
+    fputc(0x01, file);
+    fclose(file);
+    
+    initializePlaylist(pl);
+    assert(journalReplay(pl, "test_journal.log") == 6);
+    
+    SongRecord records[2];
+    assert(snapshotPlaylist(pl, records, 2) == 2);
+    assert(strcmp(records[0].songName, "jour2") == 0);
+    assert(records[0].playCount == 1);
+    assert(strcmp(records[1].songName, "v2.0 remix") == 0);
+    assert(records[1].playCount == 1);
+    
+    // Compaction writes the snapshot and empties the journal
+    assert(journalOpen(pl, "test_journal.log") == 1);
+    assert(journalCompact(pl, "test_journal.bin") == 1);
+    assert(journalSize(pl) == 0);
+    journalClose(pl);
+    
+    initializePlaylist(pl);
+    assert(loadPlaylistBinary(pl, "test_journal.bin") == 1);
+    assert(journalReplay(pl, "test_journal.log") == 0);
+    assert(getPlaylistSize(pl) == 2);
+    
+    assert(journalReplay(pl, "does_not_exist.log") == -1);
+    
+    remove("test_journal.log");
+    remove("test_journal.bin");
+    printf("✓ Passed\n\n");
+}
+
+void test_generation_and_atomic_save() {
+    printf("Testing getGeneration() and atomic saves...\n");
+    initializePlaylist(pl);
+    
+    unsigned long start = getGeneration(pl);
+    addSong(pl, "gen1.mp3");
+    assert(getGeneration(pl) == start + 1);
+    assert(addSong(pl, "gen1.mp3") == 0);
+    assert(getGeneration(pl) == start + 1); // Failed add is not a mutation
+    freeString(playSong(pl, "gen1"));
+    assert(getGeneration(pl) == start + 2);
+    
+    int count = 0;
+    freeStringArray(displayPlaylist(pl, &count), count);
+    freeString(searchSong(pl, "gen1"));
+    assert(getGeneration(pl) == start + 2); // Reads are not mutations
+    
+    savePlaylistToFile(pl, "test_atomic.csv");
+    assert(savePlaylistBinary(pl, "test_atomic.bin") == 1);
+    
+    // No temp files are left behind
+    FILE* file = fopen("test_atomic.csv.tmp", "r");
+    assert(file == NULL);
+    file = fopen("test_atomic.bin.tmp", "r");
+    assert(file == NULL);
+    
+    remove("test_atomic.csv");
+    remove("test_atomic.bin");
+    printf("✓ Passed\n\n");
+}
+
+void test_node_pool() {
+    printf("Testing node pool and getMemoryUsage()...\n");
+    initializePlaylist(pl);
+    assert(getMemoryUsage(pl) == 0);
+    
+    char path[64];
+    for (int i = 0; i < 3000; i++) {
+        snprintf(path, sizeof(path), "pool%d.mp3", i);
+        addSong(pl, path);
+    }
+    size_t used = getMemoryUsage(pl);
+    assert(used > 0);
+    assert(used < 3000 * sizeof(char[256])); // Well below fixed 256-byte names
+    
+    // Deleted nodes are recycled rather than growing the pool (re-adding
+    // the same titles also leaves the search index capacity unchanged)
+    for (int i = 0; i < 100; i++) {
+        snprintf(path, sizeof(path), "pool%d", i);
+        assert(deleteSong(pl, path) == 1);
+    }
+    for (int i = 0; i < 100; i++) {
+        snprintf(path, sizeof(path), "pool%d.mp3", i);
+        assert(addSong(pl, path) == 1);
+    }
+    assert(getMemoryUsage(pl) == used);
+    
+    char* info = searchSong(pl, "pool99");
+    assert(info != NULL);
+    freeString(info);
+    
+    // Churn with new titles every cycle: freed name slots are reused, so
+    // memory stays within what the first cycles needed. The search index
+    // rebuilds periodically and varies by less than one 64 KB arena
+    // block; without slot reuse the arena would grow by several blocks
+    size_t early = 0;
+    size_t late = 0;
+    for (int cycle = 0; cycle < 40; cycle++) {
+        for (int i = 0; i < 500; i++) {
+            snprintf(path, sizeof(path), "churn%d-%d.mp3", cycle, i);
+            assert(addSong(pl, path) == 1);
+        }
+        for (int i = 0; i < 500; i++) {
+            snprintf(path, sizeof(path), "churn%d-%d", cycle, i);
+            assert(deleteSong(pl, path) == 1);
+        }
+        size_t usage = getMemoryUsage(pl);
+        if (cycle < 10) {
+            early = usage > early ? usage : early;
+        } else {
+            late = usage > late ? usage : late;
+        }
+    }
+    assert(late < early + 65536);
+    
+    initializePlaylist(pl);
+    assert(getMemoryUsage(pl) == 0);
+    printf("✓ Passed\n\n");
+}
+
+void test_export_names() {
+    printf("Testing exportNames()...\n");
+    initializePlaylist(pl);
+    
+    NameBuffer buffer;
+    assert(exportNames(pl, 0, &buffer) == 0);
+    assert(buffer.data == NULL);
+    
+    addSong(pl, "name1.mp3");
+    addSong(pl, "a longer name.mp3");
+    addSong(pl, "n3.mp3");
+    freeString(playSong(pl, "n3"));
+    freeString(playSong(pl, "n3"));
+    freeString(playSong(pl, "n3"));
+    
+    assert(exportNames(pl, 0, &buffer) == 3);
+    assert(strcmp(buffer.data + buffer.offsets[0], "name1") == 0);
+    assert(strcmp(buffer.data + buffer.offsets[1], "a longer name") == 0);
+    assert(strcmp(buffer.data + buffer.offsets[2], "n3") == 0);
+    assert(buffer.offsets[3] == buffer.size);
+    freeNameBuffer(&buffer);
+    assert(buffer.data == NULL);
+    
+    assert(exportNames(pl, 1, &buffer) == 1);
+    assert(strcmp(buffer.data, "n3") == 0);
+    freeNameBuffer(&buffer);
+    
+    printf("✓ Passed\n\n");
+}
+
+void test_play_records() {
+    printf("Testing playSongRecord(), playNextRecord() and playPreviousRecord()...\n");
+    initializePlaylist(pl);
+    
+    SongRecord record;
+    assert(playNextRecord(pl, &record) == 0);
+    
+    addSong(pl, "rec1.mp3");
+    addSong(pl, "rec2.mp3");
+    
+    assert(playSongRecord(pl, "rec1", &record) == 1);
+    assert(strcmp(record.songName, "rec1") == 0);
+    assert(record.playCount == 1);
+    assert(record.isFavorite == 0);
+    
+    assert(playNextRecord(pl, &record) == 1);
+    assert(strcmp(record.songName, "rec2") == 0);
+    assert(playPreviousRecord(pl, &record) == 1);
+    assert(playPreviousRecord(pl, &record) == 1); // Wraps around to rec2
+    assert(playPreviousRecord(pl, &record) == 1);
+    assert(strcmp(record.songName, "rec1") == 0);
+    assert(record.playCount == 3);
+    assert(record.isFavorite == 1);
+    
+    assert(playSongRecord(pl, "missing", &record) == 0);
+    printf("✓ Passed\n\n");
+}
+
+void test_search_songs() {
+    printf("Testing searchSongs()...\n");
+    initializePlaylist(pl);
+    
+    addSong(pl, "Blue Moon.mp3");
+    addSong(pl, "Moonlight Sonata.mp3");
+    addSong(pl, "Harvest Moon.mp3");
+    addSong(pl, "Honeymoon.mp3");
+    addSong(pl, "Sunrise.mp3");
+    
+    SongRecord results[8];
+    int total = -1;
+    int count = searchSongs(pl, "MOON", 0, 8, results, &total);
+    assert(count == 4);
+    assert(total == 4);
+    assert(strcmp(results[0].songName, "Moonlight Sonata") == 0); // Prefix
+    assert(strcmp(results[1].songName, "Blue Moon") == 0);        // Word start, earlier
+    assert(strcmp(results[2].songName, "Harvest Moon") == 0);
+    assert(strcmp(results[3].songName, "Honeymoon") == 0);        // Inside a word
+    assert(results[0].position == -1);
+    
+    // Paging keeps the ranking
+    count = searchSongs(pl, "moon", 1, 2, results, &total);
+    assert(count == 2);
+    assert(total == 4);
+    assert(strcmp(results[0].songName, "Blue Moon") == 0);
+    assert(strcmp(results[1].songName, "Harvest Moon") == 0);
+    
+    // Short queries fall back to a scan
+    count = searchSongs(pl, "su", 0, 8, results, &total);
+    assert(count == 1);
+    assert(strcmp(results[0].songName, "Sunrise") == 0);
+    
+    // Count only
+    assert(searchSongs(pl, "n", 0, 0, NULL, &total) == 0);
+    assert(total == 5);
+    
+    assert(searchSongs(pl, "moons", 0, 8, results, &total) == 0);
+    assert(total == 0);
+    assert(searchSongs(pl, "", 0, 8, results, &total) == 0);
+    
+    // Deleted songs drop out, re-added ones come back
+    deleteSong(pl, "Blue Moon");
+    assert(searchSongs(pl, "moon", 0, 8, results, &total) == 3);
+    addSong(pl, "Blue Moon.mp3");
+    assert(searchSongs(pl, "blue moon", 0, 8, results, &total) == 1);
+    assert(strcmp(results[0].songName, "Blue Moon") == 0);
+    
+    // Heavy churn triggers a rebuild without losing live songs
+    char name[32];
+    for (int i = 0; i < 3000; i++) {
+        sprintf(name, "churn%d.mp3", i);
+        addSong(pl, name);
+    }
+    for (int i = 0; i < 3000; i++) {
+        sprintf(name, "churn%d", i);
+        deleteSong(pl, name);
+    }
+    assert(searchSongs(pl, "churn", 0, 8, results, &total) == 0);
+    assert(searchSongs(pl, "moon", 0, 8, results, &total) == 4);
+    
+    cleanupPlaylist(pl);
+    assert(searchSongs(pl, "moon", 0, 8, results, &total) == 0);
+    printf("✓ Passed\n\n");
+}
+
+void test_fuzzy_search() {
+    printf("Testing fuzzySearchSongs()...\n");
+    initializePlaylist(pl);
+    
+    addSong(pl, "Songs/Chaleya Jawan 128 Kbps.mp3");
+    addSong(pl, "Songs/Jawan Title Track Anirudh 128 Kbps.mp3");
+    addSong(pl, "Songs/Not Ramaiya Vastavaiya Jawan.mp3");
+    addSong(pl, "Songs/Tum Kya Mile.mp3");
+    
+    SongRecord results[8];
+    int total = -1;
+    int count = fuzzySearchSongs(pl, "chaleya jwan", 0, 8, results, &total);
+    assert(count == 1);
+    assert(total == 1);
+    assert(strcmp(results[0].songName, "Chaleya Jawan 128 Kbps") == 0);
+    
+    // Exact matches rank above typos, shorter titles break ties
+    count = fuzzySearchSongs(pl, "JAWAN", 0, 8, results, &total);
+    assert(count == 3);
+    assert(strcmp(results[0].songName, "Chaleya Jawan 128 Kbps") == 0);
+    assert(strcmp(results[2].songName, "Jawan Title Track Anirudh 128 Kbps") == 0);
+    count = fuzzySearchSongs(pl, "ramaya jawan", 0, 8, results, &total);
+    assert(count == 1);
+    assert(strcmp(results[0].songName, "Not Ramaiya Vastavaiya Jawan") == 0);
+    
+    // Bitrate noise is not searchable and short words must match exactly
+    assert(fuzzySearchSongs(pl, "128 kbps", 0, 8, results, &total) == 0);
+    assert(fuzzySearchSongs(pl, "kbps", 0, 8, results, &total) == 0);
+    assert(fuzzySearchSongs(pl, "tum kya", 0, 8, results, &total) == 1);
+    assert(fuzzySearchSongs(pl, "tu kya", 0, 8, results, &total) == 0);
+    assert(fuzzySearchSongs(pl, "", 0, 8, results, &total) == 0);
+    
+    // Paging and count-only calls
+    count = fuzzySearchSongs(pl, "jawan", 1, 1, results, &total);
+    assert(count == 1);
+    assert(total == 3);
+    assert(fuzzySearchSongs(pl, "jawan", 0, 0, NULL, &total) == 0);
+    assert(total == 3);
+    
+    // Deleted songs drop out
+    deleteSong(pl, "Chaleya Jawan 128 Kbps");
+    assert(fuzzySearchSongs(pl, "chaleya", 0, 8, results, &total) == 0);
+    
+    cleanupPlaylist(pl);
+    assert(fuzzySearchSongs(pl, "jawan", 0, 8, results, &total) == 0);
+    printf("✓ Passed\n\n");
+}
+
+void test_play_ranking() {
+    printf("Testing topPlayed(), favoritesPage() and getPlayRank()...\n");
+    initializePlaylist(pl);
+    
+    SongRecord results[8];
+    int total = -1;
+    assert(topPlayed(pl, 0, 8, results) == 0);
+    assert(favoritesPage(pl, 0, 8, results, &total) == 0);
+    assert(total == 0);
+    
+    addSong(pl, "rank1.mp3");
+    addSong(pl, "rank2.mp3");
+    addSong(pl, "rank3.mp3");
+    addSong(pl, "rank4.mp3");
+    
+    char* name;
+    for (int i = 0; i < 4; i++) { name = playSong(pl, "rank2"); free(name); }
+    for (int i = 0; i < 3; i++) { name = playSong(pl, "rank3"); free(name); }
+    name = playSong(pl, "rank1"); free(name);
+    
+    // Never played songs are left out
+    assert(topPlayed(pl, 0, 8, results) == 3);
+    assert(strcmp(results[0].songName, "rank2") == 0);
+    assert(results[0].playCount == 4);
+    assert(strcmp(results[1].songName, "rank3") == 0);
+    assert(strcmp(results[2].songName, "rank1") == 0);
+    assert(topPlayed(pl, 1, 1, results) == 1);
+    assert(strcmp(results[0].songName, "rank3") == 0);
+    
+    assert(favoritesPage(pl, 0, 8, results, &total) == 2);
+    assert(total == 2);
+    assert(getFavoriteCount(pl) == 2);
+    assert(strcmp(results[0].songName, "rank2") == 0);
+    assert(strcmp(results[1].songName, "rank3") == 0);
+    assert(favoritesPage(pl, 1, 8, results, &total) == 1);
+    assert(strcmp(results[0].songName, "rank3") == 0);
+    
+    assert(getPlayRank(pl, "rank2") == 1);
+    assert(getPlayRank(pl, "rank3") == 2);
+    assert(getPlayRank(pl, "rank1") == 3);
+    assert(getPlayRank(pl, "rank4") == 4);
+    assert(getPlayRank(pl, "missing") == 0);
+    
+    // Ties go to the song that reached the count first
+    name = playSong(pl, "rank1"); free(name);
+    name = playSong(pl, "rank1"); free(name);
+    assert(topPlayed(pl, 0, 8, results) == 3);
+    assert(strcmp(results[1].songName, "rank3") == 0);
+    assert(strcmp(results[2].songName, "rank1") == 0);
+    assert(getPlayRank(pl, "rank1") == 2);
+    
+    // Deleting and reloading stats keep the ranking in sync
+    deleteSong(pl, "rank2");
+    assert(getFavoriteCount(pl) == 2);
+    assert(topPlayed(pl, 0, 1, results) == 1);
+    assert(strcmp(results[0].songName, "rank3") == 0);
+    
+    char path[32];
+    for (int i = 0; i < 500; i++) {
+        snprintf(path, sizeof(path), "bulk%d.mp3", i);
+        addSong(pl, path);
+        for (int j = 0; j < i % 7; j++) {
+            snprintf(path, sizeof(path), "bulk%d", i);
+            name = playSong(pl, path); free(name);
+        }
+    }
+    assert(topPlayed(pl, 0, 8, results) == 8);
+    for (int i = 1; i < 8; i++) {
+        assert(results[i - 1].playCount >= results[i].playCount);
+    }
+    assert(getPlayRank(pl, "bulk6") == 1);
+    
+    cleanupPlaylist(pl);
+    assert(topPlayed(pl, 0, 8, results) == 0);
+    assert(getFavoriteCount(pl) == 0);
+    printf("✓ Passed\n\n");
+}
+
+void test_get_range() {
+    printf("Testing getRange() and getSongPosition()...\n");
+    initializePlaylist(pl);
+    
+    SongRecord records[8];
+    assert(getRange(pl, 0, 8, records) == 0);
+    
+    char path[32];
+    for (int i = 0; i < 100; i++) {
+        snprintf(path, sizeof(path), "range%d.mp3", i);
+        addSong(pl, path);
+    }
+    
+    assert(getRange(pl, 10, 3, records) == 3);
+    assert(strcmp(records[0].songName, "range10") == 0);
+    assert(records[0].position == 10);
+    assert(strcmp(records[2].songName, "range12") == 0);
+    assert(getRange(pl, 98, 8, records) == 2);
+    assert(getRange(pl, 100, 8, records) == 0);
+    assert(getRange(pl, -1, 8, records) == 0);
+    
+    // Deleting in the middle shifts later positions
+    for (int i = 0; i < 50; i += 2) {
+        snprintf(path, sizeof(path), "range%d", i);
+        deleteSong(pl, path);
+    }
+    assert(getPlaylistSize(pl) == 75);
+    assert(getRange(pl, 0, 2, records) == 2);
+    assert(strcmp(records[0].songName, "range1") == 0);
+    assert(strcmp(records[1].songName, "range3") == 0);
+    assert(getRange(pl, 25, 1, records) == 1);
+    assert(strcmp(records[0].songName, "range50") == 0);
+    assert(getSongPosition(pl, "range50") == 25);
+    assert(getSongPosition(pl, "range1") == 0);
+    assert(getSongPosition(pl, "range0") == -1);
+    
+    addSong(pl, "range_new.mp3");
+    assert(getSongPosition(pl, "range_new") == 75);
+    assert(getRange(pl, 75, 8, records) == 1);
+    assert(strcmp(records[0].songName, "range_new") == 0);
+    
+    // Positions stay correct across a search index rebuild
+    for (int i = 0; i < 3000; i++) {
+        snprintf(path, sizeof(path), "churn%d.mp3", i);
+        addSong(pl, path);
+    }
+    for (int i = 0; i < 3000; i++) {
+        snprintf(path, sizeof(path), "churn%d", i);
+        deleteSong(pl, path);
+    }
+    assert(getSongPosition(pl, "range_new") == 75);
+    assert(getRange(pl, 74, 2, records) == 2);
+    assert(strcmp(records[0].songName, "range99") == 0);
+    assert(strcmp(records[1].songName, "range_new") == 0);
+    
+    cleanupPlaylist(pl);
+    assert(getRange(pl, 0, 8, records) == 0);
+    printf("✓ Passed\n\n");
+}
+
+void test_multiple_playlists() {
+    printf("Testing independent playlist handles...\n");
+    Playlist* a = playlist_create();
+    Playlist* b = playlist_create();
+    assert(a && b);
+    
+    assert(addSong(a, "shared.mp3") == 1);
+    assert(addSong(a, "only_a.mp3") == 1);
+    assert(addSong(b, "shared.mp3") == 1);
+    assert(getPlaylistSize(a) == 2);
+    assert(getPlaylistSize(b) == 1);
+    assert(getGeneration(a) == 2);
+    assert(getGeneration(b) == 1);
+    
+    // Plays, searches and deletes only touch their own playlist
+    char* result = playSong(a, "shared");
+    freeString(result);
+    result = playSong(a, "shared");
+    freeString(result);
+    result = playSong(a, "shared");
+    freeString(result);
+    assert(getFavoriteCount(a) == 1);
+    assert(getFavoriteCount(b) == 0);
+    assert(getPlayRank(a, "only_a") == 2);
+    assert(getPlayRank(b, "shared") == 1);
+    
+    int total = 0;
+    SongRecord records[4];
+    assert(searchSongs(b, "only", 0, 4, records, &total) == 0 && total == 0);
+    assert(searchSongs(a, "only", 0, 4, records, &total) == 1 && total == 1);
+    
+    assert(deleteSong(b, "shared") == 1);
+    assert(getPlaylistSize(b) == 0);
+    assert(getSongPosition(a, "shared") == 0);
+    
+    // Destroying one leaves the other (and the tests' playlist) intact
+    playlist_destroy(b);
+    assert(getPlaylistSize(a) == 2);
+    playlist_destroy(a);
+    playlist_destroy(NULL);
+    printf("✓ Passed\n\n");
+}
+
+// Reader thread for test_concurrent_access: listings must always be
+// internally consistent while the writer churns the playlist
+static void* concurrentReader(void* arg) {
+    Playlist* shared = (Playlist*)arg;
+    SongRecord records[64];
+    for (int i = 0; i < 2000; i++) {
+        int count = getRange(shared, 0, 64, records);
+        for (int j = 0; j < count; j++) {
+            assert(records[j].position == j);
+            assert(strncmp(records[j].songName, "churn", 5) == 0 ||
+                   strncmp(records[j].songName, "stable", 6) == 0);
+        }
+        
+        int total = 0;
+        searchSongs(shared, "stable", 0, 8, records, &total);
+        assert(total == 8);
+        
+        int listed = 0;
+        char** songs = displayPlaylist(shared, &listed);
+        assert(listed >= 8);
+        freeStringArray(songs, listed);
+    }
+    return NULL;
+}
+
+// Writer thread for test_concurrent_access
+static void* concurrentWriter(void* arg) {
+    Playlist* shared = (Playlist*)arg;
+    char name[32];
+    for (int i = 0; i < 2000; i++) {
+        snprintf(name, sizeof(name), "churn%d.mp3", i % 50);
+        addSong(shared, name);
+        SongRecord record;
+        playNextRecord(shared, &record);
+        snprintf(name, sizeof(name), "churn%d", (i * 7) % 50);
+        deleteSong(shared, name);
+    }
+    return NULL;
+}
+
+void test_concurrent_access() {
+    printf("Testing concurrent readers and writers...\n");
+    Playlist* shared = playlist_create();
+    char name[32];
+    for (int i = 0; i < 8; i++) {
+        snprintf(name, sizeof(name), "stable%d.mp3", i);
+        addSong(shared, name);
+    }
+    
+    pthread_t readers[3];
+    pthread_t writers[2];
+    for (int i = 0; i < 3; i++) {
+        assert(pthread_create(&readers[i], NULL, concurrentReader, shared) == 0);
+    }
+    for (int i = 0; i < 2; i++) {
+        assert(pthread_create(&writers[i], NULL, concurrentWriter, shared) == 0);
+    }
+    for (int i = 0; i < 3; i++) {
+        pthread_join(readers[i], NULL);
+    }
+    for (int i = 0; i < 2; i++) {
+        pthread_join(writers[i], NULL);
+    }
+    
+    // Every song is still reachable through each index
+    int count = 0;
+    char** songs = displayPlaylist(shared, &count);
+    assert(count == getPlaylistSize(shared));
+    for (int i = 0; i < count; i++) {
+        assert(getSongPosition(shared, songs[i]) == i);
+    }
+    freeStringArray(songs, count);
+    playlist_destroy(shared);
+    printf("✓ Passed\n\n");
+}
+
+void test_shared_journal() {
+    printf("Testing journalOpenShared() across handles and processes...\n");
+    remove("test_shared.bin");
+    remove("test_shared.log");
+    
+    Playlist* a = playlist_create();
+    Playlist* b = playlist_create();
+    assert(journalOpenShared(a, "test_shared.bin", "test_shared.log") == 0);
+    assert(journalOpenShared(b, "test_shared.bin", "test_shared.log") == 0);
+    
+    // Each handle sees the other's mutations on its next call
+    assert(addSong(a, "alpha.mp3") == 1);
+    assert(addSong(b, "beta.mp3") == 1);
+    assert(getPlaylistSize(a) == 2);
+    assert(getSongPosition(b, "alpha") == 0);
+    assert(getSongPosition(a, "beta") == 1);
+    
+    // Concurrent writers in separate processes lose no plays
+    const int children = 4;
+    const int plays = 50;
+    for (int i = 0; i < children; i++) {
+        pid_t pid = fork();
+        assert(pid >= 0);
+        if (pid == 0) {
+            Playlist* child = playlist_create();
+            if (journalOpenShared(child, "test_shared.bin", "test_shared.log") < 0) {
+                _exit(1);
+            }
+            for (int j = 0; j < plays; j++) {
+                freeString(playSong(child, "alpha"));
+            }
+            playlist_destroy(child);
+            _exit(0);
+        }
+    }
+    for (int i = 0; i < children; i++) {
+        int status = 0;
+        wait(&status);
+        assert(WIFEXITED(status) && WEXITSTATUS(status) == 0);
+    }
+    
+    int total = 0;
+    SongRecord records[2];
+    assert(searchSongs(b, "alpha", 0, 2, records, &total) == 1);
+    assert(records[0].playCount == children * plays);
+    assert(records[0].isFavorite == 1);
+    
+    // Compacting in one handle makes the other reload the snapshot
+    assert(journalCompact(a, "test_shared.bin") == 1);
+    assert(journalSize(a) == 0);
+    assert(deleteSong(b, "beta") == 1);
+    assert(getPlaylistSize(a) == 1);
+    assert(searchSongs(a, "alpha", 0, 2, records, &total) == 1);
+    assert(records[0].playCount == children * plays);
+    
+    // A late joiner gets snapshot + journal
+    Playlist* c = playlist_create();
+    assert(journalOpenShared(c, "test_shared.bin", "test_shared.log") == 1);
+    assert(getPlaylistSize(c) == 1);
+    
+    // Clearing is journaled too: no handle (or late joiner) keeps the old songs
+    initializePlaylist(c);
+    assert(getPlaylistSize(a) == 0);
+    assert(getPlaylistSize(b) == 0);
+    assert(addSong(a, "gamma.mp3") == 1);
+    cleanupPlaylist(b);
+    assert(getPlaylistSize(c) == 0);
+    assert(searchSong(a, "gamma") == NULL);
+    Playlist* d = playlist_create();
+    assert(journalOpenShared(d, "test_shared.bin", "test_shared.log") == 4);
+    assert(getPlaylistSize(d) == 0);
+    assert(journalCompact(d, "test_shared.bin") == 1);
+    assert(addSong(d, "delta.mp3") == 1);
+    assert(getPlaylistSize(a) == 1);
+    assert(getSongPosition(a, "delta") == 0);
+    
+    playlist_destroy(d);
+    playlist_destroy(c);
+    playlist_destroy(b);
+    playlist_destroy(a);
+    remove("test_shared.bin");
+    remove("test_shared.log");
+    remove("test_shared.log.lock");
+    printf("✓ Passed\n\n");
+}
+
 int main() {
     printf("Running C Unit Tests for Playlist Library\n");
     printf("==========================================\n\n");
     
+    pl = playlist_create();
+    assert(pl != NULL);
+    
     test_initialize();
     test_add_song();
     test_display_playlist();
@@ -182,8 +966,24 @@ int main() {
     test_favorites();
     test_delete_song();
     test_save_load();
-    
-    cleanupPlaylist();
+    test_large_index();
+    test_snapshot();
+    test_batch_add_delete();
+    test_binary_save_load();
+    test_journal();
+    test_generation_and_atomic_save();
+    test_node_pool();
+    test_export_names();
+    test_play_records();
+    test_search_songs();
+    test_fuzzy_search();
+    test_play_ranking();
+    test_get_range();
+    test_multiple_playlists();
+    test_concurrent_access();
+    test_shared_journal();
+    
+    playlist_destroy(pl);
     
     printf("==========================================\n");
     printf("All tests passed! ✓\n");
@@ -11,7 +11,17 @@ import shutil
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python_app'))
-from playlist import PlaylistBackend
+from playlist import PlaylistBackend, song_basename
+from scanner import save_manifest, scan_tree, sync_library
+from watcher import LibraryWatcher, apply_delta
+from metadata import MetadataStore, extract_tags, read_tags
+from streaming import AudioServer, is_loopback_host, parse_range
+from service import PlaylistClient, PlaylistServer, decode_value, encode_value
+from async_playlist import AsyncPlaylistBackend
+import asyncio
+import socket
+import struct
+import time
 
 class TestPlaylistBackend:
     """Test suite for PlaylistBackend class."""
@@ -82,6 +92,26 @@ class TestPlaylistBackend:
         prev_song = playlist.play_previous()
         assert prev_song == "song1"
     
+    def test_play_records(self, playlist):
+        """Test play calls that return the updated record."""
+        assert playlist.play_next_record() is None
+        playlist.add_songs(["rec1.mp3", "rec2.mp3"])
+        
+        record = playlist.play_song_record("rec1")
+        assert record['name'] == "rec1"
+        assert record['play_count'] == 1
+        assert record['is_favorite'] == False
+        
+        assert playlist.play_next_record()['name'] == "rec2"
+        playlist.play_previous_record()
+        record = playlist.play_previous_record()
+        assert record['name'] == "rec2"
+        assert record['play_count'] == 2
+        
+        playlist.play_song_record("rec2")
+        assert playlist.play_song_record("rec2")['is_favorite'] == True
+        assert playlist.play_song_record("missing") is None
+    
     def test_favorites(self, playlist):
         """Test favorites system."""
         playlist.add_song("fav_test.mp3")
@@ -156,6 +186,371 @@ class TestPlaylistBackend:
             if os.path.exists(temp_file):
                 os.remove(temp_file)
     
+    def test_lookup_after_many_adds(self, playlist):
+        """Test name lookups stay correct as the index grows."""
+        for i in range(2000):
+            assert playlist.add_song(f"Songs/bulk{i}.mp3") == True
+        
+        assert playlist.add_song("elsewhere/bulk7.flac") == False
+        assert playlist.play_song("bulk1999") == "bulk1999"
+        assert playlist.delete_song("bulk0") == True
+        assert playlist.search_song("bulk0") is None
+        
+        songs = playlist.get_playlist()
+        assert len(songs) == 1999
+        assert songs[0] == "bulk1"
+    
+    def test_batch_add_delete(self, playlist):
+        """Test adding and deleting songs in batches."""
+        results = playlist.add_songs(
+            p for p in ["x/batch1.mp3", "y/batch2.mp3", "z/batch1.flac"]
+        )
+        assert results == [True, True, False]
+        assert playlist.get_playlist() == ["batch1", "batch2"]
+        
+        assert playlist.delete_songs(["batch2", "missing"]) == [True, False]
+        assert playlist.get_playlist() == ["batch1"]
+        
+        assert playlist.add_songs([]) == []
+        assert playlist.delete_songs([]) == []
+    
+    def test_snapshot(self, playlist):
+        """Test bulk snapshot of song records."""
+        playlist.add_song("snap1.mp3")
+        playlist.add_song("snap2.mp3")
+        for _ in range(3):
+            playlist.play_song("snap2")
+        
+        records = playlist.snapshot()
+        assert [r['name'] for r in records] == ["snap1", "snap2"]
+        assert records[0]['play_count'] == 0
+        assert records[0]['is_favorite'] == False
+        assert records[1]['play_count'] == 3
+        assert records[1]['is_favorite'] == True
+        assert records[1]['position'] == 1
+    
+    def test_save_load_binary(self, playlist):
+        """Test the binary format is picked by extension and round-trips."""
+        playlist.add_song("Hello, World.mp3")
+        playlist.add_song("bin2.mp3")
+        for _ in range(3):
+            playlist.play_song("Hello, World")
+        
+        temp_dir = tempfile.mkdtemp()
+        temp_file = os.path.join(temp_dir, "playlist.bin")
+        try:
+            assert playlist.save(temp_file) == True
+            with open(temp_file, 'rb') as f:
+                assert f.read(4) == b"PLBN"
+            
+            playlist.initialize()
+            assert playlist.load(temp_file) == True
+            
+            records = playlist.snapshot()
+            assert [r['name'] for r in records] == ["Hello, World", "bin2"]
+            assert records[0]['play_count'] == 3
+            assert records[0]['is_favorite'] == True
+            
+            # Truncated file is rejected
+            with open(temp_file, 'r+b') as f:
+                f.truncate(10)
+            assert playlist.load(temp_file) == False
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_journal(self, playlist):
+        """Test journaling mode replays mutations and compacts."""
+        temp_dir = tempfile.mkdtemp()
+        snapshot_file = os.path.join(temp_dir, "playlist.bin")
+        journal_file = snapshot_file + ".journal"
+        try:
+            # Compaction writes the binary format, so a CSV snapshot is refused
+            with pytest.raises(ValueError):
+                playlist.open_journal(os.path.join(temp_dir, "playlist.csv"))
+            
+            assert playlist.open_journal(snapshot_file) == 0
+            playlist.add_songs(["j1.mp3", "j2.mp3", "j3.mp3"])
+            for _ in range(3):
+                playlist.play_song("j2")
+            playlist.delete_song("j3")
+            assert playlist.journal_size() > 0
+            assert playlist.maybe_compact() == False
+            playlist.close_journal()
+            
+            # A fresh session sees snapshot + journal and compacts on open
+            playlist.initialize()
+            assert playlist.open_journal(snapshot_file) == 7
+            assert os.path.getsize(journal_file) == 0
+            records = playlist.snapshot()
+            assert [r['name'] for r in records] == ["j1", "j2"]
+            assert records[1]['play_count'] == 3
+            assert records[1]['is_favorite'] == True
+            
+            playlist.play_song("j1")
+            assert playlist.maybe_compact(threshold=0) == True
+            assert playlist.journal_size() == 0
+            
+            playlist.initialize()
+            playlist.load(snapshot_file)
+            assert playlist.snapshot()[0]['play_count'] == 1
+        finally:
+            playlist.close_journal()
+            shutil.rmtree(temp_dir)
+    
+    @pytest.mark.skipif(os.name == 'nt', reason="shared journals need POSIX file locks")
+    def test_shared_journal(self, playlist):
+        """Test backends sharing a journal see each other's changes."""
+        import threading
+        
+        temp_dir = tempfile.mkdtemp()
+        snapshot_file = os.path.join(temp_dir, "playlist.bin")
+        other = PlaylistBackend()
+        assert other.load_library()
+        try:
+            assert playlist.open_journal(snapshot_file, shared=True) == 0
+            assert other.open_journal(snapshot_file, shared=True) == 0
+            playlist.add_songs(["s1.mp3", "s2.mp3"])
+            assert other.get_playlist() == ["s1", "s2"]
+            
+            # Plays from both backends at once are all counted
+            def play(backend):
+                for _ in range(100):
+                    backend.play_song("s1")
+            threads = [threading.Thread(target=play, args=(backend,)) for backend in (playlist, other)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert playlist.snapshot()[0]['play_count'] == 200
+            
+            # Compaction in one backend is picked up by the other
+            assert other.compact() == True
+            other.delete_song("s2")
+            assert playlist.get_playlist() == ["s1"]
+            assert other.snapshot()[0]['play_count'] == 200
+        finally:
+            other.close()
+            playlist.close_journal()
+            shutil.rmtree(temp_dir)
+    
+    def test_generation_skips_unchanged_save(self, playlist):
+        """Test save() is a no-op when nothing changed."""
+        playlist.add_song("gen1.mp3")
+        generation = playlist.generation
+        playlist.get_playlist()
+        playlist.search_song("gen1")
+        assert playlist.generation == generation
+        
+        temp_dir = tempfile.mkdtemp()
+        temp_file = os.path.join(temp_dir, "playlist.bin")
+        try:
+            assert playlist.save(temp_file) == True
+            os.utime(temp_file, ns=(0, 0))
+            
+            # Unchanged: nothing is written
+            assert playlist.save(temp_file) == True
+            assert os.stat(temp_file).st_mtime_ns == 0
+            
+            # Changed: file is rewritten, no temp file left behind
+            playlist.play_song("gen1")
+            assert playlist.generation == generation + 1
+            assert playlist.save(temp_file) == True
+            assert os.stat(temp_file).st_mtime_ns != 0
+            assert os.listdir(temp_dir) == ["playlist.bin"]
+            
+            os.utime(temp_file, ns=(0, 0))
+            assert playlist.save(temp_file, force=True) == True
+            assert os.stat(temp_file).st_mtime_ns != 0
+            
+            # A failed CSV save is reported and not remembered
+            csv_file = os.path.join(temp_dir, "playlist.csv")
+            os.mkdir(csv_file)
+            assert playlist.save(csv_file) == False
+            os.rmdir(csv_file)
+            assert playlist.save(csv_file) == True
+            assert os.path.isfile(csv_file)
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_search(self, playlist):
+        """Test ranked, paged substring search."""
+        playlist.add_songs(["Blue Moon.mp3", "Moonlight Sonata.mp3", "Honeymoon.mp3", "Sunrise.mp3"])
+        
+        result = playlist.search("moon")
+        assert result['total'] == 3
+        assert [r['name'] for r in result['results']] == ["Moonlight Sonata", "Blue Moon", "Honeymoon"]
+        
+        page = playlist.search("MOON", limit=1, offset=1)
+        assert page['total'] == 3
+        assert [r['name'] for r in page['results']] == ["Blue Moon"]
+        
+        playlist.play_song("Sunrise")
+        result = playlist.search("rise")
+        assert result['results'][0]['play_count'] == 1
+        
+        assert playlist.search("") == {'total': 0, 'results': []}
+        assert playlist.search(None) == {'total': 0, 'results': []}
+        assert playlist.search("moon", limit=0) == {'total': 3, 'results': []}
+        assert playlist.search("missing")['total'] == 0
+    
+    def test_fuzzy_search(self, playlist):
+        """Test typo-tolerant search over title words."""
+        playlist.add_songs(["Songs/Chaleya Jawan 128 Kbps.mp3", "Songs/Tum Kya Mile.mp3"])
+        
+        result = playlist.fuzzy_search("chaleya jwan")
+        assert result['total'] == 1
+        assert result['results'][0]['name'] == "Chaleya Jawan 128 Kbps"
+        
+        assert playlist.search("chaleya jwan")['total'] == 0
+        assert playlist.fuzzy_search("tum kyaa mile")['total'] == 1
+        assert playlist.fuzzy_search("128 kbps")['total'] == 0
+        assert playlist.fuzzy_search("") == {'total': 0, 'results': []}
+        assert playlist.fuzzy_search(None) == {'total': 0, 'results': []}
+    
+    def test_play_ranking(self, playlist):
+        """Test top played, favorites paging and rank queries."""
+        playlist.add_songs(["top1.mp3", "top2.mp3", "top3.mp3"])
+        for _ in range(3):
+            playlist.play_song("top2")
+        playlist.play_song("top3")
+        
+        assert [r['name'] for r in playlist.top_played(5)] == ["top2", "top3"]
+        assert playlist.top_played(1)[0]['play_count'] == 3
+        assert playlist.top_played(0) == []
+        
+        page = playlist.favorites(0, 10)
+        assert page['total'] == 1
+        assert [r['name'] for r in page['results']] == ["top2"]
+        assert playlist.favorites(1, 10)['results'] == []
+        assert playlist.favorite_count() == 1
+        
+        assert playlist.play_rank("top2") == 1
+        assert playlist.play_rank("top1") == 3
+        assert playlist.play_rank("missing") is None
+    
+    def test_get_range(self, playlist):
+        """Test windowed listing and positions after deletes."""
+        playlist.add_songs([f"win{i}.mp3" for i in range(20)])
+        playlist.delete_songs(["win0", "win5"])
+        
+        window = playlist.get_range(3, 4)
+        assert [r['name'] for r in window] == ["win4", "win6", "win7", "win8"]
+        assert [r['position'] for r in window] == [3, 4, 5, 6]
+        assert [r['name'] for r in playlist.get_range(16, 10)] == ["win18", "win19"]
+        assert playlist.get_range(18, 10) == []
+        assert playlist.get_range(0, 0) == []
+        
+        assert playlist.song_position("win6") == 4
+        assert playlist.song_position("win5") is None
+        
+        # Matches a full snapshot
+        names = [r['name'] for r in playlist.snapshot()]
+        paged = [r['name'] for start in range(0, 18, 5) for r in playlist.get_range(start, 5)]
+        assert paged == names
+    
+    def test_memory_usage(self, playlist):
+        """Test memory usage is reported and released on initialize."""
+        assert playlist.memory_usage() == 0
+        playlist.add_songs([f"usage{i}.mp3" for i in range(1000)])
+        # Nodes, names and both search indexes (every title here is a unique word)
+        assert 0 < playlist.memory_usage() < 1000 * 512
+        
+        # Add/delete churn with new titles reuses freed name slots
+        peaks = []
+        for cycle in range(30):
+            titles = [f"churn{cycle}-{i}" for i in range(500)]
+            playlist.add_songs([title + ".mp3" for title in titles])
+            playlist.delete_songs(titles)
+            peaks.append(playlist.memory_usage())
+        assert max(peaks[10:]) < max(peaks[:10]) + 65536
+        
+        playlist.initialize()
+        assert playlist.memory_usage() == 0
+    
+    def test_independent_backends(self, playlist):
+        """Test each backend owns a separate playlist."""
+        other = PlaylistBackend()
+        assert other.load_library()
+        assert other.handle != playlist.handle
+        
+        playlist.add_songs(["mine.mp3", "shared.mp3"])
+        other.add_song("shared.mp3")
+        other.play_song("shared")
+        assert playlist.get_playlist() == ["mine", "shared"]
+        assert other.get_playlist() == ["shared"]
+        assert playlist.play_rank("shared") == 1
+        assert other.top_played(5)[0]['play_count'] == 1
+        
+        other.close()
+        with pytest.raises(RuntimeError):
+            other.size()
+        assert playlist.size() == 2
+    
+    def test_concurrent_access(self, playlist):
+        """Test readers see consistent pages while another thread mutates."""
+        import threading
+        
+        playlist.add_songs([f"stable{i}.mp3" for i in range(20)])
+        errors = []
+        
+        def writer():
+            for i in range(300):
+                playlist.add_song(f"churn{i % 30}.mp3")
+                playlist.play_next()
+                playlist.delete_song(f"churn{(i * 7) % 30}")
+        
+        def reader():
+            try:
+                for _ in range(300):
+                    page = playlist.get_range(0, 50)
+                    assert [record['position'] for record in page] == list(range(len(page)))
+                    assert playlist.search("stable", limit=5)['total'] == 20
+                    assert len(playlist.get_playlist()) >= 20
+            except AssertionError as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert playlist.get_playlist()[:20] == [f"stable{i}" for i in range(20)]
+    
+    def test_name_views(self, playlist):
+        """Test lazily decoded name views over the C buffer."""
+        playlist.add_songs(["view1.mp3", "Ünïcode title.mp3", "view3.mp3"])
+        for _ in range(3):
+            playlist.play_song("view3")
+        
+        view = playlist.get_playlist_view()
+        assert len(view) == 3
+        assert view[1] == "Ünïcode title"
+        assert view[-1] == "view3"
+        assert view[:2] == ["view1", "Ünïcode title"]
+        assert list(view) == ["view1", "Ünïcode title", "view3"]
+        assert "view3" in view
+        with pytest.raises(IndexError):
+            view[3]
+        
+        assert list(playlist.get_favorites_view()) == ["view3"]
+        
+        playlist.initialize()
+        assert len(playlist.get_playlist_view()) == 0
+        assert list(playlist.get_favorites_view()) == []
+    
+    def test_song_basename_matches_c(self, playlist):
+        """Test song_basename() uses the same rule as the C backend."""
+        paths = [
+            "Songs/Chaleya Jawan 128 Kbps.mp3",
+            "C:\\Music\\v2.0 remix.flac",
+            "mixed/dir\\name.with.dots.ogg",
+            "no_extension",
+            "x" * 300 + ".mp3",
+        ]
+        playlist.add_songs(paths)
+        assert playlist.get_playlist() == [song_basename(p) for p in paths]
+    
     def test_memory_management(self, playlist):
         """Test that memory is properly freed."""
         playlist.add_song("mem_test1.mp3")
@@ -187,6 +582,714 @@ class TestPlaylistBackend:
         
         result = playlist.play_previous()
         assert result is None
+        
+        assert playlist.snapshot() == []
+
+class TestScanner:
+    """Test suite for the incremental library scanner."""
+    
+    @pytest.fixture
+    def playlist(self):
+        """Create a playlist instance for testing."""
+        p = PlaylistBackend()
+        if not p.load_library():
+            pytest.skip("Playlist library not found. Please build it first.")
+        p.initialize()
+        return p
+    
+    @pytest.fixture
+    def library(self):
+        """Create a nested songs directory."""
+        root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(root, "Artist", "Album"))
+        for path in ["top.mp3", "notes.txt", os.path.join("Artist", "a.flac"),
+                     os.path.join("Artist", "Album", "b.MP3")]:
+            with open(os.path.join(root, path), "wb") as f:
+                f.write(b"data")
+        yield root
+        shutil.rmtree(root)
+    
+    def test_scan_tree(self, library):
+        """Test recursive scan finds only audio files."""
+        files = scan_tree([library, os.path.join(library, "missing")])
+        names = sorted(os.path.relpath(p, library) for p in files)
+        assert names == sorted(["top.mp3", os.path.join("Artist", "a.flac"),
+                                os.path.join("Artist", "Album", "b.MP3")])
+        assert all(size == 4 for size, _ in files.values())
+    
+    def test_sync_is_incremental(self, playlist, library):
+        """Test later syncs only apply new, changed and removed files."""
+        manifest = os.path.join(library, "manifest.json")
+        
+        result = sync_library(playlist, [library], manifest)
+        assert len(result['added']) == 3
+        assert sorted(playlist.get_playlist()) == ["a", "b", "top"]
+        assert result['song_paths']["a"] == os.path.join(library, "Artist", "a.flac")
+        
+        # Nothing changed
+        result = sync_library(playlist, [library], manifest)
+        assert result['added'] == result['changed'] == result['removed'] == []
+        
+        # One new, one changed, one removed
+        with open(os.path.join(library, "new.ogg"), "wb") as f:
+            f.write(b"data")
+        with open(os.path.join(library, "top.mp3"), "wb") as f:
+            f.write(b"longer data")
+        os.remove(os.path.join(library, "Artist", "a.flac"))
+        
+        result = sync_library(playlist, [library], manifest)
+        assert [os.path.basename(p) for p in result['added']] == ["new.ogg"]
+        assert [os.path.basename(p) for p in result['changed']] == ["top.mp3"]
+        assert [os.path.basename(p) for p in result['removed']] == ["a.flac"]
+        assert sorted(playlist.get_playlist()) == ["b", "new", "top"]
+        
+        # An empty backend gets a full re-add despite the manifest
+        playlist.initialize()
+        result = sync_library(playlist, [library], manifest, batch_size=1)
+        assert len(result['added']) == 3
+        assert sorted(playlist.get_playlist()) == ["b", "new", "top"]
+    
+    def test_concurrent_manifest_saves(self, library):
+        """Test sessions saving the same manifest at once don't collide."""
+        import threading
+        
+        manifest = os.path.join(library, "manifest.json")
+        files = scan_tree([library])
+        errors = []
+        
+        def save():
+            try:
+                for _ in range(50):
+                    save_manifest(manifest, files)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=save) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert errors == []
+        assert not [name for name in os.listdir(library) if name.endswith(".tmp")]
+
+class TestWatcher:
+    """Test suite for the filesystem watcher."""
+    
+    @pytest.fixture
+    def playlist(self):
+        """Create a playlist instance for testing."""
+        p = PlaylistBackend()
+        if not p.load_library():
+            pytest.skip("Playlist library not found. Please build it first.")
+        p.initialize()
+        return p
+    
+    def wait_for_changes(self, watcher, timeout=5.0):
+        """Poll apply_pending() until a delta arrives."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            changes = watcher.apply_pending()
+            if changes['added'] or changes['removed']:
+                return changes
+            time.sleep(0.05)
+        return {'added': [], 'removed': [], 'song_paths': {}}
+    
+    @pytest.mark.parametrize("use_inotify", [None, False])
+    def test_applies_deltas(self, playlist, use_inotify):
+        """Test adds and deletes reach the backend (inotify and polling)."""
+        root = tempfile.mkdtemp()
+        watcher = LibraryWatcher(playlist, [root], debounce=0.1, poll_interval=0.1,
+                                 use_inotify=use_inotify)
+        try:
+            watcher.start()
+            
+            os.makedirs(os.path.join(root, "sub"))
+            path = os.path.join(root, "sub", "watched.mp3")
+            with open(path, "wb") as f:
+                f.write(b"data")
+            with open(os.path.join(root, "ignored.txt"), "wb") as f:
+                f.write(b"data")
+            
+            changes = self.wait_for_changes(watcher)
+            assert changes['added'] == [path]
+            assert changes['song_paths'] == {"watched": path}
+            assert playlist.get_playlist() == ["watched"]
+            
+            os.remove(path)
+            changes = self.wait_for_changes(watcher)
+            assert changes['removed'] == [path]
+            assert changes['song_paths'] == {"watched": None}
+            assert playlist.get_playlist() == []
+        finally:
+            watcher.stop()
+            shutil.rmtree(root)
+    
+    def test_shared_log(self, playlist):
+        """Test a watcher without backend feeds several backends through its log."""
+        root = tempfile.mkdtemp()
+        other = PlaylistBackend()
+        assert other.load_library()
+        kept = os.path.join(root, "kept.mp3")
+        with open(kept, "wb") as f:
+            f.write(b"data")
+        
+        # Seeded with a map that lists a file the disk no longer has: no
+        # rescan on start, so the polling diff reports it removed
+        gone = os.path.join(root, "gone.mp3")
+        watcher = LibraryWatcher(None, [root], debounce=0.1, poll_interval=0.1,
+                                 use_inotify=False, history=1)
+        try:
+            cursor = watcher.cursor
+            watcher.start(files={kept: (4, os.stat(kept).st_mtime_ns), gone: (4, 0)})
+            for backend in (playlist, other):
+                backend.add_songs([kept, gone])
+            
+            added = os.path.join(root, "added.mp3")
+            with open(added, "wb") as f:
+                f.write(b"data")
+            deadline = time.monotonic() + 5.0
+            while time.monotonic() < deadline and playlist.get_playlist() != ["kept", "added"]:
+                cursor, deltas = watcher.changes_since(cursor)
+                for delta in deltas:
+                    for backend in (playlist, other):
+                        apply_delta(backend, delta)
+                time.sleep(0.05)
+            assert playlist.get_playlist() == ["kept", "added"]
+            assert other.get_playlist() == ["kept", "added"]
+            assert watcher.changes_since(cursor) == (cursor, [])
+            
+            # A cursor older than the log must rescan
+            os.remove(added)
+            deadline = time.monotonic() + 5.0
+            while time.monotonic() < deadline and watcher.cursor == cursor:
+                watcher.changes_since(cursor)
+                time.sleep(0.05)
+            assert watcher.changes_since(cursor)[1][0]['removed_titles'] == ["added"]
+            assert watcher.changes_since(0)[1] is None
+        finally:
+            watcher.stop()
+            other.close()
+            shutil.rmtree(root)
+
+class TestCoverCache:
+    """Test suite for the cover thumbnail cache."""
+    
+    @pytest.fixture
+    def assets(self):
+        """Create an assets directory with a default and one song cover."""
+        image_module = pytest.importorskip("PIL.Image")
+        root = tempfile.mkdtemp()
+        image_module.new("RGB", (640, 480), "green").save(os.path.join(root, "default.jpg"))
+        image_module.new("RGB", (200, 400), "red").save(os.path.join(root, "Chaleya.png"))
+        yield root
+        shutil.rmtree(root)
+    
+    def test_thumbnails(self, assets):
+        """Test fixed-size thumbnails, the shared default and the disk cache."""
+        from covers import CoverCache
+        from PIL import Image
+        import io
+        
+        cache = CoverCache(assets, size=64, max_entries=1)
+        assert cache.cover_path("Chaleya") == os.path.join(assets, "Chaleya.png")
+        assert cache.cover_path("unknown") == os.path.join(assets, "default.jpg")
+        
+        thumbnail = cache.thumbnail("Chaleya")
+        assert Image.open(io.BytesIO(thumbnail)).size == (64, 64)
+        assert cache.thumbnail_base64("Chaleya")
+        
+        # Songs without a cover share one default entry
+        default = cache.thumbnail("song one")
+        assert cache.thumbnail("song two") is default
+        
+        # Thumbnails are written once, keyed by content hash
+        cached_files = os.listdir(os.path.join(assets, ".thumbnails"))
+        assert len(cached_files) == 2
+        assert all(name.endswith("-64.jpg") for name in cached_files)
+        
+        # Evicted entries come back from disk
+        assert cache.thumbnail("Chaleya") == thumbnail
+        
+        os.remove(os.path.join(assets, "default.jpg"))
+        assert cache.thumbnail("song three") is None
+
+    def test_embedded_art(self, assets):
+        """Test embedded pictures are used before the default cover."""
+        from covers import CoverCache
+        from PIL import Image
+        import io
+        
+        buffer = io.BytesIO()
+        Image.new("RGB", (100, 100), "blue").save(buffer, "PNG")
+        pictures = {"hash1": buffer.getvalue()}
+        loads = []
+        
+        def load(picture_hash):
+            loads.append(picture_hash)
+            return pictures.get(picture_hash)
+        
+        cache = CoverCache(assets, size=32,
+                           embedded_art=lambda song: "hash1" if song.startswith("tagged") else None,
+                           embedded_art_data=load)
+        thumbnail = cache.thumbnail("tagged one")
+        assert Image.open(io.BytesIO(thumbnail)).getpixel((16, 16))[2] > 200
+        
+        # One picture shared by many songs is loaded and rendered once
+        assert cache.thumbnail("tagged two") is thumbnail
+        assert loads == ["hash1"]
+        
+        # Side-car covers still win, untagged songs get the default
+        assert cache.thumbnail("Chaleya") != thumbnail
+        assert cache.thumbnail("plain") not in (None, thumbnail)
+    
+    def test_slow_cover_does_not_block_others(self, assets):
+        """Test rendering one cover doesn't hold up lookups of other covers."""
+        from covers import CoverCache
+        import threading
+        
+        loading = threading.Event()
+        release = threading.Event()
+        
+        def load(picture_hash):
+            loading.set()
+            release.wait(5.0)
+            return None
+        
+        cache = CoverCache(assets, size=32,
+                           embedded_art=lambda song: "slow" if song == "slow" else None,
+                           embedded_art_data=load)
+        slow = threading.Thread(target=cache.thumbnail, args=("slow",))
+        slow.start()
+        try:
+            assert loading.wait(5.0)
+            start = time.monotonic()
+            assert cache.thumbnail("Chaleya") is not None
+            assert cache.cover_path("unknown") == os.path.join(assets, "default.jpg")
+            assert time.monotonic() - start < 2.0
+        finally:
+            release.set()
+            slow.join()
+
+def id3_frame(frame_id, body):
+    """ID3v2.3 frame."""
+    return frame_id + struct.pack(">IH", len(body), 0) + body
+
+def vorbis_comments(fields):
+    """Vorbis comment block."""
+    data = struct.pack("<I", 4) + b"test" + struct.pack("<I", len(fields))
+    for field in fields:
+        data += struct.pack("<I", len(field)) + field
+    return data
+
+def ogg_page(packet_data, segments, granule, sequence, header_type=0):
+    """Ogg page (the CRC is left zero; readers here do not check it)."""
+    return (b"OggS" + bytes([0, header_type]) + struct.pack("<qIII", granule, 7, sequence, 0) +
+            bytes([len(segments)]) + bytes(segments) + packet_data)
+
+def write_tagged_mp3(path, title, artist, picture=b"picture-bytes"):
+    """MP3 with an ID3v2.3 tag and a Xing frame announcing 100 frames."""
+    frames = (id3_frame(b"TIT2", b"\x03" + title.encode()) +
+              id3_frame(b"TPE1", b"\x03" + artist.encode()) +
+              id3_frame(b"TALB", b"\x00Album") +
+              id3_frame(b"APIC", b"\x00image/png\x00\x03cover\x00" + picture))
+    size = len(frames)
+    header = b"ID3\x03\x00\x00" + bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F,
+                                          (size >> 7) & 0x7F, size & 0x7F])
+    # MPEG1 layer III, 128 kbps, 44.1 kHz, stereo: Xing follows 32 bytes of side info
+    audio = b"\xff\xfb\x90\x00" + bytes(32) + b"Xing" + struct.pack(">II", 1, 100) + bytes(400)
+    with open(path, "wb") as f:
+        f.write(header + frames + audio)
+
+class TestMetadata:
+    """Test suite for tag parsing and the metadata store."""
+    
+    @pytest.fixture
+    def library(self):
+        """Create a directory with tagged MP3, FLAC and Ogg Vorbis files."""
+        root = tempfile.mkdtemp()
+        write_tagged_mp3(os.path.join(root, "one.mp3"), "Chaleya", "Arijit Singh")
+        write_tagged_mp3(os.path.join(root, "two.mp3"), "Jawan", "Anirudh")
+        
+        # 44.1 kHz, 441000 samples
+        info = (44100 << 44) | (1 << 41) | (15 << 36) | 441000
+        streaminfo = bytes(10) + info.to_bytes(8, 'big') + bytes(16)
+        comments = vorbis_comments([b"TITLE=Tum Kya Mile", b"artist=Pritam"])
+        picture = (struct.pack(">II", 3, 10) + b"image/jpeg" + struct.pack(">I", 0) +
+                   bytes(16) + struct.pack(">I", 4) + b"flac")
+        with open(os.path.join(root, "three.flac"), "wb") as f:
+            f.write(b"fLaC")
+            for kind, body in ((0, streaminfo), (4, comments), (0x86, picture)):
+                f.write(bytes([kind]) + len(body).to_bytes(3, 'big') + body)
+        
+        identification = b"\x01vorbis" + struct.pack("<IBI", 0, 2, 48000) + bytes(13)
+        comment_packet = b"\x03vorbis" + vorbis_comments([b"TITLE=Maahi", b"ALBUM=Dunki"])
+        with open(os.path.join(root, "four.ogg"), "wb") as f:
+            f.write(ogg_page(identification, [len(identification)], 0, 0, header_type=2))
+            f.write(ogg_page(comment_packet, [len(comment_packet)], 0, 1))
+            f.write(ogg_page(b"audio", [5], 96000, 2, header_type=4))
+        
+        with open(os.path.join(root, "plain.mp3"), "wb") as f:
+            f.write(b"not really audio")
+        yield root
+        shutil.rmtree(root)
+    
+    def test_read_tags(self, library):
+        """Test ID3v2, FLAC and Ogg Vorbis tags and durations."""
+        tags = read_tags(os.path.join(library, "one.mp3"))
+        assert (tags['title'], tags['artist'], tags['album']) == ("Chaleya", "Arijit Singh", "Album")
+        assert tags['picture'] == b"picture-bytes"
+        assert tags['picture_mime'] == "image/png"
+        assert tags['duration'] == pytest.approx(100 * 1152 / 44100)
+        
+        tags = read_tags(os.path.join(library, "three.flac"))
+        assert (tags['title'], tags['artist']) == ("Tum Kya Mile", "Pritam")
+        assert tags['duration'] == pytest.approx(10.0)
+        assert (tags['picture'], tags['picture_mime']) == (b"flac", "image/jpeg")
+        
+        tags = read_tags(os.path.join(library, "four.ogg"))
+        assert (tags['title'], tags['album'], tags['artist']) == ("Maahi", "Dunki", None)
+        assert tags['duration'] == pytest.approx(2.0)
+        
+        # Untagged and missing files give empty tags instead of raising
+        assert read_tags(os.path.join(library, "plain.mp3"))['title'] is None
+        assert read_tags(os.path.join(library, "missing.mp3"))['title'] is None
+    
+    def test_store_is_incremental(self, library):
+        """Test only stale files are parsed and pictures are stored once."""
+        store = MetadataStore(os.path.join(library, "metadata.db"))
+        files = scan_tree([library])
+        assert store.refresh(files) == 5
+        assert store.refresh(files) == 0
+        
+        one = store.get(os.path.join(library, "one.mp3"))
+        two = store.get(os.path.join(library, "two.mp3"))
+        assert (one['title'], one['artist']) == ("Chaleya", "Arijit Singh")
+        assert one['picture'] == two['picture']
+        assert store.picture(one['picture']) == (b"picture-bytes", "image/png")
+        assert store.get(os.path.join(library, "plain.mp3"))['picture'] is None
+        
+        # A rewritten file is re-parsed; a removed one is pruned with its picture
+        write_tagged_mp3(os.path.join(library, "two.mp3"), "Jawan", "Anirudh Ravichander", b"new")
+        os.remove(os.path.join(library, "three.flac"))
+        files = scan_tree([library])
+        assert store.stale(files) == [os.path.join(library, "two.mp3")]
+        assert store.refresh(files) == 1
+        assert store.get(os.path.join(library, "two.mp3"))['artist'] == "Anirudh Ravichander"
+        assert store.get(os.path.join(library, "three.flac")) is None
+        assert store.picture(store.get(os.path.join(library, "two.mp3"))['picture']) == (b"new", "image/png")
+        store.close()
+        
+        # Tags survive a restart
+        store = MetadataStore(os.path.join(library, "metadata.db"))
+        assert store.stale(files) == []
+        assert store.get(os.path.join(library, "four.ogg"))['title'] == "Maahi"
+        store.close()
+    
+    def test_sync_library_tags_files(self, library):
+        """Test sync_library feeds new and changed files to the store."""
+        playlist = PlaylistBackend()
+        if not playlist.load_library():
+            pytest.skip("Playlist library not found. Please build it first.")
+        playlist.initialize()
+        store = MetadataStore(os.path.join(library, "metadata.db"))
+        manifest = os.path.join(library, "manifest.json")
+        
+        assert sync_library(playlist, [library], manifest, metadata=store)['tagged'] == 5
+        assert sync_library(playlist, [library], manifest, metadata=store)['tagged'] == 0
+        assert sync_library(playlist, [library], manifest)['tagged'] == 0
+        store.close()
+    
+    def test_tagging_failure_keeps_sync(self, library):
+        """Test a broken metadata store never breaks the library sync."""
+        playlist = PlaylistBackend()
+        if not playlist.load_library():
+            pytest.skip("Playlist library not found. Please build it first.")
+        playlist.initialize()
+        store = MetadataStore(os.path.join(library, "metadata.db"))
+        store.close()  # Every refresh now raises
+        manifest = os.path.join(library, "manifest.json")
+        
+        result = sync_library(playlist, [library], manifest, metadata=store)
+        assert result['tagged'] == 0
+        assert len(result['song_paths']) == 5
+        assert os.path.exists(manifest)
+        assert sync_library(playlist, [library], manifest)['added'] == []
+    
+    def test_extract_tags_process_pool(self, library):
+        """Test large batches are parsed in spawned worker processes."""
+        paths = [os.path.join(library, "one.mp3")] * 40
+        results = extract_tags(paths, max_workers=2)
+        assert len(results) == 40
+        assert all(tags['title'] == "Chaleya" for tags in results)
+
+class TestAudioServer:
+    """Test suite for the Range-capable audio server."""
+    
+    @pytest.fixture
+    def server(self):
+        """Start a server on a free local port."""
+        audio_server = AudioServer()
+        audio_server.start()
+        yield audio_server
+        audio_server.stop()
+    
+    @pytest.fixture
+    def song(self):
+        """Create a 10000-byte song file."""
+        root = tempfile.mkdtemp()
+        path = os.path.join(root, "Chaleya Jawan.mp3")
+        with open(path, "wb") as f:
+            f.write(bytes(range(250)) * 40)
+        yield path
+        shutil.rmtree(root)
+    
+    def test_is_loopback_host(self):
+        """Test which Host headers mean the browser shares this machine."""
+        for host in ("localhost:8501", "127.0.0.1", "[::1]:8501", "app.localhost", "LOCALHOST"):
+            assert is_loopback_host(host)
+        for host in (None, "", "music.example.com", "192.168.1.5:8501", "[2001:db8::1]:8501",
+                     "localhost.example.com"):
+            assert not is_loopback_host(host)
+    
+    def test_parse_range(self):
+        """Test single, open-ended, suffix and unsatisfiable ranges."""
+        assert parse_range(None, 100) is None
+        assert parse_range("bytes=0-9", 100) == (0, 9)
+        assert parse_range("bytes=90-", 100) == (90, 99)
+        assert parse_range("bytes=90-500", 100) == (90, 99)
+        assert parse_range("bytes=-10", 100) == (90, 99)
+        assert parse_range("bytes=100-", 100) == 'unsatisfiable'
+        assert parse_range("bytes=0-1,5-6", 100) is None
+        assert parse_range("items=0-1", 100) is None
+    
+    def test_range_requests(self, server, song):
+        """Test full, partial and cached responses."""
+        import urllib.request
+        import urllib.error
+        
+        with open(song, "rb") as f:
+            content = f.read()
+        url = server.url_for(song)
+        assert url == server.url_for(song)
+        assert url.endswith("/Chaleya%20Jawan.mp3")
+        
+        with urllib.request.urlopen(url) as response:
+            assert response.status == 200
+            assert response.headers['Content-Type'] == "audio/mpeg"
+            assert response.headers['Accept-Ranges'] == "bytes"
+            etag = response.headers['ETag']
+            assert response.read() == content
+        
+        request = urllib.request.Request(url, headers={'Range': "bytes=1000-1999"})
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 206
+            assert response.headers['Content-Range'] == "bytes 1000-1999/10000"
+            assert response.read() == content[1000:2000]
+        
+        request = urllib.request.Request(url, headers={'Range': "bytes=-5"})
+        with urllib.request.urlopen(request) as response:
+            assert response.read() == content[-5:]
+        
+        for headers, status in (({'Range': "bytes=20000-"}, 416),
+                                ({'If-None-Match': etag}, 304)):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+            assert error.value.code == status
+        
+        # Unregistered tokens are not served; a replaced file gets a new URL
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(server.base_url + "/audio/unknown/x.mp3")
+        assert error.value.code == 404
+        with open(song, "wb") as f:
+            f.write(b"new")
+        assert server.url_for(song) != url
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="needs Unix-domain sockets")
+class TestPlaylistService:
+    """Test suite for the playlist daemon and its pooled client."""
+    
+    @pytest.fixture
+    def client(self):
+        """Serve a fresh backend on a temporary socket."""
+        backend = PlaylistBackend()
+        if not backend.load_library():
+            pytest.skip("Playlist library not found. Please build it first.")
+        root = tempfile.mkdtemp()
+        server = PlaylistServer(backend, os.path.join(root, "playlist.sock"))
+        server.start()
+        client = PlaylistClient(server.socket_path, pool_size=2)
+        yield client
+        client.close()
+        server.stop()
+        backend.close()
+        shutil.rmtree(root)
+    
+    def test_codec_round_trip(self):
+        """Test every value type survives encoding, including record lists."""
+        records = [{'name': "Ünïcode", 'play_count': 3, 'is_favorite': True, 'position': 0}]
+        value = [None, True, False, -5, 1 << 40, "text", ["a", 1], {'total': 1, 'results': records}, [], records]
+        out = bytearray()
+        encode_value(value, out)
+        assert decode_value(bytes(out)) == (value, len(out))
+        
+        with pytest.raises(ValueError):
+            decode_value(bytes(out[:-3]))
+        with pytest.raises(TypeError):
+            encode_value(object(), bytearray())
+    
+    def test_drop_in_operations(self, client):
+        """Test the client mirrors PlaylistBackend results."""
+        assert client.load_library()
+        assert client.add_songs(f"dir/svc{i}.mp3" for i in range(3)) == [True, True, True]
+        assert client.add_song("dir/svc0.flac") == False
+        for _ in range(3):
+            assert client.play_song("svc1") == "svc1"
+        
+        assert client.size() == 3
+        assert client.get_playlist() == ["svc0", "svc1", "svc2"]
+        assert client.get_favorites_view() == ["svc1"]
+        assert client.search("svc", limit=2)['total'] == 3
+        top = client.top_played(1)[0]
+        assert (top['name'], top['play_count'], top['is_favorite']) == ("svc1", 3, True)
+        assert client.snapshot() == client.get_range(0, 10)
+        assert client.song_position("svc2") == 2
+        assert client.song_position("missing") is None
+        assert client.delete_songs(["svc2", "missing"]) == [True, False]
+        assert client.generation > 0
+    
+    def test_pipelining_and_errors(self, client):
+        """Test pipelined calls and remote exceptions."""
+        results = client.call_many([('add_song', "p.mp3"), ('play_song', "p"), ('favorite_count',)])
+        assert results == [True, "p", 0]
+        
+        with pytest.raises(RuntimeError):
+            client.search_song(None)
+        with pytest.raises(ValueError):
+            client.call_many([('close',)])
+        # The connection is still usable after a remote error
+        assert client.size() == 1
+        
+        client.close()
+        with pytest.raises(RuntimeError):
+            client.size()
+    
+    def test_socket_surface(self, client):
+        """Test the socket is owner-only and file operations aren't served."""
+        import stat
+        
+        assert stat.S_IMODE(os.stat(client.socket_path).st_mode) == 0o600
+        for name in ('save', 'load', 'open_journal', 'close_journal'):
+            assert not hasattr(client, name)
+            with pytest.raises(ValueError):
+                client.call_many([(name, "/tmp/playlist.bin")])
+        assert client.compact() == False
+    
+    def test_shared_between_clients(self, client):
+        """Test clients on many threads share one playlist with no lost plays."""
+        import threading
+        
+        client.add_song("hot.mp3")
+        other = PlaylistClient(client.socket_path)
+        
+        def play():
+            for _ in range(50):
+                other.play_song("hot")
+        threads = [threading.Thread(target=play) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        other.close()
+        assert client.snapshot()[0]['play_count'] == 200
+    
+    def test_saturated_pool_waits(self, client):
+        """Test calls beyond pool_size wait for a free connection."""
+        import threading
+        
+        client.add_songs([f"pool{i}.mp3" for i in range(100)])
+        results = []
+        
+        def read():
+            for _ in range(20):
+                results.append(len(client.snapshot()))
+        threads = [threading.Thread(target=read) for _ in range(client.pool_size * 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [100] * (client.pool_size * 3 * 20)
+
+class TestAsyncPlaylistBackend:
+    """Test suite for the asyncio wrapper."""
+    
+    @pytest.fixture
+    def backend(self):
+        """Create a loaded backend whose get_playlist calls are counted."""
+        p = PlaylistBackend()
+        if not p.load_library():
+            pytest.skip("Playlist library not found. Please build it first.")
+        p.initialize()
+        p.calls = 0
+        get_playlist = p.get_playlist
+        
+        def counted_get_playlist():
+            p.calls += 1
+            time.sleep(0.05)  # Keep the call in flight while others arrive
+            return get_playlist()
+        p.get_playlist = counted_get_playlist
+        return p
+    
+    def test_coalesced_reads(self, backend):
+        """Test concurrent identical reads share one call, but not across writes."""
+        async def scenario():
+            async with AsyncPlaylistBackend(backend) as playlist:
+                await playlist.add_songs(f"a{i}.mp3" for i in range(3))
+                results = await asyncio.gather(*(playlist.get_playlist() for _ in range(20)))
+                assert backend.calls == 1
+                assert all(result == ["a0", "a1", "a2"] for result in results)
+                
+                # A read issued after a write doesn't join an older read
+                first = asyncio.ensure_future(playlist.get_playlist())
+                await asyncio.sleep(0.01)
+                await playlist.add_song("a3.mp3")
+                second = await playlist.get_playlist()
+                assert backend.calls == 3
+                await first
+                assert second[-1] == "a3"
+                
+                # Different arguments are different calls
+                searches = await asyncio.gather(playlist.search("a1"), playlist.search("a1", 20, 0),
+                                                playlist.search("a1", limit=1))
+                assert searches[0] is searches[1]
+                assert searches[2]['total'] == 1
+        asyncio.run(scenario())
+    
+    def test_writes_and_persistence(self, backend):
+        """Test writes are never coalesced and saves/loads are awaitable."""
+        temp_dir = tempfile.mkdtemp()
+        snapshot_file = os.path.join(temp_dir, "playlist.bin")
+        
+        async def scenario():
+            playlist = AsyncPlaylistBackend(backend, max_workers=2)
+            await playlist.add_song("w.mp3")
+            await asyncio.gather(*(playlist.play_song("w") for _ in range(10)))
+            assert (await playlist.snapshot())[0]['play_count'] == 10
+            
+            assert await playlist.save(snapshot_file) == True
+            await playlist.initialize()
+            assert await playlist.size() == 0
+            assert await playlist.load(snapshot_file) == True
+            assert await playlist.favorite_count() == 1
+            generation = await playlist.generation()
+            assert generation == backend.generation > 0
+            await playlist.play_song("w")
+            assert await playlist.generation() == generation + 1
+            await playlist.aclose()
+        try:
+            asyncio.run(scenario())
+        finally:
+            shutil.rmtree(temp_dir)
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])